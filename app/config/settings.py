@@ -48,6 +48,7 @@ class TelegramConfig:
     webhook_url: Optional[str] = None
     webhook_port: int = 8443
     admin_username: str = "Arshya_Alaee"
+    admin_chat_id: Optional[int] = None
     
     @classmethod
     def from_env(cls) -> 'TelegramConfig':
@@ -58,6 +59,8 @@ class TelegramConfig:
             
         api_id_str = os.getenv("API_ID")
         api_id = int(api_id_str) if api_id_str else None
+        admin_chat_id_str = os.getenv("ADMIN_CHAT_ID")
+        admin_chat_id = int(admin_chat_id_str) if admin_chat_id_str else None
         
         return cls(
             bot_token=bot_token,
@@ -65,7 +68,8 @@ class TelegramConfig:
             api_hash=os.getenv("API_HASH"),
             webhook_url=os.getenv("WEBHOOK_URL"),
             webhook_port=int(os.getenv("WEBHOOK_PORT", "8443")),
-            admin_username=os.getenv("ADMIN_USERNAME", "Arshya_Alaee")
+            admin_username=os.getenv("ADMIN_USERNAME", "Arshya_Alaee"),
+            admin_chat_id=admin_chat_id
         )
 
 
@@ -74,6 +78,18 @@ class SMSConfig:
     """SMS service configuration settings"""
     kavenegar_api_key: str
     verify_template: str = "verify"
+    api_url: str = "https://api.kavenegar.com"
+    timeout: float = 10
+    max_connections: int = 10
+    dispatch_queue_size: int = 1000
+    dispatch_workers: int = 4
+    max_retries: int = 2
+    retry_backoff: float = 0.5
+    breaker_failures: int = 5
+    breaker_reset_seconds: float = 30
+    status_poll_interval: int = 15
+    status_batch_size: int = 200
+    status_max_age: int = 3600
     
     @classmethod
     def from_env(cls) -> 'SMSConfig':
@@ -84,7 +100,19 @@ class SMSConfig:
             
         return cls(
             kavenegar_api_key=api_key,
-            verify_template=os.getenv("SMS_VERIFY_TEMPLATE", "verify")
+            verify_template=os.getenv("SMS_VERIFY_TEMPLATE", "verify"),
+            api_url=os.getenv("KAVENEGAR_API_URL", "https://api.kavenegar.com"),
+            timeout=float(os.getenv("SMS_TIMEOUT_SECONDS", "10")),
+            max_connections=int(os.getenv("SMS_MAX_CONNECTIONS", "10")),
+            dispatch_queue_size=int(os.getenv("SMS_QUEUE_SIZE", "1000")),
+            dispatch_workers=int(os.getenv("SMS_WORKERS", "4")),
+            max_retries=int(os.getenv("SMS_MAX_RETRIES", "2")),
+            retry_backoff=float(os.getenv("SMS_RETRY_BACKOFF_SECONDS", "0.5")),
+            breaker_failures=int(os.getenv("SMS_BREAKER_FAILURES", "5")),
+            breaker_reset_seconds=float(os.getenv("SMS_BREAKER_RESET_SECONDS", "30")),
+            status_poll_interval=int(os.getenv("SMS_STATUS_POLL_INTERVAL", "15")),
+            status_batch_size=int(os.getenv("SMS_STATUS_BATCH_SIZE", "200")),
+            status_max_age=int(os.getenv("SMS_STATUS_MAX_AGE_SECONDS", "3600"))
         )
 
 
@@ -111,6 +139,9 @@ class LoggingConfig:
     file_path: Optional[str] = None
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     backup_count: int = 5
+    json: bool = False
+    queue_size: int = 10000
+    slow_update_ms: int = 1000
     
     @classmethod
     def from_env(cls) -> 'LoggingConfig':
@@ -120,7 +151,10 @@ class LoggingConfig:
             format=os.getenv("LOG_FORMAT", "%(asctime)s - %(name)s - %(levelname)s - %(message)s"),
             file_path=os.getenv("LOG_FILE_PATH"),
             max_file_size=int(os.getenv("LOG_MAX_FILE_SIZE", str(10 * 1024 * 1024))),
-            backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5"))
+            backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+            json=os.getenv("LOG_JSON", "false").lower() == "true",
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            slow_update_ms=int(os.getenv("LOG_SLOW_UPDATE_MS", "1000"))
         )
 
 
@@ -129,7 +163,11 @@ class SecurityConfig:
     """Security configuration settings"""
     max_otp_attempts: int = 3
     otp_expiry_minutes: int = 10
-    rate_limit_per_minute: int = 60
+    otp_max_pending: int = 50000
+    otp_phone_burst: int = 3
+    otp_user_burst: int = 5
+    otp_refill_seconds: int = 300
+    verified_phone_ttl_days: int = 30
     allowed_cities: list = None
     
     def __post_init__(self):
@@ -145,11 +183,208 @@ class SecurityConfig:
         return cls(
             max_otp_attempts=int(os.getenv("MAX_OTP_ATTEMPTS", "3")),
             otp_expiry_minutes=int(os.getenv("OTP_EXPIRY_MINUTES", "10")),
-            rate_limit_per_minute=int(os.getenv("RATE_LIMIT_PER_MINUTE", "60")),
+            otp_max_pending=int(os.getenv("OTP_MAX_PENDING", "50000")),
+            otp_phone_burst=int(os.getenv("OTP_PHONE_BURST", "3")),
+            otp_user_burst=int(os.getenv("OTP_USER_BURST", "5")),
+            otp_refill_seconds=int(os.getenv("OTP_REFILL_SECONDS", "300")),
+            verified_phone_ttl_days=int(os.getenv("VERIFIED_PHONE_TTL_DAYS", "30")),
             allowed_cities=allowed_cities
         )
 
 
+@dataclass
+class CacheConfig:
+    """In-process cache configuration settings"""
+    catalog_ttl_seconds: int = 300
+    
+    @classmethod
+    def from_env(cls) -> 'CacheConfig':
+        """Create cache config from environment variables"""
+        return cls(
+            catalog_ttl_seconds=int(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+        )
+
+
+@dataclass
+class PersistenceConfig:
+    """Conversation persistence configuration settings"""
+    enabled: bool = True
+    flush_interval: float = 10
+    
+    @classmethod
+    def from_env(cls) -> 'PersistenceConfig':
+        """Create persistence config from environment variables"""
+        return cls(
+            enabled=os.getenv("PERSISTENCE_ENABLED", "true").lower() == "true",
+            flush_interval=float(os.getenv("PERSISTENCE_FLUSH_INTERVAL", "10"))
+        )
+
+
+@dataclass
+class ConversationConfig:
+    """Conversation timeout and cleanup configuration settings"""
+    main_timeout: int = 900
+    registration_timeout: int = 900
+    crm_timeout: int = 600
+    payment_timeout: int = 3600
+    receipt_timeout: int = 3600
+    sweep_interval: int = 600
+    idle_ttl: int = 7200
+    
+    @classmethod
+    def from_env(cls) -> 'ConversationConfig':
+        """Create conversation config from environment variables"""
+        return cls(
+            main_timeout=int(os.getenv("CONVERSATION_TIMEOUT_MAIN", "900")),
+            registration_timeout=int(os.getenv("CONVERSATION_TIMEOUT_REGISTRATION", "900")),
+            crm_timeout=int(os.getenv("CONVERSATION_TIMEOUT_CRM", "600")),
+            payment_timeout=int(os.getenv("CONVERSATION_TIMEOUT_PAYMENT", "3600")),
+            receipt_timeout=int(os.getenv("CONVERSATION_TIMEOUT_RECEIPT", "3600")),
+            sweep_interval=int(os.getenv("CONVERSATION_SWEEP_INTERVAL", "600")),
+            idle_ttl=int(os.getenv("CONVERSATION_IDLE_TTL", "7200"))
+        )
+    
+    def timeout(self, flow: str) -> Optional[int]:
+        """Get the timeout for a conversation flow (``None`` when disabled)"""
+        return getattr(self, f"{flow}_timeout") or None
+
+
+@dataclass
+class CatchUpConfig:
+    """Startup backlog catch-up configuration settings"""
+    enabled: bool = True
+    batch_size: int = 100
+    concurrency: int = 32
+    stale_after_seconds: int = 600
+    
+    @classmethod
+    def from_env(cls) -> 'CatchUpConfig':
+        """Create catch-up config from environment variables"""
+        return cls(
+            enabled=os.getenv("CATCH_UP_ENABLED", "true").lower() == "true",
+            batch_size=int(os.getenv("CATCH_UP_BATCH_SIZE", "100")),
+            concurrency=int(os.getenv("CATCH_UP_CONCURRENCY", "32")),
+            stale_after_seconds=int(os.getenv("CATCH_UP_STALE_AFTER_SECONDS", "600"))
+        )
+
+
+@dataclass
+class NotificationConfig:
+    """Admin notification delivery and outbox configuration settings"""
+    backend: str = "bot_api"
+    routes: dict = None
+    fanout_concurrency: int = 8
+    send_timeout: float = 10
+    error_window: float = 300
+    error_flush_interval: float = 5
+    error_max_fingerprints: int = 500
+    outbox_poll_interval: float = 5
+    outbox_batch_size: int = 50
+    outbox_max_attempts: int = 8
+    outbox_retry_backoff: float = 2
+    digest_kinds: list = None
+    digest_window: float = 60
+    digest_max_events: int = 20
+    
+    def __post_init__(self):
+        if self.digest_kinds is None:
+            self.digest_kinds = ["lottery", "order"]
+        if self.routes is None:
+            self.routes = {}
+    
+    @staticmethod
+    def parse_routes(value: str) -> dict:
+        """Parse ``kind:chat,chat;kind:chat`` into {kind: [chat, ...]}"""
+        routes = {}
+        for route in filter(None, (part.strip() for part in value.split(";"))):
+            kind, _, chats = route.partition(":")
+            routes[kind.strip()] = [
+                int(chat) if chat.lstrip("-").isdigit() else chat
+                for chat in (chat.strip() for chat in chats.split(",")) if chat
+            ]
+        return routes
+    
+    @classmethod
+    def from_env(cls) -> 'NotificationConfig':
+        """Create notification config from environment variables"""
+        digest_kinds_str = os.getenv("NOTIFICATION_DIGEST_KINDS", "lottery,order")
+        digest_kinds = [kind.strip() for kind in digest_kinds_str.split(",") if kind.strip()]
+        
+        return cls(
+            backend=os.getenv("NOTIFICATION_BACKEND", "bot_api"),
+            routes=cls.parse_routes(os.getenv("NOTIFICATION_ROUTES", "")),
+            fanout_concurrency=int(os.getenv("NOTIFICATION_FANOUT_CONCURRENCY", "8")),
+            send_timeout=float(os.getenv("NOTIFICATION_SEND_TIMEOUT_SECONDS", "10")),
+            error_window=float(os.getenv("ERROR_ALERT_WINDOW_SECONDS", "300")),
+            error_flush_interval=float(os.getenv("ERROR_ALERT_FLUSH_INTERVAL", "5")),
+            error_max_fingerprints=int(os.getenv("ERROR_ALERT_MAX_FINGERPRINTS", "500")),
+            outbox_poll_interval=float(os.getenv("NOTIFICATION_OUTBOX_POLL_INTERVAL", "5")),
+            outbox_batch_size=int(os.getenv("NOTIFICATION_OUTBOX_BATCH_SIZE", "50")),
+            outbox_max_attempts=int(os.getenv("NOTIFICATION_OUTBOX_MAX_ATTEMPTS", "8")),
+            outbox_retry_backoff=float(os.getenv("NOTIFICATION_OUTBOX_RETRY_BACKOFF_SECONDS", "2")),
+            digest_kinds=digest_kinds,
+            digest_window=float(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "60")),
+            digest_max_events=int(os.getenv("NOTIFICATION_DIGEST_MAX_EVENTS", "20"))
+        )
+
+
+@dataclass
+class MonitoringConfig:
+    """In-process metrics endpoint configuration settings"""
+    enabled: bool = True
+    host: str = "0.0.0.0"
+    port: int = 8080
+    max_loop_lag: float = 5
+    poll_stale_seconds: float = 120
+    db_timeout: float = 2
+    loop_tick_interval: float = 0.25
+    loop_block_budget: float = 0.5
+    
+    @classmethod
+    def from_env(cls) -> 'MonitoringConfig':
+        """Create monitoring config from environment variables"""
+        return cls(
+            enabled=os.getenv("METRICS_ENABLED", "true").lower() == "true",
+            host=os.getenv("METRICS_HOST", "0.0.0.0"),
+            port=int(os.getenv("METRICS_PORT", "8080")),
+            max_loop_lag=float(os.getenv("HEALTH_MAX_LOOP_LAG_SECONDS", "5")),
+            poll_stale_seconds=float(os.getenv("HEALTH_POLL_STALE_SECONDS", "120")),
+            db_timeout=float(os.getenv("HEALTH_DB_TIMEOUT_SECONDS", "2")),
+            loop_tick_interval=float(os.getenv("LOOP_MONITOR_INTERVAL_SECONDS", "0.25")),
+            loop_block_budget=float(os.getenv("LOOP_BLOCK_BUDGET_SECONDS", "0.5"))
+        )
+
+
+@dataclass
+class ProfilingConfig:
+    """On-demand profiling configuration settings"""
+    admin_ids: list = None
+    output_dir: str = "logs/profiles"
+    sample_interval: float = 0.005
+    default_seconds: int = 30
+    max_seconds: int = 300
+    trace_frames: int = 10
+    
+    def __post_init__(self):
+        if self.admin_ids is None:
+            self.admin_ids = []
+    
+    @classmethod
+    def from_env(cls) -> 'ProfilingConfig':
+        """Create profiling config from environment variables"""
+        admin_ids_str = os.getenv("ADMIN_USER_IDS") or os.getenv("ADMIN_CHAT_ID", "")
+        admin_ids = [int(admin_id) for admin_id in admin_ids_str.split(",") if admin_id.strip()]
+        
+        return cls(
+            admin_ids=admin_ids,
+            output_dir=os.getenv("PROFILE_DIR", "logs/profiles"),
+            sample_interval=float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000,
+            default_seconds=int(os.getenv("PROFILE_DEFAULT_SECONDS", "30")),
+            max_seconds=int(os.getenv("PROFILE_MAX_SECONDS", "300")),
+            trace_frames=int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "10"))
+        )
+
+
 class ApplicationConfig:
     """Main application configuration container"""
     
@@ -160,6 +395,13 @@ class ApplicationConfig:
         self.payment = PaymentConfig.from_env()
         self.logging = LoggingConfig.from_env()
         self.security = SecurityConfig.from_env()
+        self.cache = CacheConfig.from_env()
+        self.persistence = PersistenceConfig.from_env()
+        self.conversation = ConversationConfig.from_env()
+        self.catch_up = CatchUpConfig.from_env()
+        self.notification = NotificationConfig.from_env()
+        self.monitoring = MonitoringConfig.from_env()
+        self.profiling = ProfilingConfig.from_env()
     
     def validate(self) -> None:
         """Validate all configuration settings"""
@@ -170,6 +412,13 @@ class ApplicationConfig:
             raise ValueError("Kavenegar API key is required")
         if not self.database.url:
             raise ValueError("Database URL is required")
+        # The Bot API backend can only address chat ids; without one every notification would fail
+        if (self.notification.backend == "bot_api" and not self.telegram.admin_chat_id
+                and "*" not in self.notification.routes):
+            raise ValueError(
+                "ADMIN_CHAT_ID (or a '*' entry in NOTIFICATION_ROUTES) is required with "
+                "NOTIFICATION_BACKEND=bot_api; set NOTIFICATION_BACKEND=telethon to notify ADMIN_USERNAME"
+            )
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert configuration to dictionary (for logging/debugging)"""
@@ -184,10 +433,15 @@ class ApplicationConfig:
                 "api_id": self.telegram.api_id,
                 "webhook_url": self.telegram.webhook_url,
                 "admin_username": self.telegram.admin_username,
+                "admin_chat_id": self.telegram.admin_chat_id,
             },
             "sms": {
                 "api_key": "***HIDDEN***",
                 "verify_template": self.sms.verify_template,
+                "timeout": self.sms.timeout,
+                "dispatch_workers": self.sms.dispatch_workers,
+                "max_retries": self.sms.max_retries,
+                "status_poll_interval": self.sms.status_poll_interval,
             },
             "payment": {
                 "card_number": self.payment.card_number,
@@ -196,7 +450,53 @@ class ApplicationConfig:
             "security": {
                 "max_otp_attempts": self.security.max_otp_attempts,
                 "otp_expiry_minutes": self.security.otp_expiry_minutes,
+                "otp_phone_burst": self.security.otp_phone_burst,
+                "otp_user_burst": self.security.otp_user_burst,
+                "otp_refill_seconds": self.security.otp_refill_seconds,
+                "verified_phone_ttl_days": self.security.verified_phone_ttl_days,
                 "allowed_cities": self.security.allowed_cities,
+            },
+            "cache": {
+                "catalog_ttl_seconds": self.cache.catalog_ttl_seconds,
+            },
+            "persistence": {
+                "enabled": self.persistence.enabled,
+                "flush_interval": self.persistence.flush_interval,
+            },
+            "conversation": {
+                "main_timeout": self.conversation.main_timeout,
+                "registration_timeout": self.conversation.registration_timeout,
+                "crm_timeout": self.conversation.crm_timeout,
+                "payment_timeout": self.conversation.payment_timeout,
+                "receipt_timeout": self.conversation.receipt_timeout,
+                "idle_ttl": self.conversation.idle_ttl,
+            },
+            "catch_up": {
+                "enabled": self.catch_up.enabled,
+                "concurrency": self.catch_up.concurrency,
+                "stale_after_seconds": self.catch_up.stale_after_seconds,
+            },
+            "notification": {
+                "backend": self.notification.backend,
+                "routes": self.notification.routes,
+                "error_window": self.notification.error_window,
+                "outbox_poll_interval": self.notification.outbox_poll_interval,
+                "outbox_max_attempts": self.notification.outbox_max_attempts,
+                "digest_kinds": self.notification.digest_kinds,
+                "digest_window": self.notification.digest_window,
+            },
+            "monitoring": {
+                "enabled": self.monitoring.enabled,
+                "host": self.monitoring.host,
+                "port": self.monitoring.port,
+                "max_loop_lag": self.monitoring.max_loop_lag,
+                "poll_stale_seconds": self.monitoring.poll_stale_seconds,
+                "loop_block_budget": self.monitoring.loop_block_budget,
+            },
+            "profiling": {
+                "admin_ids": self.profiling.admin_ids,
+                "output_dir": self.profiling.output_dir,
+                "max_seconds": self.profiling.max_seconds,
             }
         }
 
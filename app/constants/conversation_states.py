@@ -53,6 +53,12 @@ class LotteryStates(IntEnum):
 (ASK_NAME, ASK_CITY, ASK_AREA, ASK_ID, ASK_PHONE, ASK_OTP) = range(6)
 ASK_REFERRAL_CODE, ASK_PAYMENT_METHOD, ASK_PAYMENT_PROOF = range(100, 103)
 ASK_CRM_PHONE, ASK_CRM_OTP = range(200, 202)
-ASK_RECEIPT_INSTALLMENT = range(300, 301)
+ASK_RECEIPT_INSTALLMENT = 300
 ASK_COOPERATION_PHONE, ASK_COOPERATION_OTP, ASK_COOPERATION_CITY, ASK_COOPERATION_RESUME = range(400, 404)
 ASK_LOTTERY, ASK_LOTTERY_NUMBER, ASK_LOTTERY_OTP = range(500, 503)
+
+# State value -> constant name, for logs and metrics
+STATE_NAMES = {
+    value: name for name, value in list(globals().items())
+    if name.startswith("ASK_") and isinstance(value, int)
+}
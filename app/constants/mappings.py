@@ -48,3 +48,13 @@ VALID_AREAS = {"1", "2", "3"}
 
 # High school grades that require major selection
 HIGH_SCHOOL_GRADES = {GradeEnum.GRADE_10, GradeEnum.GRADE_11, GradeEnum.GRADE_12}
+
+# Mobile operator by number prefix (first four digits of 09xxxxxxxxx)
+MOBILE_OPERATOR_PREFIXES = {
+    **{f"091{d}": "mci" for d in range(10)},
+    **{f"099{d}": "mci" for d in range(5)},
+    **{f"090{d}": "irancell" for d in range(1, 6)},
+    **{f"093{d}": "irancell" for d in (0, 3, 5, 6, 7, 8, 9)},
+    "0941": "irancell",
+    **{f"092{d}": "rightel" for d in range(3)},
+}
@@ -111,7 +111,7 @@ class CooperationMessages:
         "انصراف: /cancel"
     )
     
-    ASK_OTP_COOPERATION = "✅ شماره تلفن شما تایید شد!\n\n🏙️ حالا لطفاً شهر محل سکونت خود را وارد کنید:"
+    PHONE_VERIFIED_ASK_CITY = "✅ شماره تلفن شما تایید شد!\n\n🏙️ حالا لطفاً شهر محل سکونت خود را وارد کنید:"
     ASK_CITY_COOPERATION = "❌ لطفاً نام شهر را به درستی وارد کنید:"
     CITY_REGISTERED = "✅ شهر شما ثبت شد!"
     
@@ -186,6 +186,9 @@ class ErrorMessages:
     USER_NOT_FOUND = "کاربر یافت نشد."
     PROCESSING_ERROR = "❌ خطا در پردازش درخواست."
     UPLOAD_IMAGE_ONLY = "لطفاً یک عکس از فیش واریزی ارسال کنید."
+    OTP_EXPIRED = "⌛ کد تایید منقضی شده یا تعداد تلاش‌های ناموفق بیش از حد مجاز است. لطفا دوباره شماره تلفن خود را وارد کنید:"
+    CONVERSATION_TIMEOUT = "⏰ زمان این مرحله به پایان رسید. لطفا دوباره از منو شروع کنید."
+    CONTACT_REJECTED = "❌ این شماره قابل تایید نیست. لطفاً شماره موبایل خودتان را با دکمه «📱 ارسال شماره من» بفرستید یا آن را تایپ کنید:"
     
     MISSING_PRODUCT_INFO = "❌ خطا: اطلاعات محصول یافت نشد."
     ORDER_DATA_INCOMPLETE = "❌ خطا: اطلاعات سفارش ناقص است."
@@ -229,6 +232,17 @@ class PaymentMessages:
 
 
 # Button text constants
+class AdminMessages:
+    """Admin profiling command messages"""
+    PROFILE_STARTED = "⏱ پروفایل CPU به مدت {} ثانیه شروع شد. نتیجه به صورت فایل ارسال می‌شود."
+    PROFILE_RUNNING = "⏳ یک پروفایل در حال اجراست. لطفا تا پایان آن صبر کنید."
+    PROFILE_USAGE = "استفاده: /profile [ثانیه]"
+    MEMORY_TRACING_STOPPED = "ردیابی حافظه متوقف شد."
+    MEMORY_TRACING_NOT_RUNNING = "ردیابی حافظه فعال نیست."
+    PROFILE_FAILED = "❌ پروفایل ناموفق بود: {}"
+    CATALOG_RELOADED = "🔄 کش محصولات و قرعه کشی‌ها پاک شد؛ تغییرات از همین حالا نمایش داده می‌شوند."
+
+
 class ButtonTexts:
     """Button text constants for keyboards"""
     
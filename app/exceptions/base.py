@@ -185,12 +185,16 @@ class ConfigurationException(BotException):
 class RateLimitException(BotException):
     """Exception for rate limiting errors"""
     
-    def __init__(self, user_id: int, limit_type: str, **kwargs):
+    def __init__(self, user_id: int, limit_type: str, retry_after: Optional[float] = None, **kwargs):
+        self.retry_after = retry_after
+        user_message = "تعداد درخواست‌ها بیش از حد مجاز است. لطفا صبر کنید"
+        if retry_after:
+            user_message = f"تعداد درخواست‌ها بیش از حد مجاز است. لطفا {max(1, round(retry_after / 60))} دقیقه دیگر تلاش کنید"
         super().__init__(
             message=f"Rate limit exceeded for user {user_id}, type: {limit_type}",
             error_code="RATE_LIMIT_EXCEEDED",
-            user_message="تعداد درخواست‌ها بیش از حد مجاز است. لطفا صبر کنید",
-            context={"user_id": user_id, "limit_type": limit_type}
+            user_message=user_message,
+            context={"user_id": user_id, "limit_type": limit_type, "retry_after": retry_after}
         )
 
 
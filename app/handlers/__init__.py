@@ -10,6 +10,7 @@ from .payment_handler import PaymentHandler
 from .crm_handler import CRMHandler
 from .lottery_handler import LotteryHandler
 from .cooperation_handler import CooperationHandler
+from .admin_handler import AdminHandler
 
 __all__ = [
     'MenuHandler',
@@ -18,5 +19,6 @@ __all__ = [
     'PaymentHandler',
     'CRMHandler',
     'LotteryHandler',
-    'CooperationHandler'
+    'CooperationHandler',
+    'AdminHandler'
 ]
\ No newline at end of file
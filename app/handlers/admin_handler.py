@@ -0,0 +1,102 @@
+"""
+Admin Handler
+Admin-only diagnostics: CPU profiles and memory snapshots of the running bot,
+and reloading the product and lottery catalog
+"""
+
+import asyncio
+
+from telegram import Bot, Update
+from telegram.ext import ContextTypes
+
+from app.constants.messages import AdminMessages
+from app.services.catalog_service import CatalogService, catalog_service
+from app.services.profiling_service import ProfileResult, ProfilingService, profiling_service
+from app.utils.logging import logger
+from app.middleware.error_handler import handle_exceptions
+
+
+class AdminHandler:
+    """Handler for admin diagnostics commands (registered for admin ids only)"""
+    
+    def __init__(
+        self,
+        profiler: ProfilingService = profiling_service,
+        default_seconds: int = 30,
+        catalog: CatalogService = catalog_service
+    ):
+        self.profiler = profiler
+        self.catalog = catalog
+        self.default_seconds = default_seconds
+        self.logger = logger.getChild('admin')
+    
+    async def _send_result(self, bot: Bot, chat_id: int, result: ProfileResult) -> None:
+        """Send a profiling result file to the admin"""
+        content = await asyncio.to_thread(result.path.read_bytes)
+        await bot.send_document(
+            chat_id=chat_id,
+            document=content,
+            filename=result.path.name,
+            caption=result.summary[:1024]
+        )
+    
+    async def _profile_and_send(self, bot: Bot, chat_id: int, seconds: int) -> None:
+        """Background task: take the profile and deliver it"""
+        try:
+            result = await self.profiler.profile(seconds)
+            await self._send_result(bot, chat_id, result)
+        except Exception as e:
+            self.logger.error(f"CPU profile for {chat_id} failed: {str(e)}", exc_info=True)
+            await bot.send_message(chat_id=chat_id, text=AdminMessages.PROFILE_FAILED.format(e))
+    
+    @handle_exceptions()
+    async def profile(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /profile [seconds]: sample the bot's stacks and send a collapsed-stack file"""
+        if not update.message:
+            return
+        
+        try:
+            seconds = int(context.args[0]) if context.args else self.default_seconds
+        except ValueError:
+            await update.message.reply_text(AdminMessages.PROFILE_USAGE)
+            return
+        
+        if self.profiler.profiling:
+            await update.message.reply_text(AdminMessages.PROFILE_RUNNING)
+            return
+        
+        seconds = max(1, min(seconds, self.profiler.max_seconds))
+        await update.message.reply_text(AdminMessages.PROFILE_STARTED.format(seconds))
+        # Profiling takes a while; do not hold up the updates queued behind this one
+        context.application.create_task(
+            self._profile_and_send(context.bot, update.effective_chat.id, seconds), update=update
+        )
+        self.logger.info(f"CPU profile requested by admin {update.effective_user.id} for {seconds}s")
+    
+    @handle_exceptions()
+    async def memory_snapshot(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /memsnap [stop]: send top allocation sites and growth since the last snapshot"""
+        if not update.message:
+            return
+        
+        if context.args and context.args[0] == "stop":
+            stopped = self.profiler.stop_memory_tracing()
+            await update.message.reply_text(
+                AdminMessages.MEMORY_TRACING_STOPPED if stopped else AdminMessages.MEMORY_TRACING_NOT_RUNNING
+            )
+            return
+        
+        result = await self.profiler.memory_snapshot()
+        await self._send_result(context.bot, update.effective_chat.id, result)
+        self.logger.info(f"Memory snapshot requested by admin {update.effective_user.id}")
+    
+    @handle_exceptions()
+    async def reload_catalog(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /reload_catalog: drop cached products, lotteries and their keyboards"""
+        if not update.message:
+            return
+        
+        # For catalog edits made outside the bot, which the commit hook cannot see
+        self.catalog.invalidate()
+        await update.message.reply_text(AdminMessages.CATALOG_RELOADED)
+        self.logger.info(f"Catalog reloaded by admin {update.effective_user.id}")
@@ -3,27 +3,36 @@ Cooperation Handler
 Job application and cooperation request management
 """
 
-from telegram import Update, ReplyKeyboardRemove
+from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 
-from app.services.sms_service import SMSService
-from app.services.notification_service import NotificationService
+from app.services.otp_service import OTPService, OTPPurpose, OTPResult
+from app.services.phone_verification_service import PhoneVerificationService
+from app.services.notification_outbox import NotificationOutbox
 from app.services.database import BaseRepository, db_service
 from app.models import Cooperation
-from app.constants.messages import CooperationMessages
+from app.constants.messages import CooperationMessages, ErrorMessages
 from app.constants.conversation_states import ASK_COOPERATION_PHONE, ASK_COOPERATION_OTP, ASK_COOPERATION_CITY, ASK_COOPERATION_RESUME
 from app.utils.validation import InputValidator
 from app.utils.logging import cooperation_logger
+from app.utils.keyboards import keyboards
+from app.utils.conversation_utils import ConversationUtils
 from app.middleware.error_handler import handle_exceptions
-from app.exceptions.base import SMSException, CooperationException
+from app.exceptions.base import SMSException, RateLimitException, CooperationException
 
 
 class CooperationHandler:
     """Handler for cooperation application process"""
     
-    def __init__(self, sms_service: SMSService, notification_service: NotificationService):
-        self.sms_service = sms_service
-        self.notification_service = notification_service
+    def __init__(
+        self,
+        otp_service: OTPService,
+        outbox: NotificationOutbox,
+        phone_verification: PhoneVerificationService
+    ):
+        self.otp_service = otp_service
+        self.outbox = outbox
+        self.phone_verification = phone_verification
         self.cooperation_repository = BaseRepository(Cooperation, db_service)
         self.logger = cooperation_logger
     
@@ -35,7 +44,7 @@ class CooperationHandler:
         
         await update.message.reply_text(
             CooperationMessages.COOPERATION_INTRO,
-            reply_markup=ReplyKeyboardRemove()
+            reply_markup=keyboards.share_contact
         )
         
         return ASK_COOPERATION_PHONE
@@ -43,7 +52,7 @@ class CooperationHandler:
     @handle_exceptions()
     async def handle_phone(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle phone number input and send OTP"""
-        if not update.message or not update.message.text:
+        if not update.message or not update.message.text or not update.effective_user:
             return ASK_COOPERATION_PHONE
         
         phone = update.message.text.strip()
@@ -58,41 +67,67 @@ class CooperationHandler:
             context.user_data = {}
         context.user_data["cooperation_phone"] = normalized_phone
         
+        # Returning users who verified this number recently skip the SMS
+        if await self.phone_verification.is_verified(update.effective_user.id, normalized_phone):
+            await update.message.reply_text(CooperationMessages.PHONE_VERIFIED_ASK_CITY, reply_markup=keyboards.remove)
+            return ASK_COOPERATION_CITY
+        
         # Generate and send OTP
         try:
-            otp = self.sms_service.generate_otp()
-            context.user_data["cooperation_otp"] = otp
-            
-            await self.sms_service.send_otp(normalized_phone, otp)
-            await update.message.reply_text("✅ کد تایید پیامک شد. لطفاً کد را وارد کنید:")
+            await self.otp_service.send_code(
+                OTPPurpose.COOPERATION, normalized_phone, telegram_id=update.effective_user.id
+            )
+            await update.message.reply_text("✅ کد تایید پیامک شد. لطفاً کد را وارد کنید:", reply_markup=keyboards.remove)
             
             self.logger.info(f"Cooperation OTP sent to {normalized_phone}")
             return ASK_COOPERATION_OTP
             
-        except SMSException as e:
+        except (RateLimitException, SMSException) as e:
+            # Keep the conversation so the user can retry later
             await update.message.reply_text(e.user_message)
-            return ConversationHandler.END
+            return ASK_COOPERATION_PHONE
+    
+    @handle_exceptions()
+    async def handle_contact(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle a shared own contact and skip OTP"""
+        phone = ConversationUtils.shared_own_phone(update)
+        if not phone:
+            if update.message:
+                await update.message.reply_text(ErrorMessages.CONTACT_REJECTED, reply_markup=keyboards.share_contact)
+            return ASK_COOPERATION_PHONE
+        
+        if context.user_data is None:
+            context.user_data = {}
+        context.user_data["cooperation_phone"] = phone
+        
+        await self.phone_verification.mark_verified(update.effective_user.id, phone)
+        await update.message.reply_text(CooperationMessages.PHONE_VERIFIED_ASK_CITY, reply_markup=keyboards.remove)
+        return ASK_COOPERATION_CITY
     
     @handle_exceptions()
     async def handle_otp(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle OTP verification"""
-        if not update.message or not update.message.text:
+        if not update.message or not update.message.text or not update.effective_user:
             return ASK_COOPERATION_OTP
         
-        otp_input = update.message.text.strip()
-        expected_otp = context.user_data.get("cooperation_otp") if context.user_data else None
+        phone = context.user_data.get("cooperation_phone") if context.user_data else None
         
-        if not expected_otp:
+        if not phone:
             await update.message.reply_text("❌ کد وارد شده صحیح نیست. لطفا دوباره تلاش کنید:")
             return ASK_COOPERATION_OTP
         
-        is_valid, _ = InputValidator.validate_otp(otp_input, expected_otp)
+        result = self.otp_service.verify(OTPPurpose.COOPERATION, phone, update.message.text)
         
-        if not is_valid:
+        if result in (OTPResult.EXPIRED, OTPResult.LOCKED):
+            await update.message.reply_text(ErrorMessages.OTP_EXPIRED, reply_markup=keyboards.share_contact)
+            return ASK_COOPERATION_PHONE
+        
+        if result is not OTPResult.VALID:
             await update.message.reply_text("❌ کد وارد شده صحیح نیست. لطفا دوباره تلاش کنید:")
             return ASK_COOPERATION_OTP
         
-        await update.message.reply_text(CooperationMessages.ASK_OTP_COOPERATION)
+        await self.phone_verification.mark_verified(update.effective_user.id, phone)
+        await update.message.reply_text(CooperationMessages.PHONE_VERIFIED_ASK_CITY)
         return ASK_COOPERATION_CITY
     
     @handle_exceptions()
@@ -140,8 +175,6 @@ class CooperationHandler:
             return ASK_COOPERATION_RESUME
         
         # Get stored data with safety checks
-        from app.utils.conversation_utils import ConversationUtils
-        
         if not context.user_data:
             await ConversationUtils.handle_conversation_error(
                 update, context, "خطا در اطلاعات. لطفا دوباره شروع کنید: /start"
@@ -165,11 +198,20 @@ class CooperationHandler:
             existing_cooperation = await self.cooperation_repository.get_by_field(
                 "telegram_id", telegram_id
             )
+            notify = lambda cooperation: self.outbox.entry(
+                "cooperation",
+                telegram_id=telegram_id,
+                username=username,
+                phone=phone,
+                city=city,
+                resume_text=normalized_resume
+            )
             
             if existing_cooperation:
                 # Update existing record
                 await self.cooperation_repository.update(
                     existing_cooperation.id,
+                    notify=notify,
                     phone_number=phone,
                     city=city,
                     resume_text=normalized_resume,
@@ -181,6 +223,7 @@ class CooperationHandler:
             else:
                 # Create new record
                 await self.cooperation_repository.create(
+                    notify=notify,
                     telegram_id=telegram_id,
                     username=username,
                     phone_number=phone,
@@ -191,17 +234,7 @@ class CooperationHandler:
                 
                 await update.message.reply_text(CooperationMessages.COOPERATION_SUCCESS)
             
-            # Send notification to admin
-            try:
-                await self.notification_service.send_cooperation_notification(
-                    telegram_id=telegram_id,
-                    username=username,
-                    phone=phone,
-                    city=city,
-                    resume_text=normalized_resume
-                )
-            except Exception as e:
-                self.logger.error(f"Failed to send cooperation notification: {str(e)}")
+            self.outbox.wake()
             
             # Clear user data
             if context.user_data:
@@ -6,24 +6,33 @@ Customer consultation requests and phone verification
 from telegram import Update, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler
 
-from app.services.sms_service import SMSService
-from app.services.notification_service import NotificationService
+from app.services.otp_service import OTPService, OTPPurpose, OTPResult
+from app.services.phone_verification_service import PhoneVerificationService
+from app.services.notification_outbox import NotificationOutbox
 from app.services.database import BaseRepository, db_service
 from app.models import CRM
-from app.constants.messages import CRMMessages
+from app.constants.messages import CRMMessages, ErrorMessages
 from app.constants.conversation_states import ASK_CRM_PHONE, ASK_CRM_OTP
 from app.utils.validation import InputValidator
 from app.utils.logging import crm_logger
+from app.utils.keyboards import keyboards
+from app.utils.conversation_utils import ConversationUtils
 from app.middleware.error_handler import handle_exceptions
-from app.exceptions.base import SMSException
+from app.exceptions.base import SMSException, RateLimitException
 
 
 class CRMHandler:
     """Handler for CRM consultation requests"""
     
-    def __init__(self, sms_service: SMSService, notification_service: NotificationService):
-        self.sms_service = sms_service
-        self.notification_service = notification_service
+    def __init__(
+        self,
+        otp_service: OTPService,
+        outbox: NotificationOutbox,
+        phone_verification: PhoneVerificationService
+    ):
+        self.otp_service = otp_service
+        self.outbox = outbox
+        self.phone_verification = phone_verification
         self.crm_repository = BaseRepository(CRM, db_service)
         self.logger = crm_logger
     
@@ -33,13 +42,13 @@ class CRMHandler:
         if not update.message:
             return ConversationHandler.END
         
-        await update.message.reply_text(CRMMessages.ASK_PHONE)
+        await update.message.reply_text(CRMMessages.ASK_PHONE, reply_markup=keyboards.share_contact)
         return ASK_CRM_PHONE
     
     @handle_exceptions()
     async def handle_phone(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle phone number input and send OTP"""
-        if not update.message or not update.message.text:
+        if not update.message or not update.message.text or not update.effective_user:
             return ASK_CRM_PHONE
         
         phone = update.message.text.strip()
@@ -54,20 +63,40 @@ class CRMHandler:
             context.user_data = {}
         context.user_data["crm_phone"] = normalized_phone
         
+        # Returning users who verified this number recently skip the SMS
+        if await self.phone_verification.is_verified(update.effective_user.id, normalized_phone):
+            return await self._save_request(update, context, normalized_phone)
+        
         # Generate and send OTP
         try:
-            otp = self.sms_service.generate_otp()
-            context.user_data["crm_otp"] = otp
-            
-            await self.sms_service.send_otp(normalized_phone, otp)
-            await update.message.reply_text(CRMMessages.ASK_OTP_CRM)
+            await self.otp_service.send_code(
+                OTPPurpose.CRM, normalized_phone, telegram_id=update.effective_user.id
+            )
+            await update.message.reply_text(CRMMessages.ASK_OTP_CRM, reply_markup=keyboards.remove)
             
             self.logger.info(f"CRM OTP sent to {normalized_phone}")
             return ASK_CRM_OTP
             
-        except SMSException as e:
+        except (RateLimitException, SMSException) as e:
+            # Keep the conversation so the user can retry later
             await update.message.reply_text(e.user_message)
-            return ConversationHandler.END
+            return ASK_CRM_PHONE
+    
+    @handle_exceptions()
+    async def handle_contact(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle a shared own contact and save the request without OTP"""
+        phone = ConversationUtils.shared_own_phone(update)
+        if not phone:
+            if update.message:
+                await update.message.reply_text(ErrorMessages.CONTACT_REJECTED, reply_markup=keyboards.share_contact)
+            return ASK_CRM_PHONE
+        
+        if context.user_data is None:
+            context.user_data = {}
+        context.user_data["crm_phone"] = phone
+        
+        await self.phone_verification.mark_verified(update.effective_user.id, phone)
+        return await self._save_request(update, context, phone)
     
     @handle_exceptions()
     async def handle_otp(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -75,30 +104,42 @@ class CRMHandler:
         if not update.message or not update.message.text or not update.effective_user:
             return ASK_CRM_OTP
         
-        otp_input = update.message.text.strip()
-        expected_otp = context.user_data.get("crm_otp") if context.user_data else None
+        phone = context.user_data.get("crm_phone") if context.user_data else None
         
-        if not expected_otp:
+        if not phone:
             await update.message.reply_text(CRMMessages.INVALID_OTP_CRM)
             return ASK_CRM_OTP
         
-        is_valid, _ = InputValidator.validate_otp(otp_input, expected_otp)
+        result = self.otp_service.verify(OTPPurpose.CRM, phone, update.message.text)
         
-        if not is_valid:
+        if result in (OTPResult.EXPIRED, OTPResult.LOCKED):
+            await update.message.reply_text(ErrorMessages.OTP_EXPIRED, reply_markup=keyboards.share_contact)
+            return ASK_CRM_PHONE
+        
+        if result is not OTPResult.VALID:
             await update.message.reply_text(CRMMessages.INVALID_OTP_CRM)
             return ASK_CRM_OTP
         
-        # Save CRM request
+        await self.phone_verification.mark_verified(update.effective_user.id, phone)
+        return await self._save_request(update, context, phone)
+    
+    async def _save_request(self, update: Update, context: ContextTypes.DEFAULT_TYPE, phone: str):
+        """Save the CRM request for a verified phone"""
         try:
-            phone = context.user_data["crm_phone"]
-            
             # Check if this phone number already exists
             existing_crm = await self.crm_repository.get_by_field("number", phone)
+            notify = lambda crm: self.outbox.entry(
+                "crm",
+                phone=phone,
+                telegram_id=update.effective_user.id,
+                username=update.effective_user.username or ""
+            )
             
             if existing_crm:
                 # Update existing record
                 await self.crm_repository.update(
                     existing_crm.id,
+                    notify=notify,
                     called=False,  # Reset called status for new request
                     notes=None,
                     priority=1
@@ -106,24 +147,16 @@ class CRMHandler:
             else:
                 # Create new CRM record
                 await self.crm_repository.create(
+                    notify=notify,
                     number=phone,
                     called=False,
                     priority=1
                 )
+            self.outbox.wake()
             
             # Send success message
             await update.message.reply_text(CRMMessages.CRM_SUCCESS)
             
-            # Send notification to admin
-            try:
-                await self.notification_service.send_crm_notification(
-                    phone=phone,
-                    telegram_id=update.effective_user.id,
-                    username=update.effective_user.username or ""
-                )
-            except Exception as e:
-                self.logger.error(f"Failed to send CRM notification: {str(e)}")
-            
             self.logger.info(f"CRM request saved for phone {phone}")
             return ConversationHandler.END
             
@@ -145,7 +178,8 @@ class CRMHandler:
         
         await context.bot.send_message(
             chat_id=query.from_user.id,
-            text=CRMMessages.ASK_PHONE
+            text=CRMMessages.ASK_PHONE,
+            reply_markup=keyboards.share_contact
         )
         
         return ASK_CRM_PHONE
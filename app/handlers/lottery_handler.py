@@ -3,27 +3,40 @@ Lottery Handler
 Lottery participation and management
 """
 
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 
-from app.services.sms_service import SMSService
-from app.services.notification_service import NotificationService
+from app.services.otp_service import OTPService, OTPPurpose, OTPResult
+from app.services.phone_verification_service import PhoneVerificationService
+from app.services.notification_outbox import NotificationOutbox
 from app.services.database import BaseRepository, db_service
+from app.services.catalog_service import CatalogService, catalog_service
 from app.models import Lottery, UsersInLottery
-from app.constants.messages import LotteryMessages
+from app.constants.messages import LotteryMessages, ErrorMessages
 from app.constants.conversation_states import ASK_LOTTERY, ASK_LOTTERY_NUMBER, ASK_LOTTERY_OTP
 from app.utils.validation import InputValidator
 from app.utils.logging import lottery_logger
+from app.utils.keyboards import keyboards
+from app.utils.conversation_utils import ConversationUtils
+from app.utils.conversation_state import LotterySelection
 from app.middleware.error_handler import handle_exceptions
-from app.exceptions.base import SMSException, LotteryException
+from app.exceptions.base import SMSException, RateLimitException, LotteryException
 
 
 class LotteryHandler:
     """Handler for lottery operations"""
     
-    def __init__(self, sms_service: SMSService, notification_service: NotificationService):
-        self.sms_service = sms_service
-        self.notification_service = notification_service
+    def __init__(
+        self,
+        otp_service: OTPService,
+        outbox: NotificationOutbox,
+        phone_verification: PhoneVerificationService,
+        catalog: CatalogService = catalog_service
+    ):
+        self.otp_service = otp_service
+        self.outbox = outbox
+        self.phone_verification = phone_verification
+        self.catalog = catalog
         self.lottery_repository = BaseRepository(Lottery, db_service)
         self.users_in_lottery_repository = BaseRepository(UsersInLottery, db_service)
         self.logger = lottery_logger
@@ -36,20 +49,15 @@ class LotteryHandler:
         
         # Get active lotteries
         try:
-            lotteries = await self.lottery_repository.find(is_active=True)
+            lotteries = await self.catalog.get_active_lotteries()
             
             if not lotteries:
                 await update.message.reply_text(LotteryMessages.NO_LOTTERY_ACTIVE)
                 return ConversationHandler.END
             
-            # Create keyboard with lottery options
-            keyboard = [[lottery.name] for lottery in lotteries]
-            keyboard.append(["🔙 بازگشت به منو"])
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-            
             await update.message.reply_text(
                 LotteryMessages.SELECT_LOTTERY,
-                reply_markup=reply_markup
+                reply_markup=keyboards.lottery_keyboard([lottery.name for lottery in lotteries])
             )
             
             return ASK_LOTTERY
@@ -86,7 +94,7 @@ class LotteryHandler:
             # Store selected lottery in context
             if context.user_data is None:
                 context.user_data = {}
-            context.user_data["selected_lottery"] = lottery
+            context.user_data["selected_lottery"] = LotterySelection(lottery_id=lottery.id, name=lottery.name)
             
             # Check if user is already registered for this lottery
             if update.effective_user:
@@ -104,7 +112,7 @@ class LotteryHandler:
             # Show lottery details and ask for phone number
             await update.message.reply_text(
                 LotteryMessages.ASK_PHONE_LOTTERY.format(lottery.name, lottery.description),
-                reply_markup=ReplyKeyboardRemove()
+                reply_markup=keyboards.share_contact
             )
             
             return ASK_LOTTERY_NUMBER
@@ -117,7 +125,7 @@ class LotteryHandler:
     @handle_exceptions()
     async def handle_phone(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle phone number input for lottery"""
-        if not update.message or not update.message.text:
+        if not update.message or not update.message.text or not update.effective_user:
             return ASK_LOTTERY_NUMBER
         
         phone = update.message.text.strip()
@@ -132,20 +140,40 @@ class LotteryHandler:
             context.user_data = {}
         context.user_data["lottery_phone"] = normalized_phone
         
+        # Returning users who verified this number recently skip the SMS
+        if await self.phone_verification.is_verified(update.effective_user.id, normalized_phone):
+            return await self._register(update, context, normalized_phone)
+        
         # Generate and send OTP
         try:
-            otp = self.sms_service.generate_otp()
-            context.user_data["lottery_otp"] = otp
-            
-            await self.sms_service.send_otp(normalized_phone, otp)
-            await update.message.reply_text(LotteryMessages.ASK_OTP_LOTTERY)
+            await self.otp_service.send_code(
+                OTPPurpose.LOTTERY, normalized_phone, telegram_id=update.effective_user.id
+            )
+            await update.message.reply_text(LotteryMessages.ASK_OTP_LOTTERY, reply_markup=keyboards.remove)
             
             self.logger.info(f"Lottery OTP sent to {normalized_phone}")
             return ASK_LOTTERY_OTP
             
-        except SMSException as e:
+        except (RateLimitException, SMSException) as e:
+            # Keep the conversation so the user can retry later
             await update.message.reply_text(e.user_message)
-            return ConversationHandler.END
+            return ASK_LOTTERY_NUMBER
+    
+    @handle_exceptions()
+    async def handle_contact(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle a shared own contact and register without OTP"""
+        phone = ConversationUtils.shared_own_phone(update)
+        if not phone:
+            if update.message:
+                await update.message.reply_text(ErrorMessages.CONTACT_REJECTED, reply_markup=keyboards.share_contact)
+            return ASK_LOTTERY_NUMBER
+        
+        if context.user_data is None:
+            context.user_data = {}
+        context.user_data["lottery_phone"] = phone
+        
+        await self.phone_verification.mark_verified(update.effective_user.id, phone)
+        return await self._register(update, context, phone)
     
     @handle_exceptions()
     async def handle_otp(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -153,22 +181,28 @@ class LotteryHandler:
         if not update.message or not update.message.text or not update.effective_user:
             return ASK_LOTTERY_OTP
         
-        otp_input = update.message.text.strip()
-        expected_otp = context.user_data.get("lottery_otp") if context.user_data else None
+        phone = context.user_data.get("lottery_phone") if context.user_data else None
         
-        if not expected_otp:
+        if not phone:
             await update.message.reply_text(LotteryMessages.INVALID_OTP_LOTTERY)
             return ASK_LOTTERY_OTP
         
-        is_valid, _ = InputValidator.validate_otp(otp_input, expected_otp)
+        result = self.otp_service.verify(OTPPurpose.LOTTERY, phone, update.message.text)
         
-        if not is_valid:
+        if result in (OTPResult.EXPIRED, OTPResult.LOCKED):
+            await update.message.reply_text(ErrorMessages.OTP_EXPIRED, reply_markup=keyboards.share_contact)
+            return ASK_LOTTERY_NUMBER
+        
+        if result is not OTPResult.VALID:
             await update.message.reply_text(LotteryMessages.INVALID_OTP_LOTTERY)
             return ASK_LOTTERY_OTP
         
-        # Register user in lottery
+        await self.phone_verification.mark_verified(update.effective_user.id, phone)
+        return await self._register(update, context, phone)
+    
+    async def _register(self, update: Update, context: ContextTypes.DEFAULT_TYPE, phone: str):
+        """Register the user in the selected lottery with a verified phone"""
         try:
-            phone = context.user_data["lottery_phone"]
             lottery = context.user_data["selected_lottery"]
             telegram_id = update.effective_user.id
             username = update.effective_user.username or ""
@@ -176,7 +210,7 @@ class LotteryHandler:
             # Double-check if user is already registered for this specific lottery
             existing_entries = await self.users_in_lottery_repository.find(
                 telegram_id=telegram_id,
-                lottery_id=lottery.id
+                lottery_id=lottery.lottery_id
             )
             
             if existing_entries:
@@ -190,26 +224,23 @@ class LotteryHandler:
                 telegram_id=telegram_id,
                 username=username,
                 number=phone,
-                lottery_id=lottery.id,
-                is_verified=True
+                lottery_id=lottery.lottery_id,
+                is_verified=True,
+                notify=lambda entry: self.outbox.entry(
+                    "lottery",
+                    lottery_name=lottery.name,
+                    telegram_id=telegram_id,
+                    username=username,
+                    phone=phone
+                )
             )
+            self.outbox.wake()
             
             # Send success message
             await update.message.reply_text(
                 LotteryMessages.LOTTERY_SUCCESS.format(lottery.name, phone, lottery.name)
             )
             
-            # Send notification to admin
-            try:
-                await self.notification_service.send_lottery_notification(
-                    lottery_name=lottery.name,
-                    telegram_id=telegram_id,
-                    username=username,
-                    phone=phone
-                )
-            except Exception as e:
-                self.logger.error(f"Failed to send lottery notification: {str(e)}")
-            
             # Clear user data
             if context.user_data:
                 context.user_data.clear()
@@ -3,12 +3,14 @@ Menu Handler
 Main menu navigation and command handling
 """
 
-from telegram import Update, ReplyKeyboardMarkup
+from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 
 from app.constants.messages import WelcomeMessages, ContactMessages, ErrorMessages
-from app.constants.mappings import MENU_COMMANDS, GRADE_MAP, MAJOR_MAP
+from app.constants.mappings import MENU_COMMANDS, GRADE_MAP, MAJOR_MAP, HIGH_SCHOOL_GRADES
 from app.utils.logging import logger
+from app.utils.keyboards import keyboards
+from app.utils.conversation_state import ProductBrowseState
 from app.middleware.error_handler import handle_exceptions
 
 
@@ -37,21 +39,10 @@ class MenuHandler:
             elif command == "lottery" and self._app_handlers:
                 return await self._app_handlers['lottery'].start_conversation(update, context)
         
-        # Main menu keyboard
-        keyboard = [
-            ["💎 خرید قسطی اشتراک الماس 💎"],
-            ["📚 خرید ویژه محصولات از نمایندگی 📚"],
-            ["💰 درآمد زایی و معرفی دوستان", "💬 مشاوره تلفنی رایگان"],
-            ["💳 اقساط من", "🎲 قرعه کشی"], 
-            ["👩‍💻 پشتیبانی", "🤝 همکاری با نمایندگی"],
-            ["👤 ثبت نام", "💡 راهنما"]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-        
         await update.message.reply_text(
             WelcomeMessages.MAIN_WELCOME,
             parse_mode="Markdown", 
-            reply_markup=reply_markup
+            reply_markup=keyboards.main_menu
         )
         
         self.logger.info(f"Main menu shown to user {update.effective_user.id}")
@@ -87,6 +78,22 @@ class MenuHandler:
             await self.start(update, context)
         return ConversationHandler.END
     
+    @handle_exceptions()
+    async def conversation_timeout(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Clean up after a conversation timed out"""
+        from app.utils.conversation_utils import ConversationUtils
+        
+        ConversationUtils.safe_cleanup_context(context)
+        
+        if update.effective_chat:
+            await context.bot.send_message(
+                update.effective_chat.id,
+                ErrorMessages.CONVERSATION_TIMEOUT,
+                reply_markup=keyboards.main_menu
+            )
+        self.logger.info(f"Conversation timed out for user {update.effective_user.id if update.effective_user else 'unknown'}")
+        return ConversationHandler.END
+    
     @handle_exceptions()
     async def start_and_end_conversation(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start menu and end current conversation"""
@@ -187,9 +194,11 @@ class MenuHandler:
             await self._handle_major_selection(update, context, user_input)
             return
         
-        # Check if it's a product name
-        product_names = context.user_data.get("products", [])
-        if user_input in product_names:
+        # Check if it's a product from the list being browsed; without a browse
+        # state there is no list, so free text never reaches the catalog
+        if context.user_data.get("browse") and await self._product_handler().find_browsed_product(
+            context, user_input
+        ):
             await self._handle_product_selection(update, context, user_input)
             return
         
@@ -199,62 +208,51 @@ class MenuHandler:
     
     async def _handle_almas_subscription(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle Almas subscription selection"""
-        keyboard = [
-            ["پایه دوازدهم"],
-            ["پایه یازدهم"],
-            ["پایه دهم"],
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
         await update.message.reply_text(
             "💎اشتراک الماس رو فقط از طریق نمایندگی تهران میتونی اقساطی تهیه کنی‼️\n\n"
             "🎯دسترسی کامل به خدمات ماز تا روز کنکور \n"
             "💰پرداخت چند مرحله ای بدون بهره \n"
             "🎉دسترسی به خدمات تکمیلی نمایندگی\n\n"
             "🔻برای ادامه پایه تحصیلی خودتو انتخاب کن", 
-            reply_markup=reply_markup
+            reply_markup=keyboards.almas_grades
         )
     
+    def _product_handler(self):
+        """Get the injected product handler"""
+        if self._app_handlers and 'product' in self._app_handlers:
+            return self._app_handlers['product']
+        
+        from app.handlers.product_handler import ProductHandler
+        return ProductHandler(None)
+    
     async def _handle_grade_selection(self, update: Update, context: ContextTypes.DEFAULT_TYPE, grade_text: str):
         """Handle grade selection"""
-        from app.handlers.product_handler import ProductHandler
-        handler = ProductHandler(None)  # Will be properly injected
-        
         selected_grade = GRADE_MAP[grade_text]
-        context.user_data['grade'] = selected_grade
+        context.user_data['browse'] = ProductBrowseState(grade=selected_grade.value)
         
         # Check if major selection is needed
-        from app.models.enums import GradeEnum
-        if selected_grade in [GradeEnum.GRADE_10, GradeEnum.GRADE_11, GradeEnum.GRADE_12]:
-            keyboard = [["ریاضی"], ["تجربی"], ["انسانی"]]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
+        if selected_grade in HIGH_SCHOOL_GRADES:
             await update.message.reply_text(
                 "برای انتخاب رشته مورد نظر خود را انتخاب کنید:",
-                reply_markup=reply_markup
+                reply_markup=keyboards.majors
             )
         else:
-            await handler.show_products(update, context, grade=selected_grade)
+            await self._product_handler().show_products(update, context, grade=selected_grade)
     
     async def _handle_major_selection(self, update: Update, context: ContextTypes.DEFAULT_TYPE, major_text: str):
         """Handle major selection"""
-        from app.handlers.product_handler import ProductHandler
-        handler = ProductHandler(None)  # Will be properly injected
-        
         selected_major = MAJOR_MAP[major_text]
-        grade = context.user_data.get('grade')
+        browse = context.user_data.get('browse')
         
-        if grade:
-            await handler.show_products(update, context, grade=grade, major=selected_major)
+        if browse:
+            await self._product_handler().show_products(update, context, grade=browse.grade_enum, major=selected_major)
         else:
             await update.message.reply_text("لطفا پایه تحصیلی خود را انتخاب کنید.")
-            from app.handlers.product_handler import ProductHandler
-            product_handler = ProductHandler(None)  # Will be properly injected
-            await product_handler.show_products_menu(update, context)
+            await self._product_handler().show_products_menu(update, context)
     
     async def _handle_product_selection(self, update: Update, context: ContextTypes.DEFAULT_TYPE, product_name: str):
         """Handle product selection"""
-        from app.handlers.product_handler import ProductHandler
-        handler = ProductHandler(None)  # Will be properly injected
-        await handler.show_product_details(update, context, product_name)
+        await self._product_handler().show_product_details(update, context, product_name)
     
     @handle_exceptions()
     async def handle_button(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
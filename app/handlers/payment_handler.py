@@ -5,19 +5,22 @@ Purchase process, installments, and receipt management
 
 import os
 from datetime import datetime
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 
 from app.services.user_service import UserService
-from app.services.notification_service import NotificationService
+from app.services.notification_outbox import NotificationOutbox
 from app.services.database import BaseRepository, db_service
-from app.models import Product, ReferralCode, Order, File
+from app.services.catalog_service import CatalogService, catalog_service
+from app.models import ReferralCode, Order, File, Seller
 from app.models.enums import GradeEnum, OrderStatusEnum, ReferralCodeProductEnum
 from app.constants.messages import ProductMessages, PaymentMessages, InstallmentMessages, ErrorMessages
 from app.constants.conversation_states import ASK_REFERRAL_CODE, ASK_PAYMENT_METHOD, ASK_PAYMENT_PROOF, ASK_RECEIPT_INSTALLMENT
 from app.constants.mappings import HIGH_SCHOOL_GRADES
 from app.config.settings import config
 from app.utils.logging import payment_logger
+from app.utils.keyboards import keyboards
+from app.utils.conversation_state import PurchaseState, InstallmentUploadState
 from app.middleware.error_handler import handle_exceptions
 from app.exceptions.base import UserNotRegisteredException, ProductNotFoundException, ValidationException
 
@@ -25,13 +28,19 @@ from app.exceptions.base import UserNotRegisteredException, ProductNotFoundExcep
 class PaymentHandler:
     """Handler for payment and purchase operations"""
     
-    def __init__(self, user_service: UserService, notification_service: NotificationService):
+    def __init__(
+        self,
+        user_service: UserService,
+        outbox: NotificationOutbox,
+        catalog: CatalogService = catalog_service
+    ):
         self.user_service = user_service
-        self.notification_service = notification_service
-        self.product_repository = BaseRepository(Product, db_service)
+        self.outbox = outbox
+        self.catalog = catalog
         self.referral_repository = BaseRepository(ReferralCode, db_service)
         self.order_repository = BaseRepository(Order, db_service)
         self.file_repository = BaseRepository(File, db_service)
+        self.seller_repository = BaseRepository(Seller, db_service)
         self.logger = payment_logger
     
     @handle_exceptions()
@@ -54,42 +63,28 @@ class PaymentHandler:
         try:
             user = await self.user_service.require_registered_user(update.effective_user.id)
         except UserNotRegisteredException:
-            keyboard = [
-                [InlineKeyboardButton("👤 ثبت نام", callback_data="authorize")],
-                [InlineKeyboardButton("هنوز مطمعن نیستم", callback_data="not_sure")],
-                [InlineKeyboardButton("🔙 بازگشت به منو", callback_data="back_to_menu")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
             await query.edit_message_text(
                 ProductMessages.NOT_REGISTERED,
-                reply_markup=reply_markup
+                reply_markup=keyboards.not_registered
             )
             return ConversationHandler.END
         
         # Get product details
-        product = await self.product_repository.get_by_id(product_id)
+        product = await self.catalog.get_product(product_id)
         if not product:
             await query.edit_message_text("محصول مورد نظر یافت نشد")
             return ConversationHandler.END
         
-        # Store purchase context
+        # Store purchase context (product details are rehydrated from the catalog)
         if context.user_data is None:
             context.user_data = {}
-        context.user_data['current_product_id'] = product_id
-        context.user_data['product_data'] = product
+        context.user_data['purchase'] = PurchaseState(product_id=product.id)
         
         # Ask about referral code
-        keyboard = [
-            ["کد معرف دارم"],
-            ["کد معرف ندارم"]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-        
         await context.bot.send_message(
             chat_id=update.effective_user.id,
             text=ProductMessages.ASK_REFERRAL_CODE,
-            reply_markup=reply_markup
+            reply_markup=keyboards.referral_choice
         )
         
         return ASK_REFERRAL_CODE
@@ -101,25 +96,31 @@ class PaymentHandler:
             return ASK_REFERRAL_CODE
         
         user_input = update.message.text.strip()
+        purchase = self._get_purchase(context)
+        
+        if not purchase:
+            await update.message.reply_text(ErrorMessages.MISSING_PRODUCT_INFO)
+            return ConversationHandler.END
         
         if user_input == "کد معرف دارم":
             await update.message.reply_text("لطفا کد معرف خود را وارد کنید:")
-            if context.user_data is None:
-                context.user_data = {}
-            context.user_data['waiting_for_referral_code'] = True
+            purchase.waiting_for_referral_code = True
             return ASK_REFERRAL_CODE
             
         elif user_input == "کد معرف ندارم":
-            if context.user_data is None:
-                context.user_data = {}
-            context.user_data['waiting_for_referral_code'] = False
+            purchase.waiting_for_referral_code = False
             return await self._process_order_without_referral(update, context)
             
-        elif context.user_data and context.user_data.get('waiting_for_referral_code'):
+        elif purchase.waiting_for_referral_code:
             return await self._process_order_with_referral(update, context, user_input)
         
         return ASK_REFERRAL_CODE
     
+    @staticmethod
+    def _get_purchase(context: ContextTypes.DEFAULT_TYPE):
+        """Get the in-progress purchase state, if any"""
+        return context.user_data.get('purchase') if context.user_data else None
+    
     async def _process_order_with_referral(self, update: Update, context: ContextTypes.DEFAULT_TYPE, referral_code: str):
         """Process order with referral code"""
         if not update.effective_user or not update.message:
@@ -133,43 +134,38 @@ class PaymentHandler:
                 await update.message.reply_text(ProductMessages.INVALID_REFERRAL_CODE)
                 return ASK_REFERRAL_CODE
             
+            purchase = self._get_purchase(context)
+            if not purchase:
+                await update.message.reply_text(ErrorMessages.MISSING_PRODUCT_INFO)
+                return ConversationHandler.END
+            
             # Store referral data
-            if context.user_data is None:
-                context.user_data = {}
-            context.user_data['referral'] = referral_code
-            context.user_data['referral_data'] = referral
-            context.user_data['waiting_for_referral_code'] = False
+            purchase.referral_code = referral.code
+            purchase.seller_id = referral.owner_id
+            purchase.referral_product = referral.product.value
+            purchase.referral_installment = referral.installment
+            purchase.waiting_for_referral_code = False
             
-            product = context.user_data.get('product_data')
+            product = await self.catalog.get_product(purchase.product_id)
             
             # Check payment options based on product and referral
             if (product and product.grade in HIGH_SCHOOL_GRADES and 
                 referral.product == ReferralCodeProductEnum.ALMAS):
                 
                 if referral.installment:
-                    keyboard = [
-                        ["پرداخت قسطی"],
-                        ["پرداخت نقدی"]
-                    ]
-                    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
                     await update.message.reply_text(
                         ProductMessages.SELECT_PAYMENT_METHOD,
-                        reply_markup=reply_markup
+                        reply_markup=keyboards.payment_methods
                     )
                     return ASK_PAYMENT_METHOD
                 else:
-                    keyboard = [
-                        ["پرداخت نقدی"],
-                        ["🔙 بازگشت به منو"]
-                    ]
-                    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
                     await update.message.reply_text(
                         ProductMessages.INSTALLMENT_OPTION_UNAVAILABLE,
-                        reply_markup=reply_markup
+                        reply_markup=keyboards.cash_only
                     )
                     return await self._ask_for_payment_proof(update, context)
             else:
-                context.user_data['payment_type'] = 'cash'
+                purchase.payment_type = 'cash'
                 return await self._ask_for_payment_proof(update, context)
                 
         except Exception as e:
@@ -182,28 +178,27 @@ class PaymentHandler:
         if not update.effective_user or not update.message:
             return ConversationHandler.END
         
-        if context.user_data is None:
-            context.user_data = {}
+        purchase = self._get_purchase(context)
+        if not purchase:
+            await update.message.reply_text(ErrorMessages.MISSING_PRODUCT_INFO)
+            return ConversationHandler.END
         
-        product = context.user_data.get('product_data')
-        context.user_data['referral'] = None
-        context.user_data['referral_data'] = None
-        context.user_data['waiting_for_referral_code'] = False
+        product = await self.catalog.get_product(purchase.product_id)
+        purchase.referral_code = None
+        purchase.seller_id = None
+        purchase.referral_product = None
+        purchase.referral_installment = False
+        purchase.waiting_for_referral_code = False
         
         # Check if installment is allowed for high school grades
         if product and product.grade in HIGH_SCHOOL_GRADES:
-            keyboard = [
-                ["پرداخت قسطی"],
-                ["پرداخت نقدی"]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
             await update.message.reply_text(
                 ProductMessages.SELECT_PAYMENT_METHOD,
-                reply_markup=reply_markup
+                reply_markup=keyboards.payment_methods
             )
             return ASK_PAYMENT_METHOD
         else:
-            context.user_data['payment_type'] = 'cash'
+            purchase.payment_type = 'cash'
             return await self._ask_for_payment_proof(update, context)
     
     @handle_exceptions()
@@ -218,10 +213,12 @@ class PaymentHandler:
             await update.message.reply_text("❌ لطفا یکی از گزینه‌های پرداخت را انتخاب کنید.")
             return ASK_PAYMENT_METHOD
         
-        if context.user_data is None:
-            context.user_data = {}
+        purchase = self._get_purchase(context)
+        if not purchase:
+            await update.message.reply_text(ErrorMessages.MISSING_PRODUCT_INFO)
+            return ConversationHandler.END
         
-        context.user_data['payment_type'] = 'installment' if payment_type == "پرداخت قسطی" else 'cash'
+        purchase.payment_type = 'installment' if payment_type == "پرداخت قسطی" else 'cash'
         return await self._ask_for_payment_proof(update, context)
     
     async def _ask_for_payment_proof(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -229,23 +226,19 @@ class PaymentHandler:
         if not update.message:
             return ConversationHandler.END
         
-        if context.user_data is None:
-            context.user_data = {}
-        
-        product = context.user_data.get("product_data")
+        purchase = self._get_purchase(context)
+        product = await self.catalog.get_product(purchase.product_id) if purchase else None
         if not product:
             await update.message.reply_text(ErrorMessages.MISSING_PRODUCT_INFO)
             return ConversationHandler.END
         
-        referral = context.user_data.get("referral_data")
-        
         # Final price is always the product price (no discounts)
         final_price = product.price
-        is_installment = context.user_data.get('payment_type') == 'installment'
+        is_installment = purchase.is_installment
         
         # Store pricing information
-        context.user_data['final_price'] = final_price
-        context.user_data['first_installment'] = final_price // 2 if is_installment else final_price
+        purchase.final_price = final_price
+        purchase.first_installment = final_price // 2 if is_installment else final_price
         
         # Send payment instructions
         if is_installment:
@@ -260,7 +253,7 @@ class PaymentHandler:
                 config.payment.card_holder_name
             )
         
-        await update.message.reply_text(message, reply_markup=ReplyKeyboardRemove())
+        await update.message.reply_text(message, reply_markup=keyboards.remove)
         return ASK_PAYMENT_PROOF
     
     @handle_exceptions()
@@ -272,9 +265,7 @@ class PaymentHandler:
             return ASK_PAYMENT_PROOF
         
         # Handle installment receipt upload
-        if (context.user_data and 
-            "upload_order_id" in context.user_data and 
-            "upload_installment_index" in context.user_data):
+        if context.user_data and context.user_data.get("installment_upload"):
             return await self._handle_installment_receipt(update, context)
         
         # Handle initial purchase receipt
@@ -302,14 +293,14 @@ class PaymentHandler:
             user = await self.user_service.require_registered_user(update.effective_user.id)
             
             # Get order data from context with safety checks
-            if not context.user_data:
+            purchase = self._get_purchase(context)
+            if not purchase:
                 await update.message.reply_text(ErrorMessages.ORDER_DATA_INCOMPLETE)
                 return ConversationHandler.END
                 
-            product = context.user_data.get("product_data")
-            referral = context.user_data.get("referral_data")
-            final_price = context.user_data.get("final_price")
-            is_installment = context.user_data.get("payment_type") == "installment"
+            product = await self.catalog.get_product(purchase.product_id)
+            final_price = purchase.final_price
+            is_installment = purchase.is_installment
             
             if not product or final_price is None:
                 await update.message.reply_text(ErrorMessages.ORDER_DATA_INCOMPLETE)
@@ -326,18 +317,39 @@ class PaymentHandler:
                 await update.message.reply_text("❌ خطا در ثبت اطلاعات فایل. لطفا دوباره تلاش کنید.")
                 return ConversationHandler.END
             
+            # The referring seller is told about the order too
+            seller = await self.seller_repository.get_by_id(purchase.seller_id) if purchase.seller_id else None
+            seller_chat_id = seller.telegram_id if seller and seller.is_active else None
+            
+            def notify(order):
+                details = dict(
+                    order_id=order.id,
+                    user_id=user.telegram_id,
+                    username=user.username,
+                    product_name=product.name,
+                    final_price=final_price,
+                    payment_type="installment" if is_installment else "cash",
+                    referral_code=purchase.referral_code
+                )
+                # The seller's copy is its own entry so an admin retry never resends it
+                entries = [self.outbox.entry("order", **details)]
+                if seller_chat_id:
+                    entries.append(self.outbox.entry("seller_order", seller_chat_id=seller_chat_id, **details))
+                return entries
+            
             # Create order with seller linking (no discounts)
             try:
-                seller_id = referral.owner_id if referral else None
                 order = await self.order_repository.create(
                     user_id=user.id,
                     product_id=product.id,
                     status=OrderStatusEnum.PENDING,
-                    seller_id=seller_id,  # Link to seller for tracking
+                    seller_id=purchase.seller_id,  # Link to seller for tracking
                     final_price=final_price,  # Always equals product.price
                     installment=is_installment,
-                    referral_code=referral.code if referral else None
+                    referral_code=purchase.referral_code,
+                    notify=notify
                 )
+                self.outbox.wake()
             except Exception as e:
                 self.logger.error(f"Error creating order: {str(e)}")
                 await update.message.reply_text("❌ خطا در ثبت سفارش. لطفا دوباره تلاش کنید.")
@@ -348,20 +360,6 @@ class PaymentHandler:
             # Send success message
             await update.message.reply_text(ProductMessages.ORDER_SUCCESS)
             
-            # Send notification to admin
-            try:
-                await self.notification_service.send_order_notification(
-                    order_id=order.id,
-                    user_id=user.telegram_id,
-                    username=user.username,
-                    product_name=product.name,
-                    final_price=final_price,
-                    payment_type="installment" if is_installment else "cash",
-                    referral_code=referral.code if referral else None
-                )
-            except Exception as e:
-                self.logger.error(f"Failed to send order notification: {str(e)}")
-            
             self.logger.info(f"Order created: {order.id} for user {user.telegram_id}")
             return ConversationHandler.END
             
@@ -376,12 +374,13 @@ class PaymentHandler:
         file_id = photo.file_id
         
         # Get installment context with safety checks
-        if not context.user_data or "upload_order_id" not in context.user_data:
+        upload = context.user_data.get("installment_upload") if context.user_data else None
+        if not upload:
             await update.message.reply_text("❌ خطا در اطلاعات قسط. لطفا دوباره تلاش کنید.")
             return ConversationHandler.END
             
-        order_id = context.user_data["upload_order_id"]
-        installment_index = context.user_data["upload_installment_index"]
+        order_id = upload.order_id
+        installment_index = upload.installment_index
         
         # Download and save file with error handling
         try:
@@ -410,33 +409,30 @@ class PaymentHandler:
                 file_type="image/jpeg"
             )
             
-            # Mark installment as paid
+            # Mark installment as paid and notify the admin in the same transaction
+            user = await self.user_service.get_user_by_telegram_id(update.effective_user.id)
+            product = await self.catalog.get_product(order.product_id)
+            notify = None
+            if user and product:
+                notify = lambda paid_order: self.outbox.entry(
+                    "installment",
+                    order_id=paid_order.id,
+                    installment_index=installment_index,
+                    user_id=user.telegram_id,
+                    username=user.username,
+                    product_name=product.name
+                )
+            
             order.mark_installment_paid(installment_index)
-            await self.order_repository.update(order.id, **order.to_dict())
+            await self.order_repository.update(order.id, notify=notify, **order.to_dict())
+            self.outbox.wake()
             
             await update.message.reply_text(
                 InstallmentMessages.RECEIPT_UPLOADED.format(installment_index)
             )
             
-            # Send notification to admin
-            try:
-                user = await self.user_service.get_user_by_telegram_id(update.effective_user.id)
-                product = await self.product_repository.get_by_id(order.product_id)
-                
-                if user and product:
-                    await self.notification_service.send_installment_notification(
-                        order_id=order.id,
-                        installment_index=installment_index,
-                        user_id=user.telegram_id,
-                        username=user.username,
-                        product_name=product.name
-                    )
-            except Exception as e:
-                self.logger.error(f"Failed to send installment notification: {str(e)}")
-            
             # Clear context
-            del context.user_data["upload_order_id"]
-            del context.user_data["upload_installment_index"]
+            del context.user_data["installment_upload"]
             
             return ConversationHandler.END
             
@@ -464,7 +460,7 @@ class PaymentHandler:
             # Create keyboard with orders
             keyboard = []
             for order in orders:
-                product = await self.product_repository.get_by_id(order.product_id)
+                product = await self.catalog.get_product(order.product_id)
                 if product:
                     keyboard.append([
                         InlineKeyboardButton(
@@ -503,7 +499,7 @@ class PaymentHandler:
                 await query.edit_message_text(InstallmentMessages.ORDER_NOT_FOUND)
                 return
             
-            product = await self.product_repository.get_by_id(order.product_id)
+            product = await self.catalog.get_product(order.product_id)
             if not product:
                 await query.edit_message_text(InstallmentMessages.PRODUCT_NOT_FOUND_INSTALLMENT)
                 return
@@ -581,8 +577,10 @@ class PaymentHandler:
             if context.user_data is None:
                 context.user_data = {}
                 
-            context.user_data["upload_order_id"] = int(order_id)
-            context.user_data["upload_installment_index"] = int(index)
+            context.user_data["installment_upload"] = InstallmentUploadState(
+                order_id=int(order_id),
+                installment_index=int(index)
+            )
             
             await query.edit_message_text(f"📸 لطفاً رسید قسط {index} را ارسال کنید.")
             return ASK_RECEIPT_INSTALLMENT
@@ -3,14 +3,17 @@ Product Handler
 Product browsing and selection
 """
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
+from typing import Optional
+
+from telegram import Update
 from telegram.ext import ContextTypes
 
 from app.services.user_service import UserService
-from app.services.database import BaseRepository, db_service
-from app.models import Product
+from app.services.catalog_service import CatalogService, ProductInfo, catalog_service
 from app.constants.messages import ProductMessages
 from app.utils.logging import product_logger
+from app.utils.keyboards import keyboards
+from app.utils.conversation_state import ProductBrowseState
 from app.middleware.error_handler import handle_exceptions
 from app.exceptions.base import ProductNotFoundException
 
@@ -18,9 +21,9 @@ from app.exceptions.base import ProductNotFoundException
 class ProductHandler:
     """Handler for product-related operations"""
     
-    def __init__(self, user_service: UserService):
+    def __init__(self, user_service: UserService, catalog: CatalogService = catalog_service):
         self.user_service = user_service
-        self.product_repository = BaseRepository(Product, db_service)
+        self.catalog = catalog
         self.logger = product_logger
     
     @handle_exceptions()
@@ -29,20 +32,9 @@ class ProductHandler:
         if not update.message:
             return
         
-        keyboard = [
-            ["پایه دوازدهم"],
-            ["پایه یازدهم"],
-            ["پایه دهم"],
-            ["پایه نهم"],
-            ["پایه هشتم"],
-            ["پایه هفتم"],
-            ["پایه ششم"],
-            ["پایه پنجم"],
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
         await update.message.reply_text(
             ProductMessages.GRADE_SELECTION,
-            reply_markup=reply_markup
+            reply_markup=keyboards.product_grades
         )
         
         self.logger.info(f"Products menu shown to user {update.effective_user.id}")
@@ -54,30 +46,25 @@ class ProductHandler:
             return
         
         try:
-            # Get products from database
-            filters = {"grade": grade}
-            if major:
-                filters["major"] = major
-            
-            products = await self.product_repository.find(**filters)
+            # Get products from the catalog cache
+            products = await self.catalog.get_products(grade, major)
             
             if not products:
                 await update.message.reply_text(ProductMessages.NO_PRODUCTS_FOUND)
                 await self.show_products_menu(update, context)
                 return
             
-            # Store product names in context for later reference
+            # Remember what the user is browsing; names are looked up in the catalog
             if context.user_data is None:
                 context.user_data = {}
-            context.user_data["products"] = [p.name for p in products]
-            
-            # Create keyboard with product names
-            keyboard = [[p.name] for p in products]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+            context.user_data["browse"] = ProductBrowseState(
+                grade=grade.value,
+                major=major.value if major else None
+            )
             
             await update.message.reply_text(
                 ProductMessages.PRODUCT_SELECTION,
-                reply_markup=reply_markup
+                reply_markup=keyboards.product_keyboard(grade, major, [p.name for p in products])
             )
             
             self.logger.info(f"Showed {len(products)} products for grade {grade.name}")
@@ -86,6 +73,15 @@ class ProductHandler:
             self.logger.error(f"Error showing products: {str(e)}")
             await update.message.reply_text(ProductMessages.NO_PRODUCTS_FOUND)
     
+    async def find_browsed_product(self, context: ContextTypes.DEFAULT_TYPE, product_name: str) -> Optional[ProductInfo]:
+        """Get a product from the list the user is currently browsing"""
+        browse = context.user_data.get("browse") if context.user_data else None
+        if not browse:
+            return None
+        
+        products = await self.catalog.get_products(browse.grade_enum, browse.major_enum)
+        return next((p for p in products if p.name == product_name), None)
+    
     @handle_exceptions()
     async def show_product_details(self, update: Update, context: ContextTypes.DEFAULT_TYPE, product_name: str):
         """Show details for a specific product"""
@@ -94,19 +90,12 @@ class ProductHandler:
         
         try:
             # Get product by name
-            product = await self.product_repository.get_by_field("name", product_name)
+            product = await self.catalog.get_product_by_name(product_name)
             
             if not product:
                 await update.message.reply_text(ProductMessages.PRODUCT_NOT_FOUND)
                 return
             
-            # Create inline keyboard with buy button
-            keyboard = [
-                [InlineKeyboardButton("🛒 خرید", callback_data=f"buy_{product.id}")],
-                [InlineKeyboardButton("🔙 بازگشت به منو", callback_data="back_to_menu")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
             # Format product details
             product_text = (
                 f"جزییات محصول:\n{product.description}\n"
@@ -115,7 +104,7 @@ class ProductHandler:
             
             await update.message.reply_text(
                 product_text,
-                reply_markup=reply_markup
+                reply_markup=keyboards.product_details(product.id)
             )
             
             self.logger.info(f"Product details shown: {product_name}")
@@ -3,27 +3,37 @@ Registration Handler
 User registration and OTP verification
 """
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
+from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 
 from app.services.user_service import UserService
-from app.services.sms_service import SMSService
-from app.services.notification_service import NotificationService
-from app.constants.messages import RegistrationMessages
+from app.services.otp_service import OTPService, OTPPurpose, OTPResult
+from app.services.phone_verification_service import PhoneVerificationService
+from app.services.notification_outbox import NotificationOutbox
+from app.constants.messages import RegistrationMessages, ErrorMessages
 from app.constants.conversation_states import ASK_NAME, ASK_CITY, ASK_AREA, ASK_ID, ASK_PHONE, ASK_OTP
 from app.utils.validation import InputValidator
 from app.utils.logging import auth_logger
+from app.utils.keyboards import keyboards
+from app.utils.conversation_utils import ConversationUtils
 from app.middleware.error_handler import handle_exceptions
-from app.exceptions.base import ValidationException, SMSException
+from app.exceptions.base import ValidationException, SMSException, RateLimitException
 
 
 class RegistrationHandler:
     """Handler for user registration process"""
     
-    def __init__(self, user_service: UserService, sms_service: SMSService, notification_service: NotificationService):
+    def __init__(
+        self,
+        user_service: UserService,
+        otp_service: OTPService,
+        outbox: NotificationOutbox,
+        phone_verification: PhoneVerificationService
+    ):
         self.user_service = user_service
-        self.sms_service = sms_service
-        self.notification_service = notification_service
+        self.otp_service = otp_service
+        self.phone_verification = phone_verification
+        self.outbox = outbox
         self.logger = auth_logger
     
     @handle_exceptions()
@@ -63,9 +73,7 @@ class RegistrationHandler:
     
     async def _ask_city(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Ask for city selection"""
-        keyboard = [["تهران"]]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
-        await update.message.reply_text(RegistrationMessages.ASK_CITY, reply_markup=reply_markup)
+        await update.message.reply_text(RegistrationMessages.ASK_CITY, reply_markup=keyboards.registration_city)
     
     @handle_exceptions()
     async def handle_city(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -127,13 +135,13 @@ class RegistrationHandler:
             context.user_data = {}
         context.user_data["national_id"] = normalized_id
         
-        await update.message.reply_text(RegistrationMessages.ASK_PHONE)
+        await update.message.reply_text(RegistrationMessages.ASK_PHONE, reply_markup=keyboards.share_contact)
         return ASK_PHONE
     
     @handle_exceptions()
     async def handle_phone(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle phone input and send OTP"""
-        if not update.message or not update.message.text:
+        if not update.message or not update.message.text or not update.effective_user:
             return ASK_PHONE
         
         phone = update.message.text.strip()
@@ -150,18 +158,34 @@ class RegistrationHandler:
         
         # Generate and send OTP
         try:
-            otp = self.sms_service.generate_otp()
-            context.user_data["otp"] = otp
-            
-            await self.sms_service.send_otp(normalized_phone, otp)
-            await update.message.reply_text(RegistrationMessages.ASK_OTP)
+            await self.otp_service.send_code(
+                OTPPurpose.REGISTRATION, normalized_phone, telegram_id=update.effective_user.id
+            )
+            await update.message.reply_text(RegistrationMessages.ASK_OTP, reply_markup=keyboards.remove)
             
             self.logger.info(f"OTP sent to {normalized_phone} for user {update.effective_user.id}")
             return ASK_OTP
             
-        except SMSException as e:
+        except (RateLimitException, SMSException) as e:
+            # Keep the conversation so the user can retry later
             await update.message.reply_text(e.user_message)
-            return ConversationHandler.END
+            return ASK_PHONE
+    
+    @handle_exceptions()
+    async def handle_contact(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle a shared own contact and complete registration without OTP"""
+        phone = ConversationUtils.shared_own_phone(update)
+        if not phone:
+            if update.message:
+                await update.message.reply_text(ErrorMessages.CONTACT_REJECTED, reply_markup=keyboards.share_contact)
+            return ASK_PHONE
+        
+        if context.user_data is None:
+            context.user_data = {}
+        context.user_data["phone"] = phone
+        
+        self.logger.info(f"Phone {phone} verified by shared contact for user {update.effective_user.id}")
+        return await self._complete_registration(update, context)
     
     @handle_exceptions()
     async def handle_otp(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -169,20 +193,26 @@ class RegistrationHandler:
         if not update.message or not update.message.text or not update.effective_user:
             return ASK_OTP
         
-        otp_input = update.message.text.strip()
-        expected_otp = context.user_data.get("otp") if context.user_data else None
+        phone = context.user_data.get("phone") if context.user_data else None
         
-        if not expected_otp:
+        if not phone:
             await update.message.reply_text(RegistrationMessages.INVALID_OTP)
             return ConversationHandler.END
         
-        is_valid, normalized_otp = InputValidator.validate_otp(otp_input, expected_otp)
+        result = self.otp_service.verify(OTPPurpose.REGISTRATION, phone, update.message.text)
         
-        if not is_valid:
+        if result in (OTPResult.EXPIRED, OTPResult.LOCKED):
+            await update.message.reply_text(ErrorMessages.OTP_EXPIRED, reply_markup=keyboards.share_contact)
+            return ASK_PHONE
+        
+        if result is not OTPResult.VALID:
             await update.message.reply_text(RegistrationMessages.INVALID_OTP)
             return ConversationHandler.END
         
-        # Complete registration
+        return await self._complete_registration(update, context)
+    
+    async def _complete_registration(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Complete registration once the phone is verified"""
         try:
             user = await self.user_service.complete_registration(
                 telegram_id=update.effective_user.id,
@@ -191,15 +221,9 @@ class RegistrationHandler:
                 city=context.user_data["city"],
                 area=context.user_data["area"],
                 national_id=context.user_data["national_id"],
-                phone=context.user_data["phone"]
-            )
-            
-            # Send success message
-            await update.message.reply_text(RegistrationMessages.REGISTRATION_SUCCESS)
-            
-            # Send notification to admin
-            try:
-                await self.notification_service.send_registration_notification(
+                phone=context.user_data["phone"],
+                notify=lambda user: self.outbox.entry(
+                    "registration",
                     user_id=user.id,
                     telegram_id=user.telegram_id,
                     username=user.username,
@@ -207,8 +231,14 @@ class RegistrationHandler:
                     phone=user.number,
                     area=user.area
                 )
-            except Exception as e:
-                self.logger.error(f"Failed to send registration notification: {str(e)}")
+            )
+            self.outbox.wake()
+            
+            # The registered number counts as verified for later flows
+            await self.phone_verification.mark_verified(user.telegram_id, user.number)
+            
+            # Send success message
+            await update.message.reply_text(RegistrationMessages.REGISTRATION_SUCCESS)
             
             # Show main menu
             from app.handlers.menu_handler import MenuHandler
@@ -8,18 +8,37 @@ import signal
 import sys
 from typing import Optional
 
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, CallbackQueryHandler, ConversationHandler, filters
+from telegram import Update
+from telegram.request import BaseRequest
+from telegram.ext import (
+    ApplicationBuilder, CommandHandler, MessageHandler, CallbackQueryHandler, ConversationHandler,
+    TypeHandler, filters
+)
 
 # Import configuration and services
 from app.config.settings import config
 from app.services.database import db_service
 from app.services.user_service import user_service
 from app.services.sms_service import sms_service
+from app.services.sms_dispatcher import sms_dispatcher
+from app.services.sms_delivery_service import sms_delivery_tracker
+from app.services.otp_service import otp_service
+from app.services.phone_verification_service import phone_verification_service
 from app.services.notification_service import notification_service
+from app.services.notification_outbox import notification_outbox
+from app.services.error_aggregator import error_aggregator
+from app.services.catalog_service import catalog_service
+from app.services.persistence_service import persistence
+from app.services.conversation_service import conversation_service
+from app.services.catch_up_service import catch_up_service, ALLOWED_UPDATES
+from app.services.metrics_service import metrics_server
+from app.services.health_service import health_service
+from app.services.loop_monitor import loop_monitor
+from app.services.profiling_service import profiling_service
 
 # Import middleware and utilities
 from app.middleware.error_handler import ErrorHandler
-from app.utils.logging import logger, main_logger
+from app.utils.logging import logger, main_logger, bind_log_context
 from app.constants.conversation_states import *
 
 # Import handlers
@@ -31,6 +50,7 @@ try:
     from app.handlers.lottery_handler import LotteryHandler
     from app.handlers.cooperation_handler import CooperationHandler
     from app.handlers.menu_handler import MenuHandler
+    from app.handlers.admin_handler import AdminHandler
 except ImportError as e:
     logger.error(f"Failed to import handlers: {e}")
     raise ConfigurationException("handler_import", f"Handler import failed: {e}")
@@ -42,11 +62,19 @@ from app.exceptions.base import ConfigurationException
 class TelegramBotApplication:
     """Main application class for the Telegram bot"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        request: Optional[BaseRequest] = None,
+        get_updates_request: Optional[BaseRequest] = None
+    ):
+        # Custom Bot API transports, e.g. an offline one for benchmarks
+        self._request = request
+        self._get_updates_request = get_updates_request
         self.application = None
         self.handlers = {}
         self._initialized = False
         self._shutdown_requested = False
+        self._stop_event = asyncio.Event()
     
     async def initialize(self) -> None:
         """Initialize the application and all services"""
@@ -66,7 +94,14 @@ class TelegramBotApplication:
             logger.info("Database service initialized")
             
             # Initialize Telegram application
-            self.application = ApplicationBuilder().token(config.telegram.bot_token).build()
+            builder = ApplicationBuilder().token(config.telegram.bot_token).get_updates_request(
+                self._get_updates_request or health_service.polling_request()
+            )
+            if self._request is not None:
+                builder = builder.request(self._request)
+            if config.persistence.enabled:
+                builder = builder.persistence(persistence)
+            self.application = builder.build()
             logger.info("Telegram application initialized")
             
             # Initialize handlers with dependency injection
@@ -81,6 +116,13 @@ class TelegramBotApplication:
             # Setup error handling
             self.application.add_error_handler(ErrorHandler.handle_error)
             
+            # Admin notifications go out through this application's bot
+            notification_service.attach_bot(self.application.bot)
+            
+            # Health probes are served next to /metrics
+            metrics_server.route("/healthz", health_service.liveness)
+            metrics_server.route("/readyz", health_service.readiness)
+            
             self._initialized = True
             logger.info("Application initialized successfully")
             
@@ -96,12 +138,19 @@ class TelegramBotApplication:
         
         # Initialize handlers with services
         self.handlers = {
-            'registration': RegistrationHandler(user_service, sms_service, notification_service),
-            'product': ProductHandler(user_service),
-            'payment': PaymentHandler(user_service, notification_service),
-            'crm': CRMHandler(sms_service, notification_service),
-            'lottery': LotteryHandler(sms_service, notification_service),
-            'cooperation': CooperationHandler(sms_service, notification_service),
+            'registration': RegistrationHandler(
+                user_service, otp_service, notification_outbox, phone_verification_service
+            ),
+            'product': ProductHandler(user_service, catalog_service),
+            'payment': PaymentHandler(user_service, notification_outbox, catalog_service),
+            'crm': CRMHandler(otp_service, notification_outbox, phone_verification_service),
+            'lottery': LotteryHandler(
+                otp_service, notification_outbox, phone_verification_service, catalog_service
+            ),
+            'cooperation': CooperationHandler(otp_service, notification_outbox, phone_verification_service),
+            'admin': AdminHandler(
+                profiling_service, default_seconds=config.profiling.default_seconds, catalog=catalog_service
+            ),
         }
         
         # Initialize menu handler with reference to other handlers for proper dependency injection
@@ -124,7 +173,8 @@ class TelegramBotApplication:
             states={
                 # Cooperation states
                 ASK_COOPERATION_PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, 
-                                                       self.handlers['cooperation'].handle_phone)],
+                                                       self.handlers['cooperation'].handle_phone),
+                                        MessageHandler(filters.CONTACT, self.handlers['cooperation'].handle_contact)],
                 ASK_COOPERATION_OTP: [MessageHandler(filters.TEXT & ~filters.COMMAND, 
                                                      self.handlers['cooperation'].handle_otp)],
                 ASK_COOPERATION_CITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, 
@@ -136,9 +186,11 @@ class TelegramBotApplication:
                 ASK_LOTTERY: [MessageHandler(filters.TEXT & ~filters.COMMAND, 
                                              self.handlers['lottery'].handle_selection)],
                 ASK_LOTTERY_NUMBER: [MessageHandler(filters.TEXT & ~filters.COMMAND, 
-                                                    self.handlers['lottery'].handle_phone)],
+                                                    self.handlers['lottery'].handle_phone),
+                                     MessageHandler(filters.CONTACT, self.handlers['lottery'].handle_contact)],
                 ASK_LOTTERY_OTP: [MessageHandler(filters.TEXT & ~filters.COMMAND, 
                                                  self.handlers['lottery'].handle_otp)],
+                ConversationHandler.TIMEOUT: [TypeHandler(Update, self.handlers['menu'].conversation_timeout)],
             },
             fallbacks=[
                 CommandHandler("cancel", self.handlers['menu'].cancel),
@@ -148,6 +200,9 @@ class TelegramBotApplication:
                 ), self.handlers['menu'].handle_menu_command_in_conversation)
             ],
             per_chat=True,
+            name="main",
+            persistent=config.persistence.enabled,
+            conversation_timeout=config.conversation.timeout("main"),
         )
         
         # Registration conversation handler
@@ -168,9 +223,11 @@ class TelegramBotApplication:
                 ASK_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, 
                                         self.handlers['registration'].handle_id)],
                 ASK_PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, 
-                                           self.handlers['registration'].handle_phone)],
+                                           self.handlers['registration'].handle_phone),
+                            MessageHandler(filters.CONTACT, self.handlers['registration'].handle_contact)],
                 ASK_OTP: [MessageHandler(filters.TEXT & ~filters.COMMAND, 
                                          self.handlers['registration'].handle_otp)],
+                ConversationHandler.TIMEOUT: [TypeHandler(Update, self.handlers['menu'].conversation_timeout)],
             },
             fallbacks=[
                 CommandHandler("cancel", self.handlers['menu'].cancel),
@@ -179,6 +236,9 @@ class TelegramBotApplication:
                     "^(🔙 بازگشت به منو|👤 ثبت نام|🎲 قرعه کشی|📚 خرید ویژه محصولات از نمایندگی 📚|💡 راهنما|💬 تماس با ما|💎 خرید قسطی اشتراک الماس 💎|💳 اقساط من|💬 مشاوره تلفنی رایگان|👩‍💻 پشتیبانی|🤝 همکاری با نمایندگی)$"
                 ), self.handlers['menu'].handle_menu_command_in_conversation)
             ],
+            name="registration",
+            persistent=config.persistence.enabled,
+            conversation_timeout=config.conversation.timeout("registration"),
         )
         
         # CRM conversation handler
@@ -191,9 +251,11 @@ class TelegramBotApplication:
             ],
             states={
                 ASK_CRM_PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, 
-                                               self.handlers['crm'].handle_phone)],
+                                               self.handlers['crm'].handle_phone),
+                                MessageHandler(filters.CONTACT, self.handlers['crm'].handle_contact)],
                 ASK_CRM_OTP: [MessageHandler(filters.TEXT & ~filters.COMMAND, 
                                              self.handlers['crm'].handle_otp)],
+                ConversationHandler.TIMEOUT: [TypeHandler(Update, self.handlers['menu'].conversation_timeout)],
             },
             fallbacks=[
                 CommandHandler("cancel", self.handlers['menu'].cancel),
@@ -203,6 +265,9 @@ class TelegramBotApplication:
                 ), self.handlers['menu'].handle_menu_command_in_conversation)
             ],
             per_chat=True,
+            name="crm",
+            persistent=config.persistence.enabled,
+            conversation_timeout=config.conversation.timeout("crm"),
         )
         
         # Payment conversation handler
@@ -217,6 +282,7 @@ class TelegramBotApplication:
                                                     self.handlers['payment'].handle_payment_method)],
                 ASK_PAYMENT_PROOF: [MessageHandler(filters.PHOTO, 
                                                    self.handlers['payment'].handle_payment_proof)],
+                ConversationHandler.TIMEOUT: [TypeHandler(Update, self.handlers['menu'].conversation_timeout)],
             },
             fallbacks=[
                 CommandHandler("cancel", self.handlers['menu'].cancel),
@@ -225,6 +291,9 @@ class TelegramBotApplication:
                     "^(🔙 بازگشت به منو|👤 ثبت نام|🎲 قرعه کشی|📚 خرید ویژه محصولات از نمایندگی 📚|💡 راهنما|💬 تماس با ما|💎 خرید قسطی اشتراک الماس 💎|💳 اقساط من|💬 مشاوره تلفنی رایگان|👩‍💻 پشتیبانی|🤝 همکاری با نمایندگی)$"
                 ), self.handlers['menu'].handle_menu_command_in_conversation)
             ],
+            name="payment",
+            persistent=config.persistence.enabled,
+            conversation_timeout=config.conversation.timeout("payment"),
         )
         
         # Receipt upload conversation handler
@@ -236,7 +305,8 @@ class TelegramBotApplication:
             states={
                 ASK_RECEIPT_INSTALLMENT: [
                     MessageHandler(filters.PHOTO, self.handlers['payment'].handle_receipt_upload)
-                ]
+                ],
+                ConversationHandler.TIMEOUT: [TypeHandler(Update, self.handlers['menu'].conversation_timeout)],
             },
             fallbacks=[
                 CommandHandler("cancel", self.handlers['menu'].cancel),
@@ -246,14 +316,50 @@ class TelegramBotApplication:
                 ), self.handlers['menu'].handle_menu_command_in_conversation)
             ],
             per_chat=True,
+            name="receipt",
+            persistent=config.persistence.enabled,
+            conversation_timeout=config.conversation.timeout("receipt"),
         )
         
         # Add all conversation handlers
-        self.application.add_handler(main_conversation)
-        self.application.add_handler(registration_conversation)
-        self.application.add_handler(crm_conversation)
-        self.application.add_handler(payment_conversation)
-        self.application.add_handler(receipt_conversation)
+        self.application.add_handler(conversation_service.register(main_conversation))
+        self.application.add_handler(conversation_service.register(registration_conversation))
+        self.application.add_handler(conversation_service.register(crm_conversation))
+        self.application.add_handler(conversation_service.register(payment_conversation))
+        self.application.add_handler(conversation_service.register(receipt_conversation))
+        
+        # Record that Telegram is reaching us, for the health probes
+        self.application.add_handler(TypeHandler(Update, health_service.track_update), group=-3)
+        
+        # Tag every log record of an update with its update and user ids
+        self.application.add_handler(TypeHandler(Update, bind_log_context), group=-2)
+        
+        # Track activity before any other handler and sweep abandoned state
+        self.application.add_handler(TypeHandler(Update, conversation_service.track_activity), group=-1)
+        self.application.job_queue.run_repeating(
+            conversation_service.sweep,
+            interval=config.conversation.sweep_interval,
+            first=config.conversation.sweep_interval,
+            name="conversation_sweeper"
+        )
+        self.application.job_queue.run_repeating(
+            phone_verification_service.purge,
+            interval=24 * 60 * 60,
+            first=60,
+            name="phone_verification_purge"
+        )
+        self.application.job_queue.run_repeating(
+            sms_delivery_tracker.poll,
+            interval=config.sms.status_poll_interval,
+            first=config.sms.status_poll_interval,
+            name="sms_delivery_poller"
+        )
+        self.application.job_queue.run_repeating(
+            error_aggregator.alert,
+            interval=config.notification.error_flush_interval,
+            first=config.notification.error_flush_interval,
+            name="error_alerts"
+        )
         
         logger.info("Conversation handlers setup completed")
     
@@ -264,6 +370,17 @@ class TelegramBotApplication:
         self.application.add_handler(CommandHandler("help", self.handlers['menu'].help))
         self.application.add_handler(CommandHandler("products", self.handlers['product'].show_products_menu))
         
+        # Admin-only diagnostics
+        if config.profiling.admin_ids:
+            admins = filters.User(user_id=config.profiling.admin_ids)
+            self.application.add_handler(CommandHandler("profile", self.handlers['admin'].profile, filters=admins))
+            self.application.add_handler(
+                CommandHandler("memsnap", self.handlers['admin'].memory_snapshot, filters=admins)
+            )
+            self.application.add_handler(
+                CommandHandler("reload_catalog", self.handlers['admin'].reload_catalog, filters=admins)
+            )
+        
         # Callback query handlers
         self.application.add_handler(CallbackQueryHandler(self.handlers['menu'].handle_button))
         
@@ -284,25 +401,27 @@ class TelegramBotApplication:
     
     def _setup_signal_handlers(self) -> None:
         """Setup signal handlers for graceful shutdown"""
+        loop = asyncio.get_running_loop()
+        
         def signal_handler(signum, frame):
             logger.info(f"Received signal {signum}, initiating shutdown...")
             self._shutdown_requested = True
-            
-            # Create new event loop for cleanup if needed
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    loop.create_task(self.shutdown())
-                else:
-                    asyncio.run(self.shutdown())
-            except RuntimeError:
-                asyncio.run(self.shutdown())
+            loop.call_soon_threadsafe(self._stop_event.set)
         
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
         
         if hasattr(signal, 'SIGBREAK'):  # Windows
             signal.signal(signal.SIGBREAK, signal_handler)
+        
+        # Profiles written to disk, for when Telegram itself is unreachable
+        if hasattr(signal, 'SIGUSR1'):
+            loop.add_signal_handler(
+                signal.SIGUSR1, profiling_service.trigger, "cpu", config.profiling.default_seconds
+            )
+            loop.add_signal_handler(
+                signal.SIGUSR2, profiling_service.trigger, "memory", config.profiling.default_seconds
+            )
     
     async def run(self) -> None:
         """Run the bot application"""
@@ -315,11 +434,32 @@ class TelegramBotApplication:
             logger.info("Starting Telegram bot...")
             logger.info(f"Bot configuration: {config.to_dict()}")
             
-            # Start the bot
-            await self.application.run_polling(
-                drop_pending_updates=True,
-                allowed_updates=['message', 'callback_query', 'inline_query']
+            # run_polling() manages its own event loop, so drive the lifecycle by hand
+            await self.application.initialize()
+            await self.application.start()
+            
+            # Serve runtime metrics and health probes from this event loop
+            loop_monitor.start()
+            if config.monitoring.enabled:
+                await metrics_server.start()
+            
+            # Check the admin is reachable before the first notification needs it
+            await notification_service.warm_up()
+            
+            # Deliver admin notifications in the background, including any left from the last run
+            notification_outbox.start()
+            
+            # Process what users sent while the bot was down before polling new updates
+            if config.catch_up.enabled:
+                await catch_up_service.drain(self.application)
+            
+            await self.application.updater.start_polling(
+                drop_pending_updates=not config.catch_up.enabled,
+                allowed_updates=ALLOWED_UPDATES
             )
+            logger.info("Bot is polling for updates")
+            
+            await self._stop_event.wait()
             
         except KeyboardInterrupt:
             logger.info("Bot stopped by user")
@@ -334,13 +474,27 @@ class TelegramBotApplication:
         logger.info("Shutting down application...")
         
         try:
+            # Stop the outbox dispatcher first; unsent notifications stay queued
+            await notification_outbox.stop()
+            await metrics_server.stop()
+            await loop_monitor.stop()
+            
             # Stop the telegram application
             if self.application:
-                await self.application.stop()
+                if self.application.updater and self.application.updater.running:
+                    await self.application.updater.stop()
+                if self.application.running:
+                    await self.application.stop()
                 await self.application.shutdown()
                 logger.info("Telegram application stopped")
             
-            # Close notification service
+            # Finish queued SMS and close provider connections
+            await sms_dispatcher.stop()
+            await sms_delivery_tracker.flush()
+            await sms_service.close()
+            logger.info("SMS service closed")
+            
+            # Close the notification backend
             await notification_service.close()
             logger.info("Notification service closed")
             
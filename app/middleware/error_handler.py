@@ -3,6 +3,7 @@ Error Handling Middleware
 Enterprise-level error handling with proper logging and user feedback
 """
 
+import functools
 import traceback
 from typing import Optional, Dict, Any
 from telegram import Update
@@ -13,7 +14,9 @@ from app.exceptions.base import (
     UserNotRegisteredException, ProductNotFoundException, 
     OrderNotFoundException, SMSException, DatabaseException
 )
-from app.utils.logging import logger, log_error_with_context
+from app.services.error_aggregator import error_aggregator
+from app.utils.logging import logger, log_error_with_context, log_handler, log_update_id, log_user_id
+from app.utils.tracing import tracer, OK, HANDLED_ERROR, ERROR
 from app.constants.messages import ErrorMessages
 
 
@@ -44,9 +47,17 @@ class ErrorHandler:
             update_type=type(update).__name__ if update else "Unknown"
         )
         
+        if ErrorHandler.is_alertable(error):
+            error_aggregator.record(error, user_id=user_id)
+        
         # Handle different types of exceptions
         await ErrorHandler._handle_specific_error(update, context, error, user_id, chat_id)
     
+    @staticmethod
+    def is_alertable(error: BaseException) -> bool:
+        """Unexpected errors and infrastructure failures are reported to admins; user mistakes are not"""
+        return not isinstance(error, BotException) or isinstance(error, (DatabaseException, SMSException))
+    
     @staticmethod
     async def _handle_specific_error(
         update: object,
@@ -167,6 +178,14 @@ class ConversationErrorHandler:
         )
 
 
+def _record_alert(error: Exception, func, args: tuple) -> None:
+    """Feed an error swallowed by a handler to the admin error alerts"""
+    if ErrorHandler.is_alertable(error):
+        update = next((arg for arg in args if isinstance(arg, Update)), None)
+        user_id = update.effective_user.id if update and update.effective_user else None
+        error_aggregator.record(error, handler=func.__qualname__, user_id=user_id)
+
+
 # Decorator for function-level error handling
 def handle_exceptions(
     default_message: str = ErrorMessages.GENERAL_ERROR,
@@ -174,21 +193,49 @@ def handle_exceptions(
 ):
     """
     Decorator for handling exceptions in handler functions
+    
+    Also the tracing point of every handler: its latency and outcome
+    (ok, handled_error, error) are recorded, DB/SMS/notification calls made
+    inside it become its spans, and its log records carry the update_id.
     """
     def decorator(func):
+        name = func.__qualname__
+        
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
+            handler_token = log_handler.set(name)
+            update = next((arg for arg in args if isinstance(arg, Update)), None)
+            id_tokens = None
+            if update is not None and log_update_id.get() != update.update_id:
+                id_tokens = (
+                    log_update_id.set(update.update_id),
+                    log_user_id.set(update.effective_user.id if update.effective_user else None)
+                )
+            trace, trace_token = tracer.begin(name)
+            outcome = ERROR
             try:
-                return await func(*args, **kwargs)
-            except BotException:
+                result = await func(*args, **kwargs)
+                outcome = OK
+                return result
+            except BotException as e:
                 # Re-raise bot exceptions as they're already handled
                 if reraise:
                     raise
+                outcome = HANDLED_ERROR
                 logger.error(f"Bot exception in {func.__name__}", exc_info=True)
+                _record_alert(e, func, args)
             except Exception as e:
                 logger.error(f"Unexpected error in {func.__name__}: {str(e)}", exc_info=True)
                 if reraise:
                     raise
+                _record_alert(e, func, args)
                 # Could send default message here if we have update/context
+            finally:
+                tracer.end(trace, trace_token, outcome)
+                if id_tokens is not None:
+                    log_update_id.reset(id_tokens[0])
+                    log_user_id.reset(id_tokens[1])
+                log_handler.reset(handler_token)
         return wrapper
     return decorator
 
@@ -16,10 +16,15 @@ from .order import Order, order_receipts
 from .crm import CRM
 from .lottery import Lottery, UsersInLottery
 from .cooperation import Cooperation
+from .persistence import PersistedState
+from .verified_phone import VerifiedPhone
+from .sms_message import SMSMessage
+from .outbox import OutboxNotification
 
 __all__ = [
     'Base',
     'GradeEnum', 'MajorEnum', 'OrderStatusEnum', 'ReferralCodeProductEnum',
     'User', 'Product', 'Order', 'ReferralCode', 'Seller', 'File', 'CRM',
-    'Lottery', 'UsersInLottery', 'Cooperation', 'order_receipts'
+    'Lottery', 'UsersInLottery', 'Cooperation', 'order_receipts', 'PersistedState',
+    'VerifiedPhone', 'SMSMessage', 'OutboxNotification'
 ]
@@ -33,7 +33,12 @@ class Lottery(BaseModel):
     is_drawn = Column(Boolean, default=False, nullable=False)
     
     # Relationships
-    participants = relationship("UsersInLottery", back_populates="lottery", lazy="dynamic")
+    participants = relationship(
+        "UsersInLottery",
+        back_populates="lottery",
+        lazy="dynamic",
+        foreign_keys="UsersInLottery.lottery_id"
+    )
     
     def __repr__(self) -> str:
         return f"<Lottery(id={self.id}, name='{self.name}', is_active={self.is_active})>"
@@ -117,7 +122,7 @@ class UsersInLottery(BaseModel):
     is_winner = Column(Boolean, default=False, nullable=False, index=True)
     
     # Relationships
-    lottery = relationship("Lottery", back_populates="participants")
+    lottery = relationship("Lottery", back_populates="participants", foreign_keys=[lottery_id])
     
     def __repr__(self) -> str:
         return (
@@ -0,0 +1,28 @@
+"""
+Notification Outbox Model
+Admin notifications written in the same transaction as the event they report
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+
+from .base import Base
+
+
+class OutboxNotification(Base):
+    """A pending admin notification: ``kind`` selects the NotificationService sender"""
+    
+    __tablename__ = "notification_outbox"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(32), nullable=False)
+    payload = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+    status = Column(String(16), default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self) -> str:
+        return f"<OutboxNotification(id={self.id}, kind='{self.kind}', status='{self.status}')>"
@@ -0,0 +1,24 @@
+"""
+Persistence Model
+Durable storage for conversation states and per-user bot data
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+
+from .base import Base
+
+
+class PersistedState(Base):
+    """Serialized bot state keyed by namespace (user_data, conversation:<name>, ...) and key"""
+    
+    __tablename__ = "bot_persistence"
+    
+    namespace = Column(String(64), primary_key=True)
+    key = Column(String(64), primary_key=True)
+    data = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self) -> str:
+        return f"<PersistedState(namespace='{self.namespace}', key='{self.key}')>"
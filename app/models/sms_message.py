@@ -0,0 +1,28 @@
+"""
+SMS Message Model
+Sent SMS tracked until the provider reports a final delivery status
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, BigInteger, Integer
+
+from .base import Base
+
+
+class SMSMessage(Base):
+    """An SMS accepted by the provider, keyed by the provider's message id"""
+    
+    __tablename__ = "sms_messages"
+    
+    message_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    provider = Column(String(32), nullable=False)
+    phone = Column(String(20), nullable=False, index=True)
+    operator = Column(String(16), nullable=False)
+    purpose = Column(String(32), nullable=True)
+    status = Column(Integer, nullable=True)
+    status_text = Column(String(64), nullable=True)
+    sent_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    resolved_at = Column(DateTime, nullable=True, index=True)
+    
+    def __repr__(self) -> str:
+        return f"<SMSMessage(message_id={self.message_id}, status={self.status})>"
@@ -0,0 +1,22 @@
+"""
+Verified Phone Model
+Registry of phone numbers a Telegram user has proven ownership of by OTP
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, BigInteger
+
+from .base import Base
+
+
+class VerifiedPhone(Base):
+    """A phone number verified by a Telegram user and when it was last verified"""
+    
+    __tablename__ = "verified_phones"
+    
+    telegram_id = Column(BigInteger, primary_key=True)
+    phone = Column(String(20), primary_key=True)
+    verified_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self) -> str:
+        return f"<VerifiedPhone(telegram_id={self.telegram_id}, phone='{self.phone}')>"
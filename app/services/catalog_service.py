@@ -0,0 +1,208 @@
+"""
+Catalog Service Layer
+Cached read access to the product and lottery catalog
+"""
+
+import time
+from dataclasses import dataclass
+from itertools import chain
+from typing import Optional, List, Dict, Tuple, Callable, Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config.settings import config
+from app.models import Product, Lottery, GradeEnum, MajorEnum
+from app.services.database import BaseRepository, DatabaseService, db_service
+from app.utils.logging import product_logger
+from app.utils.keyboards import keyboards
+
+# Models whose changes make the cached catalog stale
+CATALOG_MODELS = (Product, Lottery)
+
+
+@dataclass(frozen=True, slots=True)
+class ProductInfo:
+    """Immutable snapshot of a catalog product"""
+    id: int
+    name: str
+    grade: GradeEnum
+    major: MajorEnum
+    description: Optional[str]
+    price: int
+    
+    @property
+    def formatted_price(self) -> str:
+        """Get formatted price string"""
+        return f"{self.price:,} تومان"
+    
+    @classmethod
+    def from_model(cls, product: Product) -> 'ProductInfo':
+        """Create a snapshot from a product model"""
+        return cls(
+            id=product.id,
+            name=product.name,
+            grade=product.grade,
+            major=product.major,
+            description=product.description,
+            price=product.price
+        )
+
+
+class CatalogService:
+    """
+    Service for catalog lookups backed by a short-lived in-process cache.
+    
+    Products are cached as ``ProductInfo`` snapshots per (grade, major) and
+    by id/name, and active lotteries as a single list. Everything is dropped
+    together on ``invalidate()`` and listeners (e.g. the keyboard registry)
+    are told to drop anything derived from it. With ``invalidate_on_commit()``
+    that happens whenever a product or lottery change made through the
+    database is committed; changes made outside the bot show up after the TTL
+    or an admin's /reload_catalog.
+    """
+    
+    _CHANGED = "catalog_changed"
+    
+    def __init__(self, database: DatabaseService, ttl_seconds: int):
+        self.database = database
+        self.product_repository = BaseRepository(Product, database)
+        self.lottery_repository = BaseRepository(Lottery, database)
+        self.ttl_seconds = ttl_seconds
+        self._products: Dict[Tuple[GradeEnum, Optional[MajorEnum]], Tuple[float, List[ProductInfo]]] = {}
+        self._products_by_id: Dict[int, Tuple[float, ProductInfo]] = {}
+        self._products_by_name: Dict[str, Tuple[float, ProductInfo]] = {}
+        self._lotteries: Optional[Tuple[float, List[Lottery]]] = None
+        self._listeners: List[Callable[[], None]] = []
+        self.hits = 0
+        self.misses = 0
+    
+    def _is_fresh(self, loaded_at: float) -> bool:
+        """Check whether a cache entry loaded at the given time is still valid"""
+        return time.monotonic() - loaded_at < self.ttl_seconds
+    
+    def _remember(self, products: List[ProductInfo], loaded_at: float) -> None:
+        """Index product snapshots by id and name"""
+        for product in products:
+            self._products_by_id[product.id] = (loaded_at, product)
+            self._products_by_name[product.name] = (loaded_at, product)
+    
+    async def get_products(self, grade: GradeEnum, major: Optional[MajorEnum] = None) -> List[ProductInfo]:
+        """Get products for a grade (and optionally a major)"""
+        key = (grade, major)
+        entry = self._products.get(key)
+        if entry and self._is_fresh(entry[0]):
+            self.hits += 1
+            return entry[1]
+        
+        self.misses += 1
+        filters: Dict[str, Any] = {"grade": grade}
+        if major:
+            filters["major"] = major
+        
+        products = [ProductInfo.from_model(p) for p in await self.product_repository.find(**filters)]
+        loaded_at = time.monotonic()
+        self._products[key] = (loaded_at, products)
+        self._remember(products, loaded_at)
+        return products
+    
+    async def get_product(self, product_id: int) -> Optional[ProductInfo]:
+        """Get a product by ID"""
+        entry = self._products_by_id.get(product_id)
+        if entry and self._is_fresh(entry[0]):
+            self.hits += 1
+            return entry[1]
+        
+        self.misses += 1
+        product = await self.product_repository.get_by_id(product_id)
+        if not product:
+            return None
+        
+        info = ProductInfo.from_model(product)
+        self._remember([info], time.monotonic())
+        return info
+    
+    async def get_product_by_name(self, name: str) -> Optional[ProductInfo]:
+        """Get a product by its unique name"""
+        entry = self._products_by_name.get(name)
+        if entry and self._is_fresh(entry[0]):
+            self.hits += 1
+            return entry[1]
+        
+        self.misses += 1
+        product = await self.product_repository.get_by_field("name", name)
+        if not product:
+            return None
+        
+        info = ProductInfo.from_model(product)
+        self._remember([info], time.monotonic())
+        return info
+    
+    async def get_active_lotteries(self) -> List[Lottery]:
+        """Get all active lotteries"""
+        if self._lotteries and self._is_fresh(self._lotteries[0]):
+            self.hits += 1
+            return self._lotteries[1]
+        
+        self.misses += 1
+        lotteries = await self.lottery_repository.find(is_active=True)
+        self._lotteries = (time.monotonic(), lotteries)
+        return lotteries
+    
+    def add_invalidation_listener(self, listener: Callable[[], None]) -> None:
+        """Register a callback run whenever the catalog is invalidated"""
+        self._listeners.append(listener)
+    
+    def invalidate(self) -> None:
+        """Drop all cached catalog data and everything derived from it"""
+        self._products.clear()
+        self._products_by_id.clear()
+        self._products_by_name.clear()
+        self._lotteries = None
+        
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception as e:
+                product_logger.error(f"Catalog invalidation listener failed: {str(e)}")
+        
+        product_logger.info("Catalog cache invalidated")
+    
+    def invalidate_on_commit(self) -> None:
+        """Invalidate after every commit of this database that wrote a product or lottery"""
+        event.listen(Session, "after_flush", self._note_flush)
+        event.listen(Session, "do_orm_execute", self._note_statement)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+    
+    def _owns(self, session: Session) -> bool:
+        engine = self.database.engine
+        return engine is not None and session.bind is engine.sync_engine
+    
+    def _note_flush(self, session: Session, flush_context) -> None:
+        """Flag sessions flushing catalog rows"""
+        if self._owns(session) and any(
+            isinstance(instance, CATALOG_MODELS)
+            for instance in chain(session.new, session.dirty, session.deleted)
+        ):
+            session.info[self._CHANGED] = True
+    
+    def _note_statement(self, state) -> None:
+        """Flag sessions running bulk UPDATE/DELETE statements on catalog tables"""
+        if ((state.is_update or state.is_delete) and state.bind_mapper is not None
+                and state.bind_mapper.class_ in CATALOG_MODELS and self._owns(state.session)):
+            state.session.info[self._CHANGED] = True
+    
+    def _after_commit(self, session: Session) -> None:
+        if self._owns(session) and session.info.pop(self._CHANGED, False):
+            self.invalidate()
+    
+    def _after_rollback(self, session: Session) -> None:
+        if self._owns(session):
+            session.info.pop(self._CHANGED, None)
+
+
+# Global catalog service instance
+catalog_service = CatalogService(db_service, config.cache.catalog_ttl_seconds)
+catalog_service.add_invalidation_listener(keyboards.invalidate_dynamic)
+catalog_service.invalidate_on_commit()
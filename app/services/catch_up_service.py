@@ -0,0 +1,164 @@
+"""
+Catch-up Service Layer
+Processes the backlog of updates that arrived while the bot was offline
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from telegram import Update
+from telegram.error import NetworkError
+from telegram.ext import Application
+
+from app.config.settings import config
+from app.utils.logging import logger
+
+# Update types the bot subscribes to
+ALLOWED_UPDATES = ['message', 'callback_query', 'inline_query']
+
+# getUpdates returns at most 100 updates per call
+MAX_BATCH_SIZE = 100
+
+
+@dataclass
+class CatchUpReport:
+    """Outcome of draining the update backlog"""
+    fetched: int = 0
+    processed: int = 0
+    skipped_stale: int = 0
+    batches: int = 0
+    duration: float = 0.0
+    failed: bool = False
+
+
+class CatchUpService:
+    """
+    Service that drains pending updates on startup instead of dropping them.
+    
+    The backlog is fetched in full getUpdates batches and each batch is
+    processed concurrently across users while updates of the same user stay
+    in order. Text messages older than ``stale_after`` seconds (menu taps,
+    commands, answers to questions that have since expired) are skipped;
+    photos such as payment receipts and callback queries are always processed.
+    
+    Network errors and timeouts are retried with exponential backoff. Any
+    other failure, or running out of retries, ends the catch-up early: the
+    batches processed so far are confirmed so a restart does not replay them,
+    and the rest of the backlog is left to regular polling.
+    """
+    
+    def __init__(self, batch_size: int, concurrency: int, stale_after: int,
+                 max_retries: int = 5, retry_backoff: float = 1.0):
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.concurrency = concurrency
+        self.stale_after = timedelta(seconds=stale_after)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.logger = logger.getChild('catch_up')
+    
+    def is_stale(self, update: Update, now: datetime) -> bool:
+        """Check whether an update is an interactive message too old to act on"""
+        message = update.message or update.edited_message
+        if not message or not message.text:
+            return False
+        return now - message.date > self.stale_after
+    
+    @staticmethod
+    def _ordering_key(update: Update) -> int:
+        """Get the key whose updates must be processed in order"""
+        if update.effective_user:
+            return update.effective_user.id
+        if update.effective_chat:
+            return update.effective_chat.id
+        return update.update_id
+    
+    async def _process_in_order(self, application: Application, updates: List[Update],
+                                semaphore: asyncio.Semaphore) -> None:
+        """Process one user's updates sequentially"""
+        async with semaphore:
+            for update in updates:
+                await application.process_update(update)
+    
+    async def _fetch(self, application: Application, offset: Optional[int], limit: int) -> tuple:
+        """Call getUpdates, retrying network errors and timeouts with backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await application.bot.get_updates(
+                    offset=offset,
+                    limit=limit,
+                    timeout=0,
+                    allowed_updates=ALLOWED_UPDATES
+                )
+            except NetworkError as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * 2 ** attempt
+                self.logger.warning(f"getUpdates failed ({str(e)}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    
+    async def _confirm(self, application: Application, offset: Optional[int]) -> None:
+        """Confirm every update before ``offset`` so it is not delivered again"""
+        if offset is None:
+            return
+        try:
+            await self._fetch(application, offset, limit=1)
+        except Exception as e:
+            self.logger.error(f"Could not confirm processed updates up to {offset - 1}: {str(e)}")
+    
+    async def drain(self, application: Application) -> CatchUpReport:
+        """Fetch and process every pending update, then confirm them with Telegram"""
+        report = CatchUpReport()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Offset just past the last fully processed batch
+        offset: Optional[int] = None
+        started = time.perf_counter()
+        
+        try:
+            while True:
+                updates = await self._fetch(application, offset, self.batch_size)
+                if not updates:
+                    # The request with the last offset confirmed the whole backlog
+                    break
+                
+                report.fetched += len(updates)
+                report.batches += 1
+                
+                now = datetime.now(timezone.utc)
+                by_key: Dict[int, List[Update]] = {}
+                for update in updates:
+                    if self.is_stale(update, now):
+                        report.skipped_stale += 1
+                        continue
+                    by_key.setdefault(self._ordering_key(update), []).append(update)
+                
+                # Finish a batch before fetching the next so per-user order holds across batches
+                await asyncio.gather(*(
+                    self._process_in_order(application, key_updates, semaphore)
+                    for key_updates in by_key.values()
+                ))
+                report.processed += sum(len(key_updates) for key_updates in by_key.values())
+                offset = updates[-1].update_id + 1
+        except Exception as e:
+            # Polling picks up whatever is left; only the processed batches are confirmed
+            report.failed = True
+            self.logger.error(f"Catch-up stopped early, leaving the rest to polling: {str(e)}", exc_info=True)
+            await self._confirm(application, offset)
+        
+        report.duration = time.perf_counter() - started
+        self.logger.info(
+            f"Backlog drained in {report.duration:.2f}s: {report.fetched} updates in "
+            f"{report.batches} batches, {report.processed} processed, "
+            f"{report.skipped_stale} stale skipped"
+        )
+        return report
+
+
+# Global catch-up service instance
+catch_up_service = CatchUpService(
+    config.catch_up.batch_size,
+    config.catch_up.concurrency,
+    config.catch_up.stale_after_seconds
+)
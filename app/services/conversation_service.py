@@ -0,0 +1,140 @@
+"""
+Conversation Service Layer
+Activity tracking, cleanup of abandoned conversations and live state counts
+"""
+
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import Application, ContextTypes, ConversationHandler
+
+from app.config.settings import config
+from app.constants.conversation_states import STATE_NAMES
+from app.utils.logging import logger
+
+
+class ConversationService:
+    """
+    Service that keeps conversation state from growing without bound.
+    
+    Conversation timeouts end a flow while the process is running, but the
+    timeout jobs are lost on restart and user_data/chat_data is never released
+    on its own. The sweeper ends conversations of users that have been idle for
+    ``idle_ttl`` seconds and drops their user_data and chat_data.
+    """
+    
+    def __init__(self, idle_ttl: int):
+        self.idle_ttl = idle_ttl
+        self.logger = logger.getChild('conversation')
+        self._handlers: List[ConversationHandler] = []
+        self._last_seen_users: Dict[int, float] = {}
+        self._last_seen_chats: Dict[int, float] = {}
+        # Anything restored from persistence counts as active since startup
+        self._started_at = time.monotonic()
+        self.ended_conversations = 0
+        self.evicted_users = 0
+        self.evicted_chats = 0
+    
+    def register(self, handler: ConversationHandler) -> ConversationHandler:
+        """Register a conversation handler for sweeping and state counts"""
+        self._handlers.append(handler)
+        return handler
+    
+    async def track_activity(self, update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Record when a user/chat was last active (runs before all other handlers)"""
+        if not isinstance(update, Update):
+            return
+        
+        now = time.monotonic()
+        if update.effective_user:
+            self._last_seen_users[update.effective_user.id] = now
+        if update.effective_chat:
+            self._last_seen_chats[update.effective_chat.id] = now
+    
+    def _is_idle(self, last_seen: Dict[int, float], key: int, cutoff: float) -> bool:
+        """Check whether a user/chat has not been active since the cutoff"""
+        return last_seen.get(key, self._started_at) < cutoff
+    
+    @staticmethod
+    def _conversation_user(handler: ConversationHandler, key: tuple) -> int:
+        """Get the user (or chat, for per-chat only handlers) a conversation key belongs to"""
+        return key[1] if handler.per_chat and handler.per_user else key[0]
+    
+    @staticmethod
+    def _live_conversations(handler: ConversationHandler) -> Dict[tuple, object]:
+        """
+        Get a handler's live conversations, keyed like ConversationHandler keys them
+        
+        ConversationHandler has no public API for listing or ending conversations
+        from outside, so this is the only place that reaches into its private
+        ``_conversations`` mapping. Values are states (or pending-state wrappers
+        for non-blocking callbacks); popping a key is what the handler itself
+        does when a conversation reaches END.
+        """
+        return handler._conversations
+    
+    def sweep_application(self, application: Application) -> None:
+        """End idle conversations and drop idle user_data/chat_data"""
+        cutoff = time.monotonic() - self.idle_ttl
+        
+        for handler in self._handlers:
+            conversations = self._live_conversations(handler)
+            for key in list(conversations):
+                if self._is_idle(self._last_seen_users, self._conversation_user(handler, key), cutoff):
+                    conversations.pop(key, None)
+                    self.ended_conversations += 1
+        
+        for user_id in list(application.user_data):
+            if self._is_idle(self._last_seen_users, user_id, cutoff):
+                application.drop_user_data(user_id)
+                self._last_seen_users.pop(user_id, None)
+                self.evicted_users += 1
+        
+        for chat_id in list(application.chat_data):
+            if self._is_idle(self._last_seen_chats, chat_id, cutoff):
+                application.drop_chat_data(chat_id)
+                self._last_seen_chats.pop(chat_id, None)
+                self.evicted_chats += 1
+        
+        # Users that never got user_data (e.g. only sent commands)
+        for user_id in [u for u, seen in self._last_seen_users.items() if seen < cutoff]:
+            del self._last_seen_users[user_id]
+        for chat_id in [c for c, seen in self._last_seen_chats.items() if seen < cutoff]:
+            del self._last_seen_chats[chat_id]
+    
+    async def sweep(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Periodic job: sweep idle state and report live conversations"""
+        try:
+            self.sweep_application(context.application)
+        except Exception as e:
+            self.logger.error(f"Conversation sweep failed: {str(e)}", exc_info=True)
+            return
+        
+        counts = self.state_counts()
+        live = ", ".join(
+            f"{name}[{', '.join(f'{state}={count}' for state, count in states.items())}]"
+            for name, states in counts.items() if states
+        )
+        self.logger.info(
+            f"Conversation sweep: live {live or 'none'} | "
+            f"users={len(context.application.user_data)} chats={len(context.application.chat_data)} | "
+            f"ended={self.ended_conversations} evicted_users={self.evicted_users} "
+            f"evicted_chats={self.evicted_chats}"
+        )
+    
+    def state_counts(self) -> Dict[Optional[str], Dict[str, int]]:
+        """Get the number of live conversations per handler and state"""
+        counts = {}
+        for handler in self._handlers:
+            states = Counter(
+                STATE_NAMES.get(state, str(state)) if isinstance(state, int) else "PENDING"
+                for state in self._live_conversations(handler).values()
+            )
+            counts[handler.name] = dict(states)
+        return counts
+
+
+# Global conversation service instance
+conversation_service = ConversationService(config.conversation.idle_ttl)
@@ -4,8 +4,9 @@ Enterprise-level database operations and session management
 """
 
 import asyncio
+import time
 from contextlib import asynccontextmanager
-from typing import Optional, Type, TypeVar, Generic, List, Dict, Any
+from typing import Optional, Type, TypeVar, Generic, List, Dict, Any, Callable, Union
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy import select, update, delete, func
@@ -15,6 +16,7 @@ from app.config.settings import config
 from app.models.base import Base, BaseModel
 from app.exceptions.base import DatabaseException
 from app.utils.logging import database_logger
+from app.utils.tracing import LatencyHistogram, tracer
 
 T = TypeVar('T', bound=BaseModel)
 
@@ -26,6 +28,8 @@ class DatabaseService:
         self.engine = None
         self.session_maker = None
         self._initialized = False
+        self.waiting = 0
+        self.pool_wait = LatencyHistogram()
     
     def initialize(self) -> None:
         """Initialize database engine and session maker"""
@@ -61,6 +65,14 @@ class DatabaseService:
         
         async with self.session_maker() as session:
             try:
+                # Check the connection out up front so pool waits are measured
+                self.waiting += 1
+                started = time.perf_counter()
+                try:
+                    await session.connection()
+                finally:
+                    self.waiting -= 1
+                self.pool_wait.observe(time.perf_counter() - started)
                 yield session
             except Exception as e:
                 await session.rollback()
@@ -72,6 +84,19 @@ class DatabaseService:
             finally:
                 await session.close()
     
+    def pool_status(self) -> Dict[str, int]:
+        """Get connection pool usage (empty for pools that do not track it)"""
+        pool = self.engine.pool if self.engine else None
+        if pool is None or not hasattr(pool, "checkedout"):
+            return {}
+        return {
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "waiting": self.waiting,
+        }
+    
     async def create_tables(self) -> None:
         """Create all database tables"""
         if not self.engine:
@@ -112,12 +137,29 @@ class BaseRepository(Generic[T]):
         self.model_class = model_class
         self.db_service = db_service
     
-    async def create(self, **kwargs) -> T:
-        """Create a new record"""
-        async with self.db_service.get_session() as session:
+    def _span(self, operation: str):
+        """Trace a repository operation as a DB span of the current handler"""
+        return tracer.span("db", f"{self.model_class.__name__}.{operation}")
+    
+    @staticmethod
+    def _related(rows: Union[Base, List[Base]]) -> List[Base]:
+        """Normalise what a ``notify`` callback returned to a list of rows"""
+        return rows if isinstance(rows, list) else [rows]
+    
+    async def create(self, notify: Optional[Callable[[T], Union[Base, List[Base]]]] = None, **kwargs) -> T:
+        """
+        Create a new record
+        
+        ``notify`` builds a related row (e.g. an outbox entry), or a list of
+        them, from the new record; they are committed in the same transaction.
+        """
+        async with self._span("create"), self.db_service.get_session() as session:
             try:
                 instance = self.model_class(**kwargs)
                 session.add(instance)
+                if notify is not None:
+                    await session.flush()
+                    session.add_all(self._related(notify(instance)))
                 await session.commit()
                 await session.refresh(instance)
                 
@@ -137,7 +179,7 @@ class BaseRepository(Generic[T]):
     
     async def get_by_id(self, id: int) -> Optional[T]:
         """Get record by ID"""
-        async with self.db_service.get_session() as session:
+        async with self._span("get_by_id"), self.db_service.get_session() as session:
             try:
                 result = await session.get(self.model_class, id)
                 return result
@@ -149,7 +191,7 @@ class BaseRepository(Generic[T]):
     
     async def get_by_field(self, field_name: str, value: Any) -> Optional[T]:
         """Get record by specific field"""
-        async with self.db_service.get_session() as session:
+        async with self._span("get_by_field"), self.db_service.get_session() as session:
             try:
                 stmt = select(self.model_class).where(getattr(self.model_class, field_name) == value)
                 result = await session.execute(stmt)
@@ -162,7 +204,7 @@ class BaseRepository(Generic[T]):
     
     async def get_all(self, limit: Optional[int] = None, offset: int = 0) -> List[T]:
         """Get all records with optional pagination"""
-        async with self.db_service.get_session() as session:
+        async with self._span("get_all"), self.db_service.get_session() as session:
             try:
                 stmt = select(self.model_class).offset(offset)
                 if limit:
@@ -176,12 +218,14 @@ class BaseRepository(Generic[T]):
                     error_details=str(e)
                 )
     
-    async def update(self, id: int, **kwargs) -> Optional[T]:
-        """Update record by ID"""
-        async with self.db_service.get_session() as session:
+    async def update(self, id: int, notify: Optional[Callable[[T], Union[Base, List[Base]]]] = None, **kwargs) -> Optional[T]:
+        """Update record by ID (``notify`` as in ``create``)"""
+        async with self._span("update"), self.db_service.get_session() as session:
             try:
                 stmt = update(self.model_class).where(self.model_class.id == id).values(**kwargs)
                 await session.execute(stmt)
+                if notify is not None:
+                    session.add_all(self._related(notify(await session.get(self.model_class, id))))
                 await session.commit()
                 
                 # Fetch updated record
@@ -197,7 +241,7 @@ class BaseRepository(Generic[T]):
     
     async def delete(self, id: int) -> bool:
         """Delete record by ID"""
-        async with self.db_service.get_session() as session:
+        async with self._span("delete"), self.db_service.get_session() as session:
             try:
                 stmt = delete(self.model_class).where(self.model_class.id == id)
                 result = await session.execute(stmt)
@@ -217,7 +261,7 @@ class BaseRepository(Generic[T]):
     
     async def count(self) -> int:
         """Get total count of records"""
-        async with self.db_service.get_session() as session:
+        async with self._span("count"), self.db_service.get_session() as session:
             try:
                 stmt = select(func.count(self.model_class.id))
                 result = await session.execute(stmt)
@@ -230,7 +274,7 @@ class BaseRepository(Generic[T]):
     
     async def exists(self, **filters) -> bool:
         """Check if record exists with given filters"""
-        async with self.db_service.get_session() as session:
+        async with self._span("exists"), self.db_service.get_session() as session:
             try:
                 stmt = select(self.model_class)
                 for field_name, value in filters.items():
@@ -247,7 +291,7 @@ class BaseRepository(Generic[T]):
     
     async def find(self, **filters) -> List[T]:
         """Find records by filters"""
-        async with self.db_service.get_session() as session:
+        async with self._span("find"), self.db_service.get_session() as session:
             try:
                 stmt = select(self.model_class)
                 for field_name, value in filters.items():
@@ -0,0 +1,189 @@
+"""
+Error Aggregator
+Deduplicates admin error alerts by exception fingerprint
+"""
+
+import os
+import time
+import traceback
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set
+
+from telegram.ext import ContextTypes
+
+from app.config.settings import config
+from app.services.notification_service import NotificationService, notification_service
+from app.utils.logging import logger
+
+alert_logger = logger.getChild('error_alerts')
+
+HANDLERS_PACKAGE = os.sep + os.path.join("app", "handlers") + os.sep
+
+# Affected users are counted exactly up to this many per window
+MAX_TRACKED_USERS = 1000
+
+
+def fingerprint(error: BaseException, handler: Optional[str] = None) -> str:
+    """
+    Identify an error by its type, the handler it escaped from and the frame
+    that raised it
+    
+    Without an explicit ``handler`` the innermost frame inside app/handlers
+    is used.
+    """
+    frames = list(traceback.walk_tb(error.__traceback__))
+    if handler is None:
+        handler = next(
+            (frame.f_code.co_qualname for frame, _ in reversed(frames) if HANDLERS_PACKAGE in frame.f_code.co_filename),
+            "unknown"
+        )
+    if frames:
+        frame, lineno = frames[-1]
+        location = f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_qualname}:{lineno}"
+    else:
+        location = "unknown"
+    return f"{type(error).__name__}|{handler}|{location}"
+
+
+@dataclass
+class ErrorBucket:
+    """Occurrences of one fingerprint"""
+    error_type: str
+    handler: str
+    location: str
+    sample: str
+    window_start: float
+    count: int = 0
+    total: int = 0
+    users: Set[int] = field(default_factory=set)
+    alerted: bool = False
+
+
+class ErrorAggregator:
+    """
+    Aggregator sending at most one admin alert per error fingerprint per window.
+    
+    ``record`` only counts, so it is cheap enough to call for every failed
+    update. ``flush`` runs periodically: a fingerprint seen for the first time
+    is alerted on the next flush, later occurrences are counted and, when its
+    window ends, summarised in one message with the count and the number of
+    affected users. A fingerprint that stays quiet for a whole window is
+    forgotten, so a recurrence alerts right away again. During an outage the
+    alert rate depends on the number of distinct failures, not on the number
+    of users hitting them.
+    """
+    
+    def __init__(
+        self,
+        notifications: NotificationService,
+        window_seconds: float = 300,
+        max_fingerprints: int = 500
+    ):
+        self.notifications = notifications
+        self.window_seconds = window_seconds
+        self.max_fingerprints = max_fingerprints
+        self._buckets: "OrderedDict[str, ErrorBucket]" = OrderedDict()
+        self.recorded = 0
+        self.alerts = 0
+        self.dropped = 0
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+    
+    def record(
+        self,
+        error: BaseException,
+        handler: Optional[str] = None,
+        user_id: Optional[int] = None,
+        now: Optional[float] = None
+    ) -> None:
+        """Count an occurrence of the error"""
+        now = time.monotonic() if now is None else now
+        key = fingerprint(error, handler)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_fingerprints:
+                self.dropped += 1
+                return
+            error_type, handler_name, location = key.split("|", 2)
+            bucket = self._buckets[key] = ErrorBucket(error_type, handler_name, location, str(error)[:300], now)
+        
+        bucket.count += 1
+        bucket.total += 1
+        self.recorded += 1
+        if user_id is not None and len(bucket.users) < MAX_TRACKED_USERS:
+            bucket.users.add(user_id)
+    
+    async def flush(self, now: Optional[float] = None) -> int:
+        """
+        Send the alerts that are due
+        
+        Returns:
+            int: Number of alerts sent
+        """
+        now = time.monotonic() if now is None else now
+        sent = 0
+        for key, bucket in list(self._buckets.items()):
+            if bucket.alerted and now - bucket.window_start < self.window_seconds:
+                continue
+            if bucket.alerted and not bucket.count:
+                del self._buckets[key]
+                continue
+            
+            if not await self._send(bucket, now):
+                # Counts are kept and the alert is retried on the next flush
+                continue
+            sent += 1
+            bucket.alerted = True
+            bucket.window_start = now
+            bucket.count = 0
+            bucket.users.clear()
+        return sent
+    
+    async def _send(self, bucket: ErrorBucket, now: float) -> bool:
+        """Send the alert for a bucket; returns False if it could not be sent"""
+        minutes = max(1, round((now - bucket.window_start) / 60)) if bucket.alerted else None
+        occurrences = f"{bucket.count} بار در {minutes} دقیقه اخیر" if minutes else f"{bucket.count} بار"
+        try:
+            await self.notifications.send_error_notification(
+                error_type=bucket.error_type,
+                error_message=bucket.sample,
+                user_id=next(iter(bucket.users)) if len(bucket.users) == 1 else None,
+                context={
+                    "هندلر": bucket.handler,
+                    "محل خطا": bucket.location,
+                    "تکرار": occurrences,
+                    "کاربران درگیر": len(bucket.users),
+                    "مجموع": bucket.total,
+                }
+            )
+        except Exception as e:
+            alert_logger.warning(f"Failed to send error alert for {bucket.error_type}: {str(e)}")
+            return False
+        self.alerts += 1
+        return True
+    
+    async def alert(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Periodic job: send due error alerts"""
+        try:
+            await self.flush()
+        except Exception as e:
+            alert_logger.error(f"Error alert flush failed: {str(e)}", exc_info=True)
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get error aggregation metrics"""
+        return {
+            "fingerprints": len(self._buckets),
+            "recorded": self.recorded,
+            "alerts": self.alerts,
+            "dropped": self.dropped,
+        }
+
+
+# Global error aggregator instance
+error_aggregator = ErrorAggregator(
+    notification_service,
+    window_seconds=config.notification.error_window,
+    max_fingerprints=config.notification.error_max_fingerprints
+)
@@ -0,0 +1,155 @@
+"""
+Health Service Layer
+In-process liveness and readiness checks for the HTTP probes
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.request import HTTPXRequest
+
+from app.config.settings import config
+from app.services.database import DatabaseService, db_service
+from app.services.loop_monitor import LoopMonitor, loop_monitor
+from app.services.metrics_service import Response
+from app.services.sms_dispatcher import CircuitBreaker, SMSDispatcher, sms_dispatcher
+from app.utils.logging import logger
+
+health_logger = logger.getChild('health')
+
+
+class PollingRequest(HTTPXRequest):
+    """getUpdates request that reports every successful call to the health service"""
+    
+    def __init__(self, health: "HealthService", **kwargs):
+        super().__init__(**kwargs)
+        self.health = health
+    
+    async def post(self, *args, **kwargs):
+        result = await super().post(*args, **kwargs)
+        self.health.mark_polled()
+        return result
+
+
+class HealthService:
+    """
+    Service answering ``/healthz`` and ``/readyz`` from the running bot.
+    
+    Event-loop lag comes from the ``LoopMonitor``; the getUpdates request
+    and an update hook record when Telegram was last reached. ``/healthz``
+    (liveness) only reads those timestamps and does no I/O, so probing it
+    often is free; it fails when the loop lags more than ``max_loop_lag`` or
+    nothing came back from Telegram for ``poll_stale_seconds``. ``/readyz`` also pings the
+    database. SMS circuit states are reported by both but never fail them: a
+    vendor outage is not fixed by restarting the bot.
+    """
+    
+    def __init__(
+        self,
+        database: DatabaseService,
+        dispatcher: SMSDispatcher,
+        monitor: LoopMonitor,
+        max_loop_lag: float = 5,
+        poll_stale_seconds: float = 120,
+        db_timeout: float = 2
+    ):
+        self.database = database
+        self.dispatcher = dispatcher
+        self.monitor = monitor
+        self.max_loop_lag = max_loop_lag
+        self.poll_stale_seconds = poll_stale_seconds
+        self.db_timeout = db_timeout
+        self.last_poll: Optional[float] = None
+        self.last_update: Optional[float] = None
+    
+    def polling_request(self, **kwargs) -> PollingRequest:
+        """Build the request used for getUpdates"""
+        return PollingRequest(self, connection_pool_size=1, **kwargs)
+    
+    def mark_polled(self) -> None:
+        self.last_poll = time.monotonic()
+    
+    async def track_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Update handler: record that Telegram delivered an update (polling or webhook)"""
+        self.last_update = time.monotonic()
+    
+    def _check_loop(self, now: float) -> Dict[str, Any]:
+        lag = self.monitor.current_lag(now)
+        return {"ok": self.monitor.running and lag <= self.max_loop_lag, "lag_seconds": round(lag, 3)}
+    
+    def _check_telegram(self, now: float) -> Dict[str, Any]:
+        contact = max(filter(None, (self.last_poll, self.last_update)), default=self.monitor.started_at)
+        since = now - contact
+        return {
+            "ok": since <= self.poll_stale_seconds,
+            "seconds_since_get_updates": round(now - self.last_poll, 1) if self.last_poll else None,
+            "seconds_since_update": round(now - self.last_update, 1) if self.last_update else None,
+        }
+    
+    def _check_sms(self) -> Dict[str, Any]:
+        circuits = {name: breaker.state for name, breaker in self.dispatcher.breakers.items()}
+        return {
+            "ok": any(state != CircuitBreaker.OPEN for state in circuits.values()),
+            "circuits": circuits,
+            "queue_depth": self.dispatcher.queue_depth,
+        }
+    
+    async def _check_database(self) -> Dict[str, Any]:
+        if self.database.engine is None:
+            return {"ok": False, "error": "not initialized"}
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.db_timeout):
+                async with self.database.engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+        except Exception as e:
+            return {"ok": False, "error": str(e)[:200] or type(e).__name__}
+        return {
+            "ok": True,
+            "latency_seconds": round(time.perf_counter() - started, 4),
+            "pool": self.database.pool_status(),
+        }
+    
+    @staticmethod
+    def _respond(checks: Dict[str, Dict[str, Any]], required: tuple) -> Response:
+        healthy = all(checks[name]["ok"] for name in required)
+        if not healthy:
+            status = "failing"
+            health_logger.warning(f"Health check failing: {checks}")
+        else:
+            status = "ok" if all(check["ok"] for check in checks.values()) else "degraded"
+        body = json.dumps({"status": status, "checks": checks}).encode()
+        return (200 if healthy else 503), "application/json", body
+    
+    async def liveness(self) -> Response:
+        """``/healthz``: the loop is responsive and Telegram is being reached"""
+        now = time.monotonic()
+        checks = {"loop": self._check_loop(now), "telegram": self._check_telegram(now), "sms": self._check_sms()}
+        return self._respond(checks, required=("loop", "telegram"))
+    
+    async def readiness(self) -> Response:
+        """``/readyz``: liveness plus a database round trip"""
+        now = time.monotonic()
+        checks = {
+            "loop": self._check_loop(now),
+            "telegram": self._check_telegram(now),
+            "database": await self._check_database(),
+            "sms": self._check_sms(),
+        }
+        return self._respond(checks, required=("loop", "telegram", "database"))
+
+
+# Global health service instance
+health_service = HealthService(
+    db_service,
+    sms_dispatcher,
+    loop_monitor,
+    max_loop_lag=config.monitoring.max_loop_lag,
+    poll_stale_seconds=config.monitoring.poll_stale_seconds,
+    db_timeout=config.monitoring.db_timeout
+)
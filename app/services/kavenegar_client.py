@@ -0,0 +1,87 @@
+"""
+Kavenegar Client
+Async Kavenegar REST client on a pooled keep-alive HTTP connection
+"""
+
+from typing import Optional, Dict, Any
+
+import httpx
+from kavenegar import APIException, HTTPException
+
+
+class AsyncKavenegarClient:
+    """
+    Async drop-in for the ``KavenegarAPI`` methods the bot uses.
+    
+    The official client makes blocking ``requests`` calls, which stall the
+    event loop for the whole provider round trip. This client talks to the
+    same REST API through a shared ``httpx.AsyncClient`` and raises the same
+    ``APIException``/``HTTPException`` types, so callers map errors as before.
+    """
+    
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.kavenegar.com",
+        timeout: float = 10,
+        max_connections: int = 10
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def __repr__(self) -> str:
+        return f"AsyncKavenegarClient({self.base_url!r})"
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.base_url}/v1/{self.api_key}",
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                headers={"Accept": "application/json", "charset": "utf-8"}
+            )
+        return self._client
+    
+    async def _request(self, action: str, method: str, params: Dict[str, Any]) -> Any:
+        """Call an API method and return its entries"""
+        try:
+            response = await self._get_client().post(f"/{action}/{method}.json", data=params)
+        except httpx.TimeoutException as e:
+            raise HTTPException(f"Timed out after {self.timeout}s: {e!r}")
+        except httpx.HTTPError as e:
+            raise HTTPException(repr(e))
+        
+        try:
+            content = response.json()
+            status = content["return"]["status"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPException(f"Invalid response (HTTP {response.status_code}): {e!r}")
+        
+        if status != 200:
+            raise APIException(f"APIException[{status}] {content['return'].get('message', '')}")
+        return content.get("entries")
+    
+    async def verify_lookup(self, params: Dict[str, Any]) -> Any:
+        return await self._request("verify", "lookup", params)
+    
+    async def sms_send(self, params: Dict[str, Any]) -> Any:
+        return await self._request("sms", "send", params)
+    
+    async def sms_sendarray(self, params: Dict[str, Any]) -> Any:
+        return await self._request("sms", "sendarray", params)
+    
+    async def sms_status(self, params: Dict[str, Any]) -> Any:
+        return await self._request("sms", "status", params)
+    
+    async def close(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
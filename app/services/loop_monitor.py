@@ -0,0 +1,143 @@
+"""
+Event Loop Monitor
+Scheduling-lag histogram and a watchdog that captures the stack of blocking callbacks
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+
+from app.config.settings import config
+from app.utils.logging import logger
+from app.utils.tracing import LatencyHistogram
+
+loop_logger = logger.getChild('event_loop')
+
+# Upper bounds (seconds) of the scheduling lag buckets
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LoopMonitor:
+    """
+    Monitor of event-loop responsiveness.
+    
+    A task sleeps for ``interval`` and records how late it wakes up; that
+    scheduling lag feeds ``lag`` (exported on /metrics) and the liveness
+    probe. A watchdog thread checks the last tick every half ``budget``:
+    when the loop has not ticked for longer than ``budget``, something is
+    running synchronously on it (a blocking SMS call, a burst of log I/O, a
+    large result materialised in one go), so the loop thread's stack and the
+    running task and update are logged once per stall. Handlers that are
+    merely slow while awaiting are reported by the tracer instead.
+    """
+    
+    def __init__(self, interval: float = 0.25, budget: float = 0.5, stack_limit: int = 40):
+        self.interval = interval
+        self.budget = budget
+        self.stack_limit = stack_limit
+        self.lag = LatencyHistogram(LAG_BUCKETS)
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.last_tick: Optional[float] = None
+        self.started_at = time.monotonic()
+        self.stalls = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._reported_tick: Optional[float] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+    
+    def start(self) -> None:
+        """Start ticking on the running loop and start the watchdog thread (idempotent)"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self.started_at = self.last_tick = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._tick(), name="loop_monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        loop_logger.info(f"Event loop monitor started (tick {self.interval}s, budget {self.budget}s)")
+    
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._watchdog.join(timeout=self.budget)
+        self._watchdog = None
+    
+    async def _tick(self) -> None:
+        """Measure how late the loop wakes a sleeping task"""
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.last_lag = max(0.0, now - started - self.interval)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            self.lag.observe(self.last_lag)
+            self.last_tick = now
+    
+    def current_lag(self, now: Optional[float] = None) -> float:
+        """Lag of the last tick, or how overdue the next one is if the loop is stalled now"""
+        now = time.monotonic() if now is None else now
+        overdue = now - (self.last_tick or self.started_at) - self.interval
+        return max(self.last_lag, overdue, 0.0)
+    
+    def _watch(self) -> None:
+        """Watchdog thread: report a loop that has not ticked within the budget"""
+        while not self._stopping.wait(self.budget / 2):
+            tick = self.last_tick
+            blocked = time.monotonic() - tick - self.interval
+            if blocked > self.budget and self._reported_tick != tick:
+                self._reported_tick = tick
+                self.stalls += 1
+                self._report(blocked)
+    
+    @staticmethod
+    def _blocked_update(frame) -> Optional[int]:
+        """Find the update being handled in the blocked call chain"""
+        while frame is not None:
+            update_id = getattr(frame.f_locals.get("update"), "update_id", None)
+            if update_id is not None:
+                return update_id
+            frame = frame.f_back
+        return None
+    
+    def _report(self, blocked: float) -> None:
+        """Log the loop thread's stack and the task and update it was running"""
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = "".join(traceback.format_stack(frame, limit=self.stack_limit)) if frame else "unavailable\n"
+        task = asyncio.current_task(self._loop)
+        task_name = task.get_name() if task is not None else "none (loop callback)"
+        loop_logger.warning(
+            f"Event loop blocked for {blocked * 1000:.0f}ms in task {task_name} "
+            f"(update {self._blocked_update(frame)}); loop thread stack:\n{stack}"
+        )
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get event loop lag metrics"""
+        return {
+            **self.lag.summary(),
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "stalls": self.stalls,
+        }
+
+
+# Global event loop monitor instance
+loop_monitor = LoopMonitor(
+    interval=config.monitoring.loop_tick_interval,
+    budget=config.monitoring.loop_block_budget
+)
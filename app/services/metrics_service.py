@@ -0,0 +1,315 @@
+"""
+Metrics Service Layer
+Embedded HTTP endpoint exporting runtime metrics in the Prometheus text format
+"""
+
+import asyncio
+import functools
+import gc
+import math
+import os
+import resource
+import threading
+import time
+from contextlib import suppress
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config.settings import config
+from app.services.catalog_service import catalog_service
+from app.services.conversation_service import conversation_service
+from app.services.database import DatabaseService, db_service
+from app.services.error_aggregator import error_aggregator
+from app.services.loop_monitor import loop_monitor
+from app.services.notification_outbox import notification_outbox
+from app.services.notification_service import notification_service
+from app.services.sms_dispatcher import CircuitBreaker, sms_dispatcher
+from app.utils.keyboards import keyboards
+from app.utils.logging import logger, main_logger
+from app.utils.tracing import LatencyHistogram, tracer
+
+metrics_logger = logger.getChild('metrics')
+
+# (status, content type, body)
+Response = Tuple[int, str, bytes]
+Route = Callable[[], Awaitable[Response]]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+REASONS = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 503: "Service Unavailable"}
+CIRCUIT_STATES = (CircuitBreaker.CLOSED, CircuitBreaker.HALF_OPEN, CircuitBreaker.OPEN)
+POOL_METRICS = {
+    "size": "Database connections kept in the pool",
+    "in_use": "Database connections checked out",
+    "idle": "Database connections idle in the pool",
+    "overflow": "Database connections opened beyond the pool size",
+    "waiting": "Sessions waiting for a database connection",
+}
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+@functools.lru_cache(maxsize=None)
+def _bucket_labels(buckets: Tuple[float, ...]) -> Tuple[str, ...]:
+    return tuple(_format_value(float(bound)) for bound in buckets) + ("+Inf",)
+
+
+class MetricsWriter:
+    """Builder of a Prometheus text-format exposition"""
+    
+    def __init__(self):
+        self._lines: List[str] = []
+        self._declared = set()
+    
+    def _declare(self, name: str, kind: str, description: str) -> None:
+        if name not in self._declared:
+            self._declared.add(name)
+            self._lines.append(f"# HELP {name} {description}")
+            self._lines.append(f"# TYPE {name} {kind}")
+    
+    @staticmethod
+    def _labels(labels: Optional[Dict[str, object]]) -> str:
+        return ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items()) if labels else ""
+    
+    def _sample(self, name: str, value: float, labels: Optional[Dict[str, object]] = None) -> None:
+        rendered = self._labels(labels)
+        self._lines.append(f"{name}{{{rendered}}} {_format_value(value)}" if rendered else f"{name} {_format_value(value)}")
+    
+    def gauge(self, name: str, description: str, value: float, labels: Optional[Dict[str, object]] = None) -> None:
+        self._declare(name, "gauge", description)
+        self._sample(name, value, labels)
+    
+    def counter(self, name: str, description: str, value: float, labels: Optional[Dict[str, object]] = None) -> None:
+        self._declare(name, "counter", description)
+        self._sample(name, value, labels)
+    
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        histogram: LatencyHistogram,
+        labels: Optional[Dict[str, object]] = None
+    ) -> None:
+        self._declare(name, "histogram", description)
+        rendered = self._labels(labels)
+        prefix = f"{name}_bucket{{{rendered}," if rendered else f"{name}_bucket{{"
+        cumulative = 0
+        for bound, count in zip(_bucket_labels(histogram.buckets), histogram.counts):
+            cumulative += count
+            self._lines.append(f'{prefix}le="{bound}"}} {cumulative}')
+        self._sample(f"{name}_sum", histogram.sum, labels)
+        self._sample(f"{name}_count", histogram.count, labels)
+    
+    def render(self) -> bytes:
+        return ("\n".join(self._lines) + "\n").encode()
+
+
+def _rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MetricsServer:
+    """
+    Minimal HTTP/1.1 server on the bot's event loop.
+    
+    ``/metrics`` is rendered on request from counters the services already
+    keep, so nothing is collected between scrapes; a scrape costs a pass over
+    those counters and one grouped count of the notification outbox. Other
+    endpoints are added with ``route``.
+    """
+    
+    def __init__(self, database: DatabaseService, host: str = "0.0.0.0", port: int = 8080):
+        self.database = database
+        self.host = host
+        self.port = port
+        self.started_at = time.time()
+        self.routes: Dict[str, Route] = {"/metrics": self.metrics}
+        self.scrapes = 0
+        self.last_scrape_seconds = 0.0
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    def route(self, path: str, handler: Route) -> None:
+        """Serve ``handler`` at ``path``"""
+        self.routes[path] = handler
+    
+    async def start(self) -> None:
+        """Start listening; a bind failure is logged and leaves the bot running"""
+        if self._server is not None:
+            return
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            metrics_logger.error(f"Could not start metrics endpoint on {self.host}:{self.port}: {str(e)}")
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        metrics_logger.info(f"Metrics endpoint listening on {self.host}:{self.port}")
+    
+    async def stop(self) -> None:
+        """Stop listening"""
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+        metrics_logger.info("Metrics endpoint stopped")
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one request and close the connection"""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            
+            handler = self.routes.get(target.split("?", 1)[0])
+            if method not in ("GET", "HEAD"):
+                status, content_type, body = 405, "text/plain", b"method not allowed\n"
+            elif handler is None:
+                status, content_type, body = 404, "text/plain", b"not found\n"
+            else:
+                status, content_type, body = await handler()
+            
+            writer.write(
+                f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1")
+            )
+            if method != "HEAD":
+                writer.write(body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ValueError, ConnectionError):
+            pass
+        except Exception as e:
+            metrics_logger.error(f"Metrics request failed: {str(e)}", exc_info=True)
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+    
+    async def metrics(self) -> Response:
+        """Render all metrics"""
+        started = time.perf_counter()
+        out = MetricsWriter()
+        self._collect_handlers(out)
+        self._collect_database(out)
+        self._collect_sms(out)
+        await self._collect_notifications(out)
+        self._collect_caches(out)
+        self._collect_conversations(out)
+        self._collect_process(out)
+        
+        self.scrapes += 1
+        out.counter("bot_metrics_scrapes_total", "Metrics scrapes served", self.scrapes)
+        out.gauge("bot_metrics_last_scrape_seconds", "Time taken to render the previous scrape", self.last_scrape_seconds)
+        self.last_scrape_seconds = time.perf_counter() - started
+        return 200, CONTENT_TYPE, out.render()
+    
+    @staticmethod
+    def _collect_handlers(out: MetricsWriter) -> None:
+        for (handler, outcome), count in sorted(tracer.outcomes.items()):
+            out.counter(
+                "bot_handler_calls_total", "Handler calls by outcome (ok, handled_error, error)",
+                count, {"handler": handler, "outcome": outcome}
+            )
+        for handler, histogram in sorted(tracer.handlers.items()):
+            out.histogram("bot_handler_latency_seconds", "Handler latency", histogram, {"handler": handler})
+        for (kind, name), histogram in sorted(tracer.spans.items()):
+            out.histogram(
+                "bot_span_latency_seconds", "DB, SMS and notification call latency",
+                histogram, {"kind": kind, "name": name}
+            )
+    
+    def _collect_database(self, out: MetricsWriter) -> None:
+        for key, value in self.database.pool_status().items():
+            out.gauge(f"bot_db_pool_{key}", POOL_METRICS[key], value)
+        out.histogram("bot_db_pool_wait_seconds", "Time to check out a database connection", self.database.pool_wait)
+    
+    @staticmethod
+    def _collect_sms(out: MetricsWriter) -> None:
+        out.gauge("bot_sms_queue_depth", "Verification SMS waiting for a worker", sms_dispatcher.queue_depth)
+        out.counter("bot_sms_rejected_total", "Verification SMS rejected by a full queue", sms_dispatcher.rejected)
+        for name, stats in sms_dispatcher.stats.items():
+            for result, count in (("sent", stats.sent), ("failed", stats.failed), ("retry", stats.retries)):
+                out.counter("bot_sms_sends_total", "SMS provider send attempts", count, {"provider": name, "result": result})
+        for name, breaker in sms_dispatcher.breakers.items():
+            for state in CIRCUIT_STATES:
+                out.gauge(
+                    "bot_sms_circuit_state", "SMS provider circuit breaker state (1 for the current one)",
+                    int(breaker.state == state), {"provider": name, "state": state}
+                )
+    
+    async def _collect_notifications(self, out: MetricsWriter) -> None:
+        if self.database.engine is not None:
+            try:
+                backlog = await asyncio.wait_for(notification_outbox.backlog(), timeout=2)
+            except Exception as e:
+                metrics_logger.warning(f"Could not count the notification outbox: {str(e)}")
+            else:
+                for status, count in backlog.items():
+                    out.gauge("bot_notification_outbox_entries", "Notification outbox entries", count, {"status": status})
+        for result, count in (
+            ("sent", notification_outbox.sent), ("failed", notification_outbox.failed),
+            ("digest", notification_outbox.digests)
+        ):
+            out.counter("bot_notification_outbox_total", "Notification outbox deliveries", count, {"result": result})
+        for recipient, stats in notification_service.recipients.items():
+            for result, count in (("sent", stats.sent), ("failed", stats.failed)):
+                out.counter(
+                    "bot_notification_messages_total", "Notification messages per recipient",
+                    count, {"recipient": recipient, "result": result}
+                )
+        out.counter("bot_error_alerts_total", "Admin error alerts sent", error_aggregator.alerts)
+        out.gauge("bot_error_fingerprints", "Error fingerprints in the current window", len(error_aggregator))
+    
+    @staticmethod
+    def _collect_caches(out: MetricsWriter) -> None:
+        for name, cache in (("catalog", catalog_service), ("keyboards", keyboards)):
+            lookups = cache.hits + cache.misses
+            out.counter("bot_cache_hits_total", "Cache hits", cache.hits, {"cache": name})
+            out.counter("bot_cache_misses_total", "Cache misses", cache.misses, {"cache": name})
+            out.gauge("bot_cache_hit_ratio", "Cache hit ratio since start", cache.hits / lookups if lookups else 0.0, {"cache": name})
+    
+    @staticmethod
+    def _collect_conversations(out: MetricsWriter) -> None:
+        for conversation, states in conversation_service.state_counts().items():
+            for state, count in states.items():
+                out.gauge(
+                    "bot_conversations_live", "Live conversations per state",
+                    count, {"conversation": conversation, "state": state}
+                )
+    
+    def _collect_process(self, out: MetricsWriter) -> None:
+        out.histogram("bot_event_loop_lag_seconds", "Event loop scheduling lag per tick", loop_monitor.lag)
+        out.counter("bot_event_loop_stalls_total", "Callbacks that blocked the loop beyond the budget", loop_monitor.stalls)
+        out.gauge("process_resident_memory_bytes", "Resident memory size", _rss_bytes())
+        out.counter("process_cpu_seconds_total", "User and system CPU time", time.process_time())
+        out.gauge("process_start_time_seconds", "Start time since the epoch", self.started_at)
+        out.gauge("bot_threads", "Live threads", threading.active_count())
+        out.gauge("bot_asyncio_tasks", "Pending asyncio tasks", len(asyncio.all_tasks()))
+        for name, description, key in (
+            ("python_gc_collections_total", "GC runs per generation", "collections"),
+            ("python_gc_objects_collected_total", "Objects collected by the GC", "collected"),
+        ):
+            for generation, stats in enumerate(gc.get_stats()):
+                out.counter(name, description, stats[key], {"generation": generation})
+        for generation, count in enumerate(gc.get_count()):
+            out.gauge("python_gc_objects_pending", "Allocations since the generation was last collected", count, {"generation": generation})
+        if main_logger.queue_handler is not None:
+            out.gauge("bot_log_queue_depth", "Log records waiting for the writer thread", main_logger.queue_handler.queue.qsize())
+            out.counter("bot_log_dropped_total", "Log records dropped by a full queue", main_logger.queue_handler.dropped)
+
+
+# Global metrics server instance
+metrics_server = MetricsServer(db_service, host=config.monitoring.host, port=config.monitoring.port)
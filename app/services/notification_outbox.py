@@ -0,0 +1,221 @@
+"""
+Notification Outbox
+Transactional outbox for admin notifications and its background dispatcher
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, func
+
+from app.config.settings import config
+from app.models import OutboxNotification
+from app.services.database import DatabaseService, db_service
+from app.services.notification_service import NotificationService, notification_service
+from app.utils.logging import notification_logger
+
+PENDING = "pending"
+FAILED = "failed"
+
+
+class NotificationOutbox:
+    """
+    Outbox decoupling admin notifications from the user's conversation.
+    
+    Handlers build an entry with ``entry()`` and hand it to the repository
+    call that stores the order or sign-up, so both are committed in one
+    transaction, then ``wake()`` the dispatcher. The dispatcher sends pending
+    entries in order through ``NotificationService.send_<kind>_notification``
+    and deletes them once sent. Failed sends are retried with exponential
+    backoff; after ``max_attempts`` an entry is kept with status ``failed``.
+    Entries survive restarts and are picked up again on the next start.
+    
+    Kinds listed in ``digest_kinds`` are coalesced: their entries wait up to
+    ``digest_window`` seconds (or until ``digest_max_events`` are queued) and
+    go out as one ``send_<kind>_digest`` message, so a launch or sale costs
+    one admin message per window instead of one per event. Every other kind,
+    errors included, is sent as soon as it is committed.
+    """
+    
+    def __init__(
+        self,
+        database: DatabaseService,
+        notifications: NotificationService,
+        poll_interval: float = 5,
+        batch_size: int = 50,
+        max_attempts: int = 8,
+        retry_backoff: float = 2,
+        digest_kinds: Iterable[str] = (),
+        digest_window: float = 60,
+        digest_max_events: int = 20
+    ):
+        self.database = database
+        self.notifications = notifications
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.digest_kinds = tuple(digest_kinds)
+        self.digest_window = digest_window
+        self.digest_max_events = digest_max_events
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.failed = 0
+        self.digests = 0
+    
+    @staticmethod
+    def entry(kind: str, **payload: Any) -> OutboxNotification:
+        """Build an outbox row for ``NotificationService.send_<kind>_notification(**payload)``"""
+        return OutboxNotification(kind=kind, payload=payload, status=PENDING, attempts=0)
+    
+    def wake(self) -> None:
+        """Tell the dispatcher a new entry was committed"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    def start(self) -> None:
+        """Start the background dispatcher (idempotent)"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="notification_outbox")
+        notification_logger.info("Notification outbox dispatcher started")
+    
+    async def stop(self) -> None:
+        """Stop the dispatcher; unsent entries stay in the outbox"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        notification_logger.info("Notification outbox dispatcher stopped")
+    
+    async def _run(self) -> None:
+        """Drain the outbox whenever woken and at least every poll interval"""
+        while True:
+            try:
+                while await self.drain() >= self.batch_size:
+                    pass
+            except Exception as e:
+                notification_logger.error(f"Notification outbox drain failed: {str(e)}", exc_info=True)
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+    
+    async def drain(self) -> int:
+        """
+        Send one batch of due entries
+        
+        Returns:
+            int: Number of entries attempted
+        """
+        now = datetime.utcnow()
+        due = (OutboxNotification.status == PENDING, OutboxNotification.next_attempt_at <= now)
+        async with self.database.get_session() as session:
+            result = await session.execute(
+                select(OutboxNotification)
+                .where(*due, OutboxNotification.kind.notin_(self.digest_kinds))
+                .order_by(OutboxNotification.id)
+                .limit(self.batch_size)
+            )
+            groups = [[entry] for entry in result.scalars().all()]
+            for kind in self.digest_kinds:
+                group = await self._ripe_digest(session, kind, due, now)
+                if group:
+                    groups.append(group)
+            
+            for group in groups:
+                error = await self._send(group)
+                if error is None:
+                    for entry in group:
+                        await session.delete(entry)
+                    self.sent += len(group)
+                else:
+                    for entry in group:
+                        self._record_failure(entry, error)
+                # Commit per message so a crash mid-batch never resends what was delivered
+                await session.commit()
+        return sum(len(group) for group in groups)
+    
+    async def _ripe_digest(self, session, kind: str, due: tuple, now: datetime) -> List[OutboxNotification]:
+        """
+        Get the due entries of a digest kind if they should be sent now
+        
+        A digest goes out once ``digest_max_events`` entries are waiting or the
+        oldest has waited ``digest_window`` seconds; until then entries stay
+        queued so later events join the same message.
+        """
+        result = await session.execute(
+            select(OutboxNotification)
+            .where(*due, OutboxNotification.kind == kind)
+            .order_by(OutboxNotification.id)
+            .limit(self.digest_max_events)
+        )
+        entries = list(result.scalars().all())
+        if not entries:
+            return []
+        if len(entries) >= self.digest_max_events:
+            return entries
+        if entries[0].created_at <= now - timedelta(seconds=self.digest_window):
+            return entries
+        return []
+    
+    def _record_failure(self, entry: OutboxNotification, error: str) -> None:
+        """Schedule a retry for the entry or give up on it"""
+        entry.attempts += 1
+        entry.last_error = error
+        if entry.attempts >= self.max_attempts:
+            entry.status = FAILED
+            self.failed += 1
+            notification_logger.error(
+                f"Giving up on {entry.kind} notification {entry.id} after {entry.attempts} attempts: {error}"
+            )
+        else:
+            delay = self.retry_backoff * 2 ** (entry.attempts - 1)
+            entry.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+    
+    async def _send(self, group: List[OutboxNotification]) -> Optional[str]:
+        """Send one entry, or several of the same kind as a digest; returns the error text on failure"""
+        kind = group[0].kind
+        name = f"send_{kind}_notification" if len(group) == 1 else f"send_{kind}_digest"
+        sender = getattr(self.notifications, name, None)
+        if sender is None:
+            return f"unknown notification kind '{kind}'"
+        try:
+            if len(group) == 1:
+                await sender(**group[0].payload)
+            else:
+                await sender([entry.payload for entry in group])
+        except Exception as e:
+            notification_logger.warning(f"{kind} notification {group[0].id} failed: {str(e)}")
+            return str(e)[:500]
+        if len(group) > 1:
+            self.digests += 1
+        return None
+    
+    async def backlog(self) -> Dict[str, int]:
+        """Count entries by status"""
+        async with self.database.get_session() as session:
+            result = await session.execute(
+                select(OutboxNotification.status, func.count()).group_by(OutboxNotification.status)
+            )
+            return {status: count for status, count in result.all()}
+
+
+# Global notification outbox instance
+notification_outbox = NotificationOutbox(
+    db_service,
+    notification_service,
+    poll_interval=config.notification.outbox_poll_interval,
+    batch_size=config.notification.outbox_batch_size,
+    max_attempts=config.notification.outbox_max_attempts,
+    retry_backoff=config.notification.outbox_retry_backoff,
+    digest_kinds=config.notification.digest_kinds,
+    digest_window=config.notification.digest_window,
+    digest_max_events=config.notification.digest_max_events
+)
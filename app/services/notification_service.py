@@ -3,73 +3,304 @@ Notification Service Layer
 Admin notification and messaging system
 """
 
-import os
-from typing import Optional
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from itertools import chain
+from typing import Optional, Deque, Dict, Any, List, Sequence, Union
 from datetime import datetime
-from telethon import TelegramClient
 
 from app.config.settings import config
 from app.exceptions.base import NotificationException
 from app.utils.logging import notification_logger
+from app.utils.tracing import sample_percentile, tracer
 
 
-class NotificationService:
-    """Service for sending notifications to admins and users"""
+Recipient = Union[int, str]
+
+
+class NotificationBackend(ABC):
+    """
+    Transport that delivers notification messages.
+    
+    Recipients are chat ids, or ``@username`` where the backend can resolve
+    one. Implementations raise on failure; ``NotificationService`` accounts
+    the failure to the recipient.
+    """
+    
+    name: str
+    
+    @abstractmethod
+    async def send(self, recipient: Recipient, message: str, parse_mode: Optional[str] = None) -> None:
+        """Deliver a message to one recipient"""
+    
+    def attach(self, bot) -> None:
+        """Hand the running application's Bot to the backend"""
+    
+    async def warm_up(self, recipients: Sequence[Recipient]) -> None:
+        """Open connections and resolve recipients ahead of the first message"""
+    
+    async def close(self) -> None:
+        """Release backend resources"""
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {}
+
+
+class BotAPIBackend(NotificationBackend):
+    """
+    Backend sending through the python-telegram-bot ``Bot`` of the running
+    application, so notifications share its HTTP connection pool and need no
+    session file or second login. Recipients are addressed by chat id, which
+    needs no lookup; each must have started the bot once.
+    """
+    
+    name = "bot_api"
     
     def __init__(self):
+        self.bot = None
+    
+    def attach(self, bot) -> None:
+        self.bot = bot
+    
+    async def send(self, recipient: Recipient, message: str, parse_mode: Optional[str] = None) -> None:
+        if self.bot is None:
+            raise NotificationException(recipient=str(recipient), message="Notification bot is not attached yet")
+        await self.bot.send_message(chat_id=recipient, text=message, parse_mode=parse_mode)
+    
+    async def warm_up(self, recipients: Sequence[Recipient]) -> None:
+        if self.bot is not None:
+            # Fails early if a recipient never started the bot or the id is wrong
+            for recipient in recipients:
+                await self.bot.get_chat(recipient)
+
+
+class TelethonBackend(NotificationBackend):
+    """
+    Backend sending through a separate Telethon (MTProto) client logged in
+    with the bot token.
+    
+    One connection is kept for the process lifetime and each recipient's
+    peer is resolved once and cached, so a notification costs a single
+    send round trip instead of a lookup plus a send. If a send fails the
+    cached peer is dropped and resolved again before one retry. Telethon is
+    only imported when this backend connects.
+    """
+    
+    name = "telethon"
+    
+    def __init__(self, api_id: Optional[int], api_hash: Optional[str]):
+        self.api_id = api_id
+        self.api_hash = api_hash
         self.client = None
-        self.admin_username = config.telegram.admin_username
+        self._entities: Dict[Recipient, Any] = {}
+        self._client_lock = asyncio.Lock()
+        self.entity_lookups = 0
     
-    async def _get_client(self) -> TelegramClient:
+    async def _get_client(self):
         """Get initialized Telegram client"""
-        if not self.client:
-            if not config.telegram.api_id or not config.telegram.api_hash:
-                raise NotificationException(
-                    recipient="admin",
-                    message="Missing Telegram API credentials for notifications"
-                )
-            
-            self.client = TelegramClient(
-                'notification_session',
-                config.telegram.api_id,
-                config.telegram.api_hash
-            )
+        if self.client and self.client.is_connected():
+            return self.client
+        
+        async with self._client_lock:
+            if not self.client:
+                if not self.api_id or not self.api_hash:
+                    raise NotificationException(
+                        recipient="admin",
+                        message="Missing Telegram API credentials for notifications"
+                    )
+                
+                from telethon import TelegramClient
+                self.client = TelegramClient('notification_session', self.api_id, self.api_hash)
             
-            await self.client.start(bot_token=config.telegram.bot_token)
-            notification_logger.info("Notification client initialized")
+            if not self.client.is_connected():
+                await self.client.start(bot_token=config.telegram.bot_token)
+                notification_logger.info("Notification client initialized")
         
         return self.client
     
-    async def send_to_admin(self, message: str, parse_mode: str = None) -> bool:
+    async def _get_entity(self, client, recipient: Recipient):
+        """Get the recipient's input peer, resolving it only once"""
+        entity = self._entities.get(recipient)
+        if entity is None:
+            entity = self._entities[recipient] = await client.get_input_entity(recipient)
+            self.entity_lookups += 1
+            notification_logger.info(f"Resolved notification recipient {recipient}")
+        return entity
+    
+    async def send(self, recipient: Recipient, message: str, parse_mode: Optional[str] = None) -> None:
+        client = await self._get_client()
+        from telethon.errors import FloodWaitError
+        try:
+            await client.send_message(await self._get_entity(client, recipient), message, parse_mode=parse_mode)
+        except FloodWaitError:
+            raise
+        except Exception as e:
+            # The cached peer may be stale (account changed, access hash expired)
+            notification_logger.warning(f"Notification to {recipient} failed, resolving it again: {str(e)}")
+            self._entities.pop(recipient, None)
+            await client.send_message(await self._get_entity(client, recipient), message, parse_mode=parse_mode)
+    
+    async def warm_up(self, recipients: Sequence[Recipient]) -> None:
+        client = await self._get_client()
+        for recipient in recipients:
+            await self._get_entity(client, recipient)
+    
+    async def close(self) -> None:
+        if self.client and self.client.is_connected():
+            await self.client.disconnect()
+            notification_logger.info("Notification client disconnected")
+        self._entities.clear()
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {"entity_lookups": self.entity_lookups}
+
+
+@dataclass
+class RecipientStats:
+    """Delivery metrics of a single recipient"""
+    sent: int = 0
+    failed: int = 0
+    last_error: Optional[str] = None
+
+
+class NotificationService:
+    """
+    Service for sending notifications to admins and sellers.
+    
+    Messages are formatted here and delivered by a ``NotificationBackend``:
+    the Bot API backend by default, or Telethon when
+    ``NOTIFICATION_BACKEND=telethon``. ``routes`` maps a notification kind
+    (``order``, ``lottery``, ``error``, ...) to its admin chats; other kinds
+    go to ``default_recipients``. Orders placed with a referral code are also
+    sent to the owning seller; that copy is a separate outbox entry
+    (``seller_order``), so retrying one never resends the other.
+    
+    A message is fanned out to all of its recipients concurrently, at most
+    ``concurrency`` sends at a time across the service and each bounded by
+    ``send_timeout``, so a slow or blocked chat never holds up the others.
+    Failures are counted per recipient; a notification only fails (and is
+    retried by the outbox) when none of its recipients received it.
+    """
+    
+    def __init__(
+        self,
+        backend: NotificationBackend,
+        routes: Optional[Dict[str, List[Recipient]]] = None,
+        default_recipients: Sequence[Recipient] = (),
+        concurrency: int = 8,
+        send_timeout: float = 10
+    ):
+        self.backend = backend
+        self.routes = routes or {}
+        self.default_recipients = list(default_recipients)
+        self.send_timeout = send_timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.recipients: Dict[Recipient, RecipientStats] = defaultdict(RecipientStats)
+        self.sent = 0
+        self.failed = 0
+        self.latencies: Deque[float] = deque(maxlen=1000)
+    
+    def attach_bot(self, bot) -> None:
+        """Give the backend the application's Bot"""
+        self.backend.attach(bot)
+    
+    def recipients_for(self, kind: Optional[str]) -> List[Recipient]:
+        """Get the admin chats a kind of notification is routed to"""
+        return self.routes.get(kind, self.default_recipients)
+    
+    async def warm_up(self) -> None:
+        """Connect and resolve the admins at startup so the first notification is fast"""
+        admins = list(dict.fromkeys(chain(self.default_recipients, *self.routes.values())))
+        try:
+            await self.backend.warm_up(admins)
+        except Exception as e:
+            # Notifications retry the connection lazily; startup must not fail on them
+            notification_logger.warning(f"Notification warm-up failed: {str(e)}")
+    
+    async def _send_one(self, recipient: Recipient, message: str, parse_mode: Optional[str]) -> bool:
+        """Send to one recipient and account the outcome to it"""
+        stats = self.recipients[recipient]
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(
+                    self.backend.send(recipient, message, parse_mode=parse_mode), timeout=self.send_timeout
+                )
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                stats.failed += 1
+                stats.last_error = error[:200]
+                self.failed += 1
+                notification_logger.error(f"Failed to send notification to {recipient}: {error}")
+                return False
+        
+        elapsed = time.perf_counter() - started
+        stats.sent += 1
+        self.sent += 1
+        self.latencies.append(elapsed)
+        notification_logger.info(f"Notification sent to {recipient} in {elapsed * 1000:.0f}ms")
+        return True
+    
+    @tracer.traced("notification")
+    async def send_to(self, recipients: Sequence[Recipient], message: str, parse_mode: str = None) -> bool:
+        """
+        Send a message to several recipients concurrently
+        
+        Returns:
+            bool: True if at least one recipient received it
+        
+        Raises:
+            NotificationException: If there are no recipients or every send failed
+        """
+        recipients = list(dict.fromkeys(recipients))
+        if not recipients:
+            raise NotificationException(
+                recipient="admin",
+                message="No notification recipients configured (set ADMIN_CHAT_ID or NOTIFICATION_ROUTES)"
+            )
+        
+        delivered = await asyncio.gather(*(self._send_one(r, message, parse_mode) for r in recipients))
+        if not any(delivered):
+            raise NotificationException(
+                recipient=", ".join(str(r) for r in recipients),
+                message="Failed to send notification to any recipient"
+            )
+        return True
+    
+    async def send_to_admin(self, message: str, parse_mode: str = None, kind: Optional[str] = None) -> bool:
         """
-        Send notification message to admin
+        Send notification message to the admins of a kind of notification
         
         Args:
             message: Message text
             parse_mode: Telegram parse mode (Markdown, HTML, etc.)
+            kind: Routing key; admins without a route get the default recipients
             
         Returns:
             bool: Success status
         """
-        try:
-            client = await self._get_client()
-            target_user = await client.get_entity(f'@{self.admin_username}')
-            
-            await client.send_message(
-                target_user,
-                message,
-                parse_mode=parse_mode
-            )
-            
-            notification_logger.info(f"Admin notification sent successfully to @{self.admin_username}")
-            return True
-            
-        except Exception as e:
-            notification_logger.error(f"Failed to send admin notification: {str(e)}", exc_info=True)
-            raise NotificationException(
-                recipient=f"@{self.admin_username}",
-                message=f"Failed to send notification: {str(e)}"
-            )
+        return await self.send_to(self.recipients_for(kind), message, parse_mode=parse_mode)
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        return sample_percentile(self.latencies, percentile)
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get admin notification delivery metrics"""
+        return {
+            "backend": self.backend.name,
+            "sent": self.sent,
+            "failed": self.failed,
+            **self.backend.metrics(),
+            "latency_p50": self.latency_percentile(0.5),
+            "latency_p95": self.latency_percentile(0.95),
+            "recipients": {
+                str(recipient): {"sent": stats.sent, "failed": stats.failed, "last_error": stats.last_error}
+                for recipient, stats in self.recipients.items()
+            },
+        }
     
     async def send_order_notification(
         self,
@@ -83,13 +314,47 @@ class NotificationService:
     ) -> bool:
         """Send new order notification to admin"""
         
+        message = self._format_order(
+            order_id, user_id, username, product_name, final_price, payment_type, referral_code
+        )
+        return await self.send_to_admin(message, kind="order")
+    
+    async def send_seller_order_notification(
+        self,
+        seller_chat_id: int,
+        order_id: int,
+        user_id: int,
+        username: str,
+        product_name: str,
+        final_price: int,
+        payment_type: str,
+        referral_code: Optional[str] = None
+    ) -> bool:
+        """Send a new order placed with a seller's referral code to that seller"""
+        
+        message = self._format_order(
+            order_id, user_id, username, product_name, final_price, payment_type, referral_code
+        )
+        return await self.send_to([seller_chat_id], message)
+    
+    @staticmethod
+    def _format_order(
+        order_id: int,
+        user_id: int,
+        username: str,
+        product_name: str,
+        final_price: int,
+        payment_type: str,
+        referral_code: Optional[str]
+    ) -> str:
         payment_type_persian = "نقدی" if payment_type == "cash" else "قسطی"
         referral_info = f"🎫 کد معرف: {referral_code}\n" if referral_code else "🎫 کد معرف: ندارد\n"
+        customer = f"👤 کاربر: @{username}\n" if username else f"🆔 آیدی: {user_id}\n"
         
-        message = (
+        return (
             "🛒 سفارش جدید!\n\n"
             f"📦 محصول: {product_name}\n"
-            f"👤 کاربر: @{username}\n" if username else f"🆔 آیدی: {user_id}\n"
+            f"{customer}"
             f"💰 قیمت نهایی: {final_price:,} تومان\n"
             f"💳 نوع پرداخت: {payment_type_persian}\n"
             f"{referral_info}"
@@ -97,8 +362,6 @@ class NotificationService:
             f"📅 تاریخ: {datetime.now().strftime('%Y/%m/%d %H:%M')}\n\n"
             "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
         )
-        
-        return await self.send_to_admin(message)
     
     async def send_cooperation_notification(
         self,
@@ -122,7 +385,7 @@ class NotificationService:
             "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
         )
         
-        return await self.send_to_admin(message)
+        return await self.send_to_admin(message, kind="cooperation")
     
     async def send_lottery_notification(
         self,
@@ -144,7 +407,7 @@ class NotificationService:
             "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
         )
         
-        return await self.send_to_admin(message)
+        return await self.send_to_admin(message, kind="lottery")
     
     async def send_crm_notification(
         self,
@@ -165,7 +428,7 @@ class NotificationService:
             "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
         )
         
-        return await self.send_to_admin(message)
+        return await self.send_to_admin(message, kind="crm")
     
     async def send_installment_notification(
         self,
@@ -189,7 +452,7 @@ class NotificationService:
             "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
         )
         
-        return await self.send_to_admin(message)
+        return await self.send_to_admin(message, kind="installment")
     
     async def send_registration_notification(
         self,
@@ -214,7 +477,47 @@ class NotificationService:
             "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
         )
         
-        return await self.send_to_admin(message)
+        return await self.send_to_admin(message, kind="registration")
+    
+    async def send_lottery_digest(self, entries: List[Dict[str, Any]]) -> bool:
+        """Send one summary of several lottery participations to admin"""
+        
+        lines = []
+        for entry in entries:
+            display_name = f"@{entry['username']}" if entry.get('username') else f"User_{entry['telegram_id']}"
+            lines.append(f"• {entry['lottery_name']} | {display_name} | {entry['phone']}")
+        
+        message = (
+            f"🎲 {len(entries)} شرکت جدید در قرعه کشی\n\n"
+            + "\n".join(lines) + "\n\n"
+            f"📅 تاریخ: {datetime.now().strftime('%Y/%m/%d %H:%M')}\n\n"
+            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+        )
+        
+        return await self.send_to_admin(message, kind="lottery")
+    
+    async def send_order_digest(self, entries: List[Dict[str, Any]]) -> bool:
+        """Send one summary of several new orders to admin"""
+        return await self.send_to_admin(self._format_order_digest(entries), kind="order")
+    
+    @staticmethod
+    def _format_order_digest(entries: List[Dict[str, Any]]) -> str:
+        total = sum(entry['final_price'] for entry in entries)
+        installments = sum(1 for entry in entries if entry['payment_type'] != "cash")
+        per_product: Dict[str, int] = {}
+        for entry in entries:
+            per_product[entry['product_name']] = per_product.get(entry['product_name'], 0) + 1
+        products = "\n".join(f"• {name}: {count}" for name, count in per_product.items())
+        
+        return (
+            f"🛒 {len(entries)} سفارش جدید\n\n"
+            f"💰 جمع مبلغ: {total:,} تومان\n"
+            f"💳 نقدی: {len(entries) - installments} | قسطی: {installments}\n\n"
+            f"📦 محصولات:\n{products}\n\n"
+            f"🆔 سفارش‌ها: {', '.join(str(entry['order_id']) for entry in entries)}\n"
+            f"📅 تاریخ: {datetime.now().strftime('%Y/%m/%d %H:%M')}\n\n"
+            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+        )
     
     async def send_error_notification(
         self,
@@ -244,14 +547,31 @@ class NotificationService:
             "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
         )
         
-        return await self.send_to_admin(message)
+        return await self.send_to_admin(message, kind="error")
     
     async def close(self) -> None:
         """Close notification client"""
-        if self.client and self.client.is_connected():
-            await self.client.disconnect()
-            notification_logger.info("Notification client disconnected")
+        await self.backend.close()
+
+
+def create_notification_service() -> NotificationService:
+    """Create the notification service with the configured backend and routes"""
+    if config.notification.backend == TelethonBackend.name:
+        backend = TelethonBackend(config.telegram.api_id, config.telegram.api_hash)
+        admins = [f"@{config.telegram.admin_username}"]
+    else:
+        backend = BotAPIBackend()
+        admins = [config.telegram.admin_chat_id] if config.telegram.admin_chat_id else []
+    
+    routes = dict(config.notification.routes)
+    return NotificationService(
+        backend,
+        routes=routes,
+        default_recipients=routes.pop("*", admins),
+        concurrency=config.notification.fanout_concurrency,
+        send_timeout=config.notification.send_timeout
+    )
 
 
 # Global notification service instance
-notification_service = NotificationService()
+notification_service = create_notification_service()
@@ -0,0 +1,238 @@
+"""
+OTP Service Layer
+Server-side one-time password store with expiry and attempt limits
+"""
+
+import hmac
+import re
+import secrets
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Deque, Dict, Optional, Tuple
+
+from app.config.settings import config
+from app.exceptions.base import SMSException, RateLimitException
+from app.services.rate_limiter import TokenBucketLimiter
+from app.services.sms_delivery_service import SMSDeliveryTracker, sms_delivery_tracker
+from app.services.sms_dispatcher import SMSDispatcher, sms_dispatcher
+from app.utils.logging import auth_logger
+from app.utils.validation import InputValidator
+
+
+class OTPPurpose(str, Enum):
+    """Flows that verify a phone number with an OTP"""
+    REGISTRATION = "registration"
+    CRM = "crm"
+    LOTTERY = "lottery"
+    COOPERATION = "cooperation"
+
+
+class OTPResult(str, Enum):
+    """Outcome of checking a submitted code"""
+    VALID = "valid"
+    INVALID = "invalid"
+    EXPIRED = "expired"
+    LOCKED = "locked"
+
+
+@dataclass(slots=True)
+class PendingCode:
+    """An issued code waiting to be verified"""
+    code: str
+    expires_at: float
+    attempts: int = 0
+
+
+OTPKey = Tuple[str, str]
+
+
+class OTPStore:
+    """
+    In-memory store of outstanding codes keyed by (purpose, phone).
+    
+    Every code lives for the same TTL, so codes expire in the order they were
+    issued and a FIFO queue works as the expiry wheel: purging only ever looks
+    at its head, keeping every operation O(1) amortized. Queue entries left
+    behind by verified or replaced codes are skipped when they reach the head.
+    The store never holds more than ``max_pending`` codes; beyond that the
+    oldest outstanding code is evicted.
+    """
+    
+    def __init__(self, ttl_seconds: float, max_attempts: int, max_pending: int, length: int = 4):
+        self.ttl_seconds = ttl_seconds
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        self.length = length
+        self._codes: Dict[OTPKey, PendingCode] = {}
+        self._expiry: Deque[Tuple[float, OTPKey]] = deque()
+        self.evicted = 0
+    
+    def __len__(self) -> int:
+        return len(self._codes)
+    
+    def _generate(self) -> str:
+        """Generate a code with a cryptographically secure RNG"""
+        low = 10 ** (self.length - 1)
+        return str(low + secrets.randbelow(9 * low))
+    
+    def _drop_head(self) -> bool:
+        """Remove the oldest queue entry and its code if it is still current"""
+        expires_at, key = self._expiry.popleft()
+        pending = self._codes.get(key)
+        if pending is not None and pending.expires_at == expires_at:
+            del self._codes[key]
+            return True
+        return False
+    
+    def purge_expired(self, now: Optional[float] = None) -> None:
+        """Drop all codes whose TTL has passed"""
+        now = time.monotonic() if now is None else now
+        while self._expiry and self._expiry[0][0] <= now:
+            self._drop_head()
+    
+    def issue(self, purpose: str, phone: str) -> Tuple[str, bool]:
+        """
+        Get the outstanding code for (purpose, phone) or issue a new one
+        
+        Returns:
+            Tuple[str, bool]: (code, whether it was newly issued and must be sent)
+        """
+        now = time.monotonic()
+        self.purge_expired(now)
+        
+        key = (purpose, phone)
+        pending = self._codes.get(key)
+        if pending is not None:
+            return pending.code, False
+        
+        while len(self._codes) >= self.max_pending and self._expiry:
+            if self._drop_head():
+                self.evicted += 1
+        
+        pending = PendingCode(code=self._generate(), expires_at=now + self.ttl_seconds)
+        self._codes[key] = pending
+        self._expiry.append((pending.expires_at, key))
+        return pending.code, True
+    
+    def verify(self, purpose: str, phone: str, submitted: str) -> OTPResult:
+        """Check a submitted code; valid codes are single-use"""
+        now = time.monotonic()
+        self.purge_expired(now)
+        
+        key = (purpose, phone)
+        pending = self._codes.get(key)
+        if pending is None:
+            return OTPResult.EXPIRED
+        
+        normalized = re.sub(r'\s', '', InputValidator.normalize_persian_digits(submitted or ""))
+        if hmac.compare_digest(normalized.encode(), pending.code.encode()):
+            del self._codes[key]
+            return OTPResult.VALID
+        
+        pending.attempts += 1
+        if pending.attempts >= self.max_attempts:
+            del self._codes[key]
+            return OTPResult.LOCKED
+        return OTPResult.INVALID
+    
+    def discard(self, purpose: str, phone: str) -> None:
+        """Forget the outstanding code for (purpose, phone)"""
+        self._codes.pop((purpose, phone), None)
+
+
+class OTPService:
+    """
+    Service issuing OTPs over SMS and verifying them against the store.
+    
+    ``send_code`` is the only path to a paid SMS, so it is where sends are
+    rate limited: both the target phone and the requesting Telegram user must
+    have a token left. Reusing an outstanding code costs nothing and is not
+    limited.
+    """
+    
+    def __init__(
+        self,
+        store: OTPStore,
+        sms: SMSDispatcher,
+        phone_limiter: Optional[TokenBucketLimiter] = None,
+        user_limiter: Optional[TokenBucketLimiter] = None,
+        delivery: Optional[SMSDeliveryTracker] = None
+    ):
+        self.store = store
+        self.sms = sms
+        self.phone_limiter = phone_limiter
+        self.user_limiter = user_limiter
+        self.delivery = delivery
+    
+    def _check_rate_limit(self, phone: str, telegram_id: Optional[int]) -> None:
+        """
+        Take a send token for the user and the phone or raise RateLimitException
+        
+        Tokens are only spent when both limits allow the send: a user token
+        taken before the phone limit denies is refunded.
+        """
+        user_id = telegram_id or 0
+        user_limited = self.user_limiter is not None and telegram_id is not None
+        if user_limited:
+            retry_after = self.user_limiter.acquire(telegram_id)
+            if retry_after:
+                auth_logger.warning(f"OTP send rate limit hit by user {telegram_id}")
+                raise RateLimitException(user_id, "otp_user", retry_after=retry_after)
+        if self.phone_limiter is not None:
+            retry_after = self.phone_limiter.acquire(phone)
+            if retry_after:
+                if user_limited:
+                    self.user_limiter.refund(telegram_id)
+                auth_logger.warning(f"OTP send rate limit hit for {phone} by user {telegram_id}")
+                raise RateLimitException(user_id, "otp_phone", retry_after=retry_after)
+    
+    async def send_code(self, purpose: OTPPurpose, phone: str, telegram_id: Optional[int] = None) -> bool:
+        """
+        Send a code to the phone unless one is already outstanding
+        
+        Returns:
+            bool: True if an SMS was sent, False if the outstanding code was reused
+        
+        Raises:
+            RateLimitException: If the phone or the user has sent too many codes
+            SMSException: If SMS sending fails
+        """
+        code, is_new = self.store.issue(purpose.value, phone)
+        if not is_new:
+            auth_logger.info(f"Reusing outstanding {purpose.value} OTP for {phone}")
+            return False
+        
+        try:
+            self._check_rate_limit(phone, telegram_id)
+            result = await self.sms.send_otp(phone, code)
+        except (RateLimitException, SMSException):
+            # Let the user request a fresh code instead of reusing one they never got
+            self.store.discard(purpose.value, phone)
+            raise
+        
+        if self.delivery is not None:
+            self.delivery.record(phone, result, purpose.value)
+        return True
+    
+    def verify(self, purpose: OTPPurpose, phone: str, submitted: str) -> OTPResult:
+        """Verify a submitted code"""
+        result = self.store.verify(purpose.value, phone, submitted)
+        if result is not OTPResult.VALID:
+            auth_logger.warning(f"{purpose.value} OTP check for {phone}: {result.value}")
+        return result
+
+
+# Global OTP service instance
+otp_service = OTPService(
+    OTPStore(
+        ttl_seconds=config.security.otp_expiry_minutes * 60,
+        max_attempts=config.security.max_otp_attempts,
+        max_pending=config.security.otp_max_pending
+    ),
+    sms_dispatcher,
+    phone_limiter=TokenBucketLimiter(config.security.otp_phone_burst, config.security.otp_refill_seconds),
+    user_limiter=TokenBucketLimiter(config.security.otp_user_burst, config.security.otp_refill_seconds),
+    delivery=sms_delivery_tracker
+)
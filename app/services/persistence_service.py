@@ -0,0 +1,237 @@
+"""
+Persistence Service Layer
+Database-backed conversation and user_data persistence with write-behind flushing
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Optional, Dict, Tuple, Set, Any
+
+from sqlalchemy import select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from telegram.ext import BasePersistence, PersistenceInput
+
+from app.config.settings import config
+from app.models import PersistedState
+from app.services.database import DatabaseService, db_service
+from app.utils.conversation_state import encode_state, decode_state
+from app.utils.logging import database_logger
+
+USER_DATA_NAMESPACE = "user_data"
+CONVERSATION_NAMESPACE = "conversation:{name}"
+
+# Rows per INSERT statement, well below the driver's bind parameter limit
+UPSERT_CHUNK_SIZE = 1000
+
+# Row key -> encoded value, or None when the row must be deleted
+StagedRows = Dict[Tuple[str, str], Optional[Any]]
+
+
+class DatabasePersistence(BasePersistence):
+    """
+    Persistence for conversation states and user_data in the ``bot_persistence`` table.
+    
+    Writes are staged in memory and flushed in one transaction per batch:
+    the application hands over every dirty entry once per ``update_interval``
+    and the whole batch becomes a single upsert/delete round trip. user_data is
+    loaded lazily the first time a user is seen instead of all at startup.
+    A batch that fails to write is kept staged and retried with exponential
+    backoff (capped at ``max_retry_delay``), so a database blip while the bot
+    is idle does not leave state in memory only until the next update.
+    """
+    
+    def __init__(
+        self,
+        database: DatabaseService,
+        flush_interval: float = 10,
+        retry_backoff: float = 1,
+        max_retry_delay: float = 60
+    ):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=flush_interval
+        )
+        self.database = database
+        self._staged: StagedRows = {}
+        self._loaded_users: Set[int] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._waiting_to_retry = False
+        self.retry_backoff = retry_backoff
+        self.max_retry_delay = max_retry_delay
+        self.flushes = 0
+        self.retries = 0
+        self.rows_written = 0
+    
+    async def get_user_data(self) -> Dict[int, Dict[str, Any]]:
+        """Return no user_data up front; it is loaded per user in ``refresh_user_data``"""
+        return {}
+    
+    async def refresh_user_data(self, user_id: int, user_data: Dict[str, Any]) -> None:
+        """Load a user's persisted data the first time they send an update"""
+        if user_id in self._loaded_users:
+            return
+        
+        async with self.database.get_session() as session:
+            result = await session.execute(
+                select(PersistedState.data).where(
+                    PersistedState.namespace == USER_DATA_NAMESPACE,
+                    PersistedState.key == str(user_id)
+                )
+            )
+            data = result.scalar_one_or_none()
+        
+        self._loaded_users.add(user_id)
+        if data:
+            # Keep anything the current update already put there
+            for key, value in decode_state(data).items():
+                user_data.setdefault(key, value)
+    
+    async def get_conversations(self, name: str) -> Dict[Tuple[int, ...], object]:
+        """Load all persisted states of a conversation handler"""
+        async with self.database.get_session() as session:
+            result = await session.execute(
+                select(PersistedState.key, PersistedState.data).where(
+                    PersistedState.namespace == CONVERSATION_NAMESPACE.format(name=name)
+                )
+            )
+            rows = result.all()
+        
+        database_logger.info(f"Restored {len(rows)} '{name}' conversations")
+        return {tuple(json.loads(key)): state for key, state in rows}
+    
+    async def update_conversation(self, name: str, key: Tuple[int, ...], new_state: Optional[object]) -> None:
+        """Stage a conversation state change (``None`` ends the conversation)"""
+        row_key = (CONVERSATION_NAMESPACE.format(name=name), json.dumps(list(key)))
+        self._stage(row_key, new_state)
+    
+    async def update_user_data(self, user_id: int, data: Dict[str, Any]) -> None:
+        """Stage a user's data"""
+        self._loaded_users.add(user_id)
+        self._stage((USER_DATA_NAMESPACE, str(user_id)), encode_state(data) or None)
+    
+    async def drop_user_data(self, user_id: int) -> None:
+        """Stage deletion of a user's data"""
+        # Swept users must not stay tracked, or the set grows with every user ever seen
+        self._loaded_users.discard(user_id)
+        self._stage((USER_DATA_NAMESPACE, str(user_id)), None)
+    
+    def _stage(self, row_key: Tuple[str, str], value: Optional[Any]) -> None:
+        """Record a pending write and make sure a flush is scheduled"""
+        self._staged[row_key] = value
+        if self._flush_task is None or self._flush_task.done():
+            # The application gathers all update_* calls of a run together, so
+            # this task only runs once every one of them has been staged
+            self._flush_task = asyncio.create_task(self._write_staged())
+    
+    async def _write_staged(self, retry: bool = True) -> None:
+        """Write staged rows, one transaction per batch, until nothing is left"""
+        failures = 0
+        while self._staged:
+            batch, self._staged = self._staged, {}
+            if await self._write_batch(batch):
+                failures = 0
+                continue
+            
+            # Put the batch back without overwriting anything staged meanwhile
+            for row_key, value in batch.items():
+                self._staged.setdefault(row_key, value)
+            if not retry:
+                return
+            
+            # Rows staged while waiting join the retried batch
+            failures += 1
+            self.retries += 1
+            delay = min(self.retry_backoff * 2 ** (failures - 1), self.max_retry_delay)
+            database_logger.warning(f"Retrying persistence flush of {len(self._staged)} rows in {delay:.1f}s")
+            self._waiting_to_retry = True
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._waiting_to_retry = False
+    
+    async def _write_batch(self, batch: StagedRows) -> bool:
+        """Upsert and delete a batch of rows in a single transaction"""
+        upserts = [
+            {"namespace": namespace, "key": key, "data": value, "updated_at": datetime.utcnow()}
+            for (namespace, key), value in batch.items() if value is not None
+        ]
+        deletes: Dict[str, list] = {}
+        for (namespace, key), value in batch.items():
+            if value is None:
+                deletes.setdefault(namespace, []).append(key)
+        
+        try:
+            async with self.database.get_session() as session:
+                for start in range(0, len(upserts), UPSERT_CHUNK_SIZE):
+                    await session.execute(self._upsert_statement(upserts[start:start + UPSERT_CHUNK_SIZE]))
+                for namespace, keys in deletes.items():
+                    await session.execute(
+                        delete(PersistedState).where(
+                            PersistedState.namespace == namespace,
+                            PersistedState.key.in_(keys)
+                        )
+                    )
+                await session.commit()
+        except Exception as e:
+            database_logger.error(f"Failed to flush persistence batch of {len(batch)} rows: {str(e)}")
+            return False
+        
+        self.flushes += 1
+        self.rows_written += len(batch)
+        database_logger.debug(f"Flushed {len(upserts)} persisted rows, deleted {len(batch) - len(upserts)}")
+        return True
+    
+    def _upsert_statement(self, rows: list):
+        """Build a dialect-specific bulk upsert for persisted rows"""
+        dialect = self.database.engine.dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        
+        statement = insert(PersistedState).values(rows)
+        return statement.on_conflict_do_update(
+            index_elements=[PersistedState.namespace, PersistedState.key],
+            set_={"data": statement.excluded.data, "updated_at": statement.excluded.updated_at}
+        )
+    
+    async def flush(self) -> None:
+        """Write everything still staged (called on shutdown)"""
+        if self._flush_task is not None:
+            if self._waiting_to_retry:
+                # Don't sit out the backoff; the final attempt below covers it
+                self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self._write_staged(retry=False)
+        database_logger.debug("Persistence flushed")
+    
+    # Chat, bot and callback data are not stored
+    
+    async def get_chat_data(self) -> Dict[int, Any]:
+        return {}
+    
+    async def get_bot_data(self) -> Any:
+        return {}
+    
+    async def get_callback_data(self) -> Optional[Any]:
+        return None
+    
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        pass
+    
+    async def update_bot_data(self, data: Any) -> None:
+        pass
+    
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+    
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+    
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        pass
+    
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        pass
+
+
+# Global persistence instance
+persistence = DatabasePersistence(db_service, config.persistence.flush_interval)
@@ -0,0 +1,109 @@
+"""
+Phone Verification Service Layer
+Registry of recently verified phone numbers so returning users can skip OTP
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from telegram.ext import ContextTypes
+
+from app.config.settings import config
+from app.models import VerifiedPhone
+from app.services.database import DatabaseService, db_service
+from app.utils.logging import auth_logger
+from app.utils.tracing import tracer
+
+
+class PhoneVerificationService:
+    """
+    Service remembering which phone numbers each Telegram user has verified.
+    
+    Registration records the number that becomes ``User.number`` and the CRM,
+    lottery and cooperation flows record the numbers they verify. A later flow
+    skips the SMS step when the same Telegram user enters a number verified
+    within ``ttl``; a number verified by someone else never counts.
+    """
+    
+    def __init__(self, database: DatabaseService, ttl: Optional[timedelta]):
+        self.database = database
+        self.ttl = ttl
+        self.skipped_otps = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.ttl)
+    
+    @tracer.traced("db")
+    async def is_verified(self, telegram_id: int, phone: str) -> bool:
+        """Check whether the user verified this phone recently enough to skip OTP"""
+        if not self.enabled:
+            return False
+        
+        async with self.database.get_session() as session:
+            verified_at = await session.scalar(
+                select(VerifiedPhone.verified_at).where(
+                    VerifiedPhone.telegram_id == telegram_id,
+                    VerifiedPhone.phone == phone
+                )
+            )
+        
+        if verified_at is None or datetime.utcnow() - verified_at > self.ttl:
+            return False
+        
+        self.skipped_otps += 1
+        auth_logger.info(f"Skipping OTP for {phone}, verified by user {telegram_id} at {verified_at}")
+        return True
+    
+    @tracer.traced("db")
+    async def mark_verified(self, telegram_id: int, phone: str) -> None:
+        """Record a successful verification of the phone by the user"""
+        dialect = self.database.engine.dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        
+        statement = insert(VerifiedPhone).values(
+            telegram_id=telegram_id, phone=phone, verified_at=datetime.utcnow()
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[VerifiedPhone.telegram_id, VerifiedPhone.phone],
+            set_={"verified_at": statement.excluded.verified_at}
+        )
+        
+        try:
+            async with self.database.get_session() as session:
+                await session.execute(statement)
+                await session.commit()
+        except Exception as e:
+            # Losing the record only means the next flow asks for a code again
+            auth_logger.error(f"Failed to record verified phone {phone} for user {telegram_id}: {str(e)}")
+    
+    async def purge_expired(self) -> int:
+        """Delete verifications older than the freshness window"""
+        if not self.enabled:
+            return 0
+        
+        async with self.database.get_session() as session:
+            result = await session.execute(
+                delete(VerifiedPhone).where(VerifiedPhone.verified_at < datetime.utcnow() - self.ttl)
+            )
+            await session.commit()
+        
+        if result.rowcount:
+            auth_logger.info(f"Purged {result.rowcount} expired phone verifications")
+        return result.rowcount
+    
+    async def purge(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Job callback purging expired verifications"""
+        try:
+            await self.purge_expired()
+        except Exception as e:
+            auth_logger.error(f"Failed to purge phone verifications: {str(e)}")
+
+
+# Global phone verification service instance
+phone_verification_service = PhoneVerificationService(
+    db_service,
+    timedelta(days=config.security.verified_phone_ttl_days) if config.security.verified_phone_ttl_days else None
+)
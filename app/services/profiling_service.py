@@ -0,0 +1,199 @@
+"""
+Profiling Service Layer
+On-demand sampling CPU profiles and tracemalloc memory snapshots
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Set
+
+from app.config.settings import config
+from app.exceptions.base import BotException
+from app.utils.logging import logger
+
+profiling_logger = logger.getChild('profiling')
+
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+@dataclass
+class ProfileResult:
+    """Output of a profiling run"""
+    path: Path
+    summary: str
+
+
+class ProfilingService:
+    """
+    Service producing profiles of the running bot without a restart.
+    
+    ``profile`` samples the stacks of every thread from a helper thread for
+    a number of seconds and writes them in the collapsed-stack format
+    (``frame;frame;frame count``) read by flamegraph.pl, speedscope and
+    similar tools. ``memory_snapshot`` starts ``tracemalloc`` on first use
+    and reports the top allocation sites and the growth since the previous
+    snapshot; ``stop_memory_tracing`` turns it off again. Nothing runs and
+    nothing is traced between requests, so the cost is paid only while a
+    profile is being taken or memory tracing is on.
+    """
+    
+    def __init__(
+        self,
+        output_dir: str = "logs/profiles",
+        sample_interval: float = 0.005,
+        max_seconds: int = 300,
+        trace_frames: int = 10,
+        top_sites: int = 15
+    ):
+        self.output_dir = Path(output_dir)
+        self.sample_interval = sample_interval
+        self.max_seconds = max_seconds
+        self.trace_frames = trace_frames
+        self.top_sites = top_sites
+        self._profiling = False
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._signal_tasks: Set[asyncio.Task] = set()
+    
+    @property
+    def profiling(self) -> bool:
+        return self._profiling
+    
+    def _path(self, kind: str, suffix: str) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        return self.output_dir / f"{kind}-{datetime.now():%Y%m%d-%H%M%S}.{suffix}"
+    
+    @staticmethod
+    def _fold(thread_name: str, frame) -> str:
+        """Collapse a stack into ``thread;outer;...;inner``"""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)})")
+            frame = frame.f_back
+        names.append(thread_name)
+        return ";".join(reversed(names))
+    
+    def _sample(self, seconds: float) -> tuple:
+        """Sample every other thread's stack until the time is up (runs in a worker thread)"""
+        own = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    stacks[self._fold(names.get(thread_id, str(thread_id)), frame)] += 1
+            samples += 1
+            time.sleep(self.sample_interval)
+        return stacks, samples
+    
+    async def profile(self, seconds: float) -> ProfileResult:
+        """
+        Take a sampling CPU profile
+        
+        Raises:
+            BotException: If a profile is already being taken
+        """
+        if self._profiling:
+            raise BotException(
+                message="A profile is already being taken",
+                error_code="PROFILE_IN_PROGRESS",
+                user_message="یک پروفایل در حال اجراست"
+            )
+        seconds = max(1, min(seconds, self.max_seconds))
+        self._profiling = True
+        profiling_logger.info(f"CPU profile started for {seconds}s")
+        try:
+            stacks, samples = await asyncio.to_thread(self._sample, seconds)
+        finally:
+            self._profiling = False
+        
+        path = self._path("cpu", "folded")
+        await asyncio.to_thread(
+            path.write_text, "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        )
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        top = "\n".join(
+            f"{count * 100 / max(1, sum(leaves.values())):5.1f}%  {frame}" for frame, count in leaves.most_common(10)
+        )
+        summary = f"CPU profile: {seconds}s, {samples} samples, {len(stacks)} distinct stacks\nTop frames:\n{top}"
+        profiling_logger.info(f"CPU profile written to {path}")
+        return ProfileResult(path, summary)
+    
+    def _snapshot_report(self) -> str:
+        """Take a snapshot and describe it (runs in a worker thread)"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"Traced memory: current {current / 1024 / 1024:.1f} MiB, peak {peak / 1024 / 1024:.1f} MiB",
+            "",
+            f"Top {self.top_sites} allocation sites:",
+        ]
+        lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:self.top_sites])
+        if self._previous is not None:
+            lines.extend(["", "Growth since the previous snapshot:"])
+            lines.extend(str(stat) for stat in snapshot.compare_to(self._previous, "lineno")[:self.top_sites])
+        self._previous = snapshot
+        return "\n".join(lines) + "\n"
+    
+    async def memory_snapshot(self) -> ProfileResult:
+        """Snapshot traced allocations, starting tracemalloc on first use"""
+        started_now = not tracemalloc.is_tracing()
+        if started_now:
+            tracemalloc.start(self.trace_frames)
+            self._previous = None
+            profiling_logger.info("Memory tracing started")
+        
+        report = await asyncio.to_thread(self._snapshot_report)
+        if started_now:
+            report = "Memory tracing just started; take another snapshot later to see growth.\n\n" + report
+        path = self._path("memory", "txt")
+        await asyncio.to_thread(path.write_text, report)
+        profiling_logger.info(f"Memory snapshot written to {path}")
+        return ProfileResult(path, report.split("\n\n", 1)[0])
+    
+    def trigger(self, kind: str, seconds: float) -> None:
+        """Signal handler entry point: write a ``cpu`` profile or ``memory`` snapshot to disk"""
+        job = self.profile(seconds) if kind == "cpu" else self.memory_snapshot()
+        task = asyncio.get_running_loop().create_task(job)
+        self._signal_tasks.add(task)
+        task.add_done_callback(self._signal_done)
+    
+    def _signal_done(self, task: asyncio.Task) -> None:
+        self._signal_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            profiling_logger.error(f"Signal-triggered profile failed: {task.exception()}")
+    
+    def stop_memory_tracing(self) -> bool:
+        """Stop tracemalloc and drop the kept snapshot; returns False if it was not running"""
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        self._previous = None
+        profiling_logger.info("Memory tracing stopped")
+        return True
+
+
+# Global profiling service instance
+profiling_service = ProfilingService(
+    output_dir=config.profiling.output_dir,
+    sample_interval=config.profiling.sample_interval,
+    max_seconds=config.profiling.max_seconds,
+    trace_frames=config.profiling.trace_frames
+)
@@ -0,0 +1,77 @@
+"""
+Rate Limiter
+In-memory token bucket limiter with idle bucket eviction
+"""
+
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket rate limiter keyed by an arbitrary hashable key.
+    
+    Each key may spend up to ``capacity`` tokens at once and regains one token
+    every ``refill_seconds``. A bucket that has been left alone long enough to
+    refill completely behaves exactly like a missing one, so such buckets are
+    evicted: buckets are kept in least-recently-used order and eviction only
+    ever inspects the head, which keeps memory proportional to the number of
+    recently active keys and every check O(1) amortized.
+    """
+    
+    __slots__ = ("capacity", "refill_seconds", "idle_seconds", "_buckets", "denied", "evicted")
+    
+    def __init__(self, capacity: int, refill_seconds: float):
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+        self.idle_seconds = capacity * refill_seconds
+        # key -> [tokens, updated_at]; lists keep per-key overhead small
+        self._buckets: "OrderedDict[Hashable, list]" = OrderedDict()
+        self.denied = 0
+        self.evicted = 0
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+    
+    def evict_idle(self, now: Optional[float] = None) -> None:
+        """Drop buckets that have refilled completely"""
+        now = time.monotonic() if now is None else now
+        buckets = self._buckets
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if now - bucket[1] < self.idle_seconds:
+                break
+            del buckets[key]
+            self.evicted += 1
+    
+    def acquire(self, key: Hashable, now: Optional[float] = None) -> float:
+        """
+        Take a token for the key
+        
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic() if now is None else now
+        self.evict_idle(now)
+        
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [self.capacity - 1, now]
+            return 0.0
+        
+        tokens = min(self.capacity, bucket[0] + (now - bucket[1]) / self.refill_seconds)
+        if tokens < 1:
+            self.denied += 1
+            return (1 - tokens) * self.refill_seconds
+        
+        bucket[0] = tokens - 1
+        bucket[1] = now
+        self._buckets.move_to_end(key)
+        return 0.0
+    
+    def refund(self, key: Hashable) -> None:
+        """Give back a token taken by ``acquire`` for an action that did not happen"""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket[0] = min(self.capacity, bucket[0] + 1)
@@ -0,0 +1,234 @@
+"""
+SMS Delivery Service Layer
+Tracks sent SMS and polls the provider for delivery statuses in batches
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from telegram.ext import ContextTypes
+
+from app.config.settings import config
+from app.constants.mappings import MOBILE_OPERATOR_PREFIXES
+from app.exceptions.base import SMSException
+from app.models import SMSMessage
+from app.services.database import DatabaseService, db_service
+from app.services.sms_service import SMSService, sms_service
+from app.utils.logging import logger
+from app.utils.tracing import sample_percentile
+
+delivery_logger = logger.getChild('sms_delivery')
+
+# Kavenegar message statuses that will not change any more
+DELIVERED_STATUSES = {10}
+FAILED_STATUSES = {6, 11, 13, 14, 100}
+
+# Only messages sent through this provider can be polled
+TRACKED_PROVIDER = "kavenegar"
+
+
+def mobile_operator(phone: str) -> str:
+    """Get the mobile operator of a 09xxxxxxxxx number"""
+    return MOBILE_OPERATOR_PREFIXES.get(phone[:4], "other")
+
+
+@dataclass
+class DeliveryStats:
+    """Delivery outcomes of one mobile operator"""
+    delivered: int = 0
+    failed: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+    
+    @property
+    def failure_rate(self) -> float:
+        resolved = self.delivered + self.failed
+        return self.failed / resolved if resolved else 0.0
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        return sample_percentile(self.latencies, percentile)
+
+
+class SMSDeliveryTracker:
+    """
+    Tracker persisting the message ids of sent SMS and resolving their delivery.
+    
+    Sends are staged in memory and written in one insert per poll. Each poll
+    then asks the provider for the status of every unresolved message, up to
+    ``batch_size`` ids per request, and records delivered/failed outcomes.
+    Failed OTP deliveries are logged as soon as the poll sees them. Delivery
+    latency is the time from send to the poll that saw the final status, so it
+    is accurate to within one poll interval.
+    """
+    
+    def __init__(
+        self,
+        database: DatabaseService,
+        sms: SMSService,
+        batch_size: int = 200,
+        max_age_seconds: int = 3600
+    ):
+        self.database = database
+        self.sms = sms
+        self.batch_size = batch_size
+        self.max_age = timedelta(seconds=max_age_seconds)
+        self._staged: List[Dict[str, Any]] = []
+        self.stats: Dict[str, DeliveryStats] = {}
+        self.status_requests = 0
+    
+    def record(self, phone: str, result: dict, purpose: Optional[str] = None) -> None:
+        """Stage the message ids of a successful send for tracking"""
+        if result.get("provider") != TRACKED_PROVIDER:
+            return
+        
+        sent_at = datetime.utcnow()
+        for entry in result.get("response") or []:
+            message_id = entry.get("messageid") if isinstance(entry, dict) else None
+            if message_id is None:
+                continue
+            self._staged.append({
+                "message_id": int(message_id),
+                "provider": TRACKED_PROVIDER,
+                "phone": phone,
+                "operator": mobile_operator(phone),
+                "purpose": purpose,
+                "status": entry.get("status"),
+                "sent_at": sent_at,
+            })
+    
+    async def flush(self) -> None:
+        """Write staged messages"""
+        if not self._staged:
+            return
+        
+        rows, self._staged = self._staged, []
+        dialect = self.database.engine.dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        
+        try:
+            async with self.database.get_session() as session:
+                await session.execute(insert(SMSMessage).values(rows).on_conflict_do_nothing())
+                await session.commit()
+        except Exception as e:
+            self._staged = rows + self._staged
+            delivery_logger.error(f"Failed to store {len(rows)} sent SMS: {str(e)}")
+    
+    async def _pending(self) -> List[Tuple[int, str, str, Optional[str], datetime]]:
+        """Get unresolved messages young enough to keep polling"""
+        async with self.database.get_session() as session:
+            result = await session.execute(
+                select(
+                    SMSMessage.message_id, SMSMessage.phone, SMSMessage.operator,
+                    SMSMessage.purpose, SMSMessage.sent_at
+                ).where(
+                    SMSMessage.resolved_at.is_(None),
+                    SMSMessage.provider == TRACKED_PROVIDER,
+                    SMSMessage.sent_at > datetime.utcnow() - self.max_age
+                ).order_by(SMSMessage.sent_at)
+            )
+            return list(result.all())
+    
+    async def poll_once(self) -> int:
+        """
+        Resolve delivery statuses of pending messages
+        
+        Returns:
+            int: Number of messages that reached a final status
+        """
+        await self.flush()
+        pending = await self._pending()
+        resolved = 0
+        
+        for start in range(0, len(pending), self.batch_size):
+            batch = {row[0]: row for row in pending[start:start + self.batch_size]}
+            try:
+                entries = await self.sms.get_sms_statuses(list(batch))
+            except SMSException as e:
+                delivery_logger.warning(f"Delivery status poll failed: {e.message}")
+                break
+            self.status_requests += 1
+            resolved += await self._apply(batch, entries)
+        
+        return resolved
+    
+    async def _apply(self, batch: Dict[int, tuple], entries: List[dict]) -> int:
+        """Store the statuses of one batch and update the stats"""
+        now = datetime.utcnow()
+        # One UPDATE per distinct (status, text) instead of one per message
+        groups: Dict[Tuple[int, str, bool], List[int]] = {}
+        resolved = 0
+        
+        for entry in entries:
+            message_id = int(entry.get("messageid", 0))
+            status = int(entry.get("status", 0))
+            row = batch.get(message_id)
+            if row is None:
+                continue
+            
+            final = status in DELIVERED_STATUSES or status in FAILED_STATUSES
+            groups.setdefault((status, entry.get("statustext", ""), final), []).append(message_id)
+            if not final:
+                continue
+            
+            resolved += 1
+            _, phone, operator, purpose, sent_at = row
+            stats = self.stats.setdefault(operator, DeliveryStats())
+            if status in DELIVERED_STATUSES:
+                stats.delivered += 1
+                stats.latencies.append((now - sent_at).total_seconds())
+            else:
+                stats.failed += 1
+                delivery_logger.error(
+                    f"{purpose or 'SMS'} message {message_id} to {phone} ({operator}) "
+                    f"was not delivered: {entry.get('statustext', status)}"
+                )
+        
+        if groups:
+            async with self.database.get_session() as session:
+                for (status, status_text, final), message_ids in groups.items():
+                    await session.execute(
+                        update(SMSMessage)
+                        .where(SMSMessage.message_id.in_(message_ids))
+                        .values(status=status, status_text=status_text, resolved_at=now if final else None)
+                    )
+                await session.commit()
+        return resolved
+    
+    async def poll(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Periodic job: poll delivery statuses"""
+        try:
+            resolved = await self.poll_once()
+        except Exception as e:
+            delivery_logger.error(f"Delivery status poll failed: {str(e)}", exc_info=True)
+            return
+        if resolved:
+            delivery_logger.debug(f"Resolved delivery of {resolved} SMS")
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get per-operator delivery metrics"""
+        return {
+            "staged": len(self._staged),
+            "status_requests": self.status_requests,
+            "operators": {
+                operator: {
+                    "delivered": stats.delivered,
+                    "failed": stats.failed,
+                    "failure_rate": stats.failure_rate,
+                    "latency_p50": stats.latency_percentile(0.5),
+                    "latency_p95": stats.latency_percentile(0.95),
+                }
+                for operator, stats in self.stats.items()
+            }
+        }
+
+
+# Global SMS delivery tracker instance
+sms_delivery_tracker = SMSDeliveryTracker(
+    db_service,
+    sms_service,
+    batch_size=config.sms.status_batch_size,
+    max_age_seconds=config.sms.status_max_age
+)
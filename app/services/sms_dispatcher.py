@@ -0,0 +1,293 @@
+"""
+SMS Dispatch Layer
+Queued SMS delivery with retries, circuit breaking and provider failover
+"""
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from kavenegar import APIException, HTTPException
+
+from app.config.settings import config
+from app.exceptions.base import SMSException
+from app.services.kavenegar_client import AsyncKavenegarClient
+from app.services.sms_service import sms_service
+from app.utils.logging import logger
+from app.utils.tracing import sample_percentile, tracer
+
+dispatch_logger = logger.getChild('sms_dispatch')
+
+
+class SMSProvider(ABC):
+    """
+    Interface for an SMS vendor.
+    
+    Implementations raise ``kavenegar.HTTPException`` for transient failures
+    (timeouts, connection errors, bad gateway responses), which are retried
+    and count against the provider's circuit breaker, and
+    ``kavenegar.APIException`` for requests the vendor rejected, which are not.
+    """
+    
+    name: str
+    
+    @abstractmethod
+    async def send_otp(self, phone_number: str, otp: str) -> Any:
+        """Send a verification code"""
+    
+    async def close(self) -> None:
+        """Release provider resources"""
+
+
+class KavenegarProvider(SMSProvider):
+    """Kavenegar verify-lookup provider"""
+    
+    name = "kavenegar"
+    
+    def __init__(self, client: AsyncKavenegarClient, template: str):
+        self.client = client
+        self.template = template
+    
+    async def send_otp(self, phone_number: str, otp: str) -> Any:
+        return await self.client.verify_lookup({
+            "receptor": phone_number,
+            "token": otp,
+            "template": self.template,
+            "type": "sms"
+        })
+    
+    async def close(self) -> None:
+        await self.client.close()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    
+    Opens after ``failure_threshold`` consecutive failures and rejects calls
+    for ``reset_timeout`` seconds; after that one trial call is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+    
+    def allow(self) -> bool:
+        """Check whether a call may be attempted now"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            return True
+        # Only one trial call while half-open
+        return self.state == self.CLOSED
+    
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+    
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+@dataclass
+class ProviderStats:
+    """Delivery metrics of a single provider"""
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+    
+    @property
+    def failure_rate(self) -> float:
+        attempts = self.sent + self.failed
+        return self.failed / attempts if attempts else 0.0
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        return sample_percentile(self.latencies, percentile)
+
+
+@dataclass
+class SMSJob:
+    """A queued verification SMS"""
+    phone_number: str
+    otp: str
+    result: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class SMSDispatcher:
+    """
+    Dispatcher that sends SMS through a bounded queue and a worker pool.
+    
+    Providers are tried in order: each gets ``max_retries`` retries with
+    exponential backoff on transient errors, and providers whose circuit is
+    open are skipped so a dead vendor fails fast instead of holding up every
+    conversation. ``send_otp`` has the same contract as ``SMSService.send_otp``
+    and raises ``SMSException`` once every provider has failed.
+    """
+    
+    def __init__(
+        self,
+        providers: List[SMSProvider],
+        queue_size: int = 1000,
+        workers: int = 4,
+        max_retries: int = 2,
+        retry_backoff: float = 0.5,
+        breaker_failures: int = 5,
+        breaker_reset_seconds: float = 30
+    ):
+        self.providers = providers
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.breakers: Dict[str, CircuitBreaker] = {
+            p.name: CircuitBreaker(breaker_failures, breaker_reset_seconds) for p in providers
+        }
+        self.stats: Dict[str, ProviderStats] = {p.name: ProviderStats() for p in providers}
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.rejected = 0
+    
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+    
+    def start(self) -> None:
+        """Start the worker pool (idempotent)"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"sms_worker_{i}") for i in range(self.workers)
+        ]
+        dispatch_logger.info(f"SMS dispatcher started with {self.workers} workers")
+    
+    async def stop(self) -> None:
+        """Let queued messages finish, then stop the workers"""
+        if not self._tasks:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for provider in self.providers:
+            await provider.close()
+        dispatch_logger.info("SMS dispatcher stopped")
+    
+    @tracer.traced("sms")
+    async def send_otp(self, phone_number: str, otp: str) -> dict:
+        """
+        Queue a verification SMS and wait for it to be delivered
+        
+        Raises:
+            SMSException: If the queue is full or every provider failed
+        """
+        self.start()
+        job = SMSJob(phone_number, otp, asyncio.get_running_loop().create_future())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            dispatch_logger.error(f"SMS queue full ({self.queue_size}), rejecting message to {phone_number}")
+            raise SMSException(phone_number=phone_number, error_details="SMS queue is full")
+        return await job.result
+    
+    async def _worker(self) -> None:
+        """Deliver queued jobs until cancelled"""
+        while True:
+            job = await self._queue.get()
+            try:
+                result = await self._deliver(job)
+                if not job.result.done():
+                    job.result.set_result(result)
+            except Exception as e:
+                if not job.result.done():
+                    job.result.set_exception(e)
+            finally:
+                self._queue.task_done()
+    
+    async def _deliver(self, job: SMSJob) -> dict:
+        """Send a job through the first healthy provider"""
+        last_error = "no SMS provider available"
+        
+        for provider in self.providers:
+            breaker = self.breakers[provider.name]
+            stats = self.stats[provider.name]
+            if not breaker.allow():
+                continue
+            
+            for attempt in range(self.max_retries + 1):
+                started = time.perf_counter()
+                try:
+                    response = await provider.send_otp(job.phone_number, job.otp)
+                except APIException as e:
+                    # The vendor rejected the request itself; another try won't help
+                    stats.failed += 1
+                    breaker.record_success()
+                    raise SMSException(phone_number=job.phone_number, error_details=f"Kavenegar API error: {str(e)}")
+                except HTTPException as e:
+                    stats.failed += 1
+                    last_error = f"{provider.name}: {str(e)}"
+                    if attempt < self.max_retries:
+                        stats.retries += 1
+                        await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                    continue
+                
+                stats.sent += 1
+                stats.latencies.append(time.perf_counter() - started)
+                breaker.record_success()
+                dispatch_logger.info(f"OTP sent to {job.phone_number} via {provider.name}")
+                return {"success": True, "provider": provider.name, "response": response}
+            
+            breaker.record_failure()
+            dispatch_logger.warning(f"SMS provider {provider.name} failed for {job.phone_number}: {last_error}")
+        
+        raise SMSException(phone_number=job.phone_number, error_details=f"HTTP error: {last_error}")
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get queue and per-provider delivery metrics"""
+        return {
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+            "providers": {
+                name: {
+                    "circuit": self.breakers[name].state,
+                    "sent": stats.sent,
+                    "failed": stats.failed,
+                    "retries": stats.retries,
+                    "failure_rate": stats.failure_rate,
+                    "latency_p50": stats.latency_percentile(0.5),
+                    "latency_p95": stats.latency_percentile(0.95),
+                }
+                for name, stats in self.stats.items()
+            }
+        }
+
+
+# Global SMS dispatcher instance
+sms_dispatcher = SMSDispatcher(
+    [KavenegarProvider(sms_service.api, sms_service.verify_template)],
+    queue_size=config.sms.dispatch_queue_size,
+    workers=config.sms.dispatch_workers,
+    max_retries=config.sms.max_retries,
+    retry_backoff=config.sms.retry_backoff,
+    breaker_failures=config.sms.breaker_failures,
+    breaker_reset_seconds=config.sms.breaker_reset_seconds
+)
@@ -3,25 +3,32 @@ SMS Service Layer
 SMS sending functionality with Kavenegar integration
 """
 
-import random
-from typing import Optional, Dict, Any
-from kavenegar import KavenegarAPI, APIException, HTTPException
+import secrets
+from typing import Optional, Dict, Any, List, Sequence
+from kavenegar import APIException, HTTPException
 
 from app.config.settings import config
 from app.exceptions.base import SMSException
+from app.services.kavenegar_client import AsyncKavenegarClient
 from app.utils.logging import logger
 
 
 class SMSService:
     """Service for SMS operations using Kavenegar"""
     
-    def __init__(self):
-        self.api = KavenegarAPI(config.sms.kavenegar_api_key)
+    def __init__(self, api: Optional[AsyncKavenegarClient] = None):
+        self.api = api or AsyncKavenegarClient(
+            config.sms.kavenegar_api_key,
+            base_url=config.sms.api_url,
+            timeout=config.sms.timeout,
+            max_connections=config.sms.max_connections
+        )
         self.verify_template = config.sms.verify_template
     
     def generate_otp(self, length: int = 4) -> str:
         """Generate random OTP code"""
-        return str(random.randint(10**(length-1), 10**length - 1))
+        low = 10 ** (length - 1)
+        return str(low + secrets.randbelow(9 * low))
     
     async def send_otp(self, phone_number: str, otp: str, template: Optional[str] = None) -> dict:
         """
@@ -41,7 +48,7 @@ class SMSService:
         try:
             template_name = template or self.verify_template
             
-            response = self.api.verify_lookup({
+            response = await self.api.verify_lookup({
                 "receptor": phone_number,
                 "token": otp,
                 "template": template_name,
@@ -109,7 +116,7 @@ class SMSService:
             if sender:
                 params["sender"] = sender
             
-            response = self.api.sms_send(params)
+            response = await self.api.sms_send(params)
             
             logger.info(f"Custom SMS sent successfully to {phone_number}")
             
@@ -178,7 +185,7 @@ class SMSService:
             if sender:
                 params["sender"] = sender
             
-            response = self.api.sms_sendarray(params)
+            response = await self.api.sms_sendarray(params)
             
             logger.info(f"Bulk SMS sent to {len(phone_numbers)} recipients")
             
@@ -215,7 +222,7 @@ class SMSService:
             dict: Status information
         """
         try:
-            response = self.api.sms_status(message_id)
+            response = await self.api.sms_status({"messageid": message_id})
             
             return {
                 "success": True,
@@ -229,6 +236,32 @@ class SMSService:
                 "error": str(e)
             }
     
+    async def get_sms_statuses(self, message_ids: Sequence[int]) -> List[dict]:
+        """
+        Get delivery statuses of many messages in one request
+        
+        Args:
+            message_ids: Message IDs from previous send operations
+            
+        Returns:
+            List[dict]: Kavenegar status entries (messageid, status, statustext)
+            
+        Raises:
+            SMSException: If the status request fails
+        """
+        try:
+            entries = await self.api.sms_status({"messageid": ",".join(str(i) for i in message_ids)})
+            return entries or []
+        except (APIException, HTTPException) as e:
+            raise SMSException(
+                phone_number="status",
+                error_details=f"Status check for {len(message_ids)} messages failed: {str(e)}"
+            )
+    
+    async def close(self) -> None:
+        """Close the SMS provider connection pool"""
+        await self.api.close()
+    
     def is_valid_phone_number(self, phone_number: str) -> bool:
         """Validate Iranian phone number format"""
         from app.utils.validation import is_valid_phone
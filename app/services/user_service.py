@@ -3,7 +3,7 @@ User Service Layer
 Business logic for user management and registration
 """
 
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Callable, Any
 from app.models import User
 from app.services.database import BaseRepository, db_service
 from app.exceptions.base import UserNotFoundException, UserNotRegisteredException, ValidationException
@@ -120,9 +120,14 @@ class UserService:
         city: str,
         area: str,
         national_id: str,
-        phone: str
+        phone: str,
+        notify: Optional[Callable[[User], Any]] = None
     ) -> User:
-        """Complete user registration after OTP verification"""
+        """
+        Complete user registration after OTP verification
+        
+        ``notify`` builds an outbox entry committed together with the user.
+        """
         
         # Validate all data
         is_valid, validated_data, errors = await self.validate_registration_data(
@@ -157,7 +162,8 @@ class UserService:
                 area=validated_data['area'],
                 id_number=validated_data['id_number'],
                 number=validated_data['number'],
-                approved=True
+                approved=True,
+                notify=notify
             )
         else:
             # Create new user
@@ -169,7 +175,8 @@ class UserService:
                 area=validated_data['area'],
                 id_number=validated_data['id_number'],
                 number=validated_data['number'],
-                approved=True
+                approved=True,
+                notify=notify
             )
         
         auth_logger.info(f"User registration completed: {telegram_id}")
@@ -0,0 +1,96 @@
+"""
+Conversation State Records
+Compact per-conversation state kept in user_data instead of ORM objects
+"""
+
+from dataclasses import dataclass, fields
+from typing import Optional, Dict, Any
+
+from app.models.enums import GradeEnum, MajorEnum
+
+
+@dataclass(slots=True)
+class ProductBrowseState:
+    """Grade/major the user is currently browsing products for"""
+    grade: int
+    major: Optional[str] = None
+    
+    @property
+    def grade_enum(self) -> GradeEnum:
+        return GradeEnum(self.grade)
+    
+    @property
+    def major_enum(self) -> Optional[MajorEnum]:
+        return MajorEnum(self.major) if self.major else None
+
+
+@dataclass(slots=True)
+class PurchaseState:
+    """State of an in-progress product purchase"""
+    product_id: int
+    waiting_for_referral_code: bool = False
+    referral_code: Optional[str] = None
+    seller_id: Optional[int] = None
+    referral_product: Optional[str] = None
+    referral_installment: bool = False
+    payment_type: Optional[str] = None
+    final_price: Optional[int] = None
+    first_installment: Optional[int] = None
+    
+    @property
+    def is_installment(self) -> bool:
+        return self.payment_type == 'installment'
+
+
+@dataclass(slots=True)
+class InstallmentUploadState:
+    """Installment receipt the user is about to upload"""
+    order_id: int
+    installment_index: int
+
+
+@dataclass(slots=True)
+class LotterySelection:
+    """Lottery the user selected to participate in"""
+    lottery_id: int
+    name: str
+
+
+# Records that may be persisted, keyed by their compact type tag
+STATE_RECORDS = {
+    cls.__name__: cls
+    for cls in (ProductBrowseState, PurchaseState, InstallmentUploadState, LotterySelection)
+}
+
+_PLAIN_TYPES = (str, int, float, bool, type(None), list, dict)
+
+
+def encode_state(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Encode user_data into a compact JSON-compatible dict.
+    
+    State records become ``{"@": <type>, "v": [<field values>]}``; plain
+    JSON values are kept as-is and anything else is dropped.
+    """
+    encoded = {}
+    for key, value in data.items():
+        record_type = STATE_RECORDS.get(type(value).__name__)
+        if record_type is not None and type(value) is record_type:
+            encoded[key] = {"@": record_type.__name__, "v": [getattr(value, f.name) for f in fields(value)]}
+        elif isinstance(value, _PLAIN_TYPES):
+            encoded[key] = value
+    return encoded
+
+
+def decode_state(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode user_data previously produced by ``encode_state``"""
+    decoded = {}
+    for key, value in data.items():
+        if isinstance(value, dict) and "@" in value:
+            record_type = STATE_RECORDS.get(value["@"])
+            if record_type is None:
+                continue
+            decoded[key] = record_type(*value["v"])
+        else:
+            decoded[key] = value
+    return decoded
@@ -3,9 +3,12 @@ Conversation Utilities
 Helper functions for conversation management and cleanup
 """
 
+from typing import Optional
+
 from telegram import Update, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler
 from app.utils.logging import logger
+from app.utils.validation import InputValidator
 from app.constants.messages import ErrorMessages
 
 
@@ -96,3 +99,25 @@ class ConversationUtils:
         except Exception as e:
             logger.error(f"Error setting context key '{key}': {str(e)}")
             return False
+    
+    @staticmethod
+    def shared_own_phone(update: Update) -> Optional[str]:
+        """
+        Get the normalized phone of a contact the user shared about themselves
+        
+        Telegram only attaches the sender's own ``user_id`` to a contact sent
+        with a ``request_contact`` button, so such a phone needs no OTP.
+        Returns None for forwarded or foreign contacts and invalid numbers.
+        """
+        if not update.message or not update.message.contact or not update.effective_user:
+            return None
+        
+        contact = update.message.contact
+        if contact.user_id != update.effective_user.id:
+            logger.warning(
+                f"User {update.effective_user.id} shared a contact of user {contact.user_id}"
+            )
+            return None
+        
+        is_valid, normalized_phone = InputValidator.validate_phone_number(contact.phone_number)
+        return normalized_phone if is_valid else None
@@ -0,0 +1,129 @@
+"""
+Keyboard Registry
+Prebuilt reply/inline keyboard markups shared across handlers
+"""
+
+from typing import Optional, Sequence, Dict, Tuple
+
+from telegram import (
+    InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
+)
+
+
+def _reply(rows, one_time: bool = True) -> ReplyKeyboardMarkup:
+    """Build a resizable reply keyboard from rows of button texts"""
+    return ReplyKeyboardMarkup(rows, resize_keyboard=True, one_time_keyboard=one_time)
+
+
+class KeyboardRegistry:
+    """
+    Registry of keyboard markups.
+    
+    Telegram objects are frozen once constructed, so the static markups are
+    built a single time and shared by every message. Product and lottery
+    keyboards depend on the catalog and are cached until it is invalidated.
+    """
+    
+    def __init__(self):
+        # Static markups
+        self.main_menu = _reply([
+            ["💎 خرید قسطی اشتراک الماس 💎"],
+            ["📚 خرید ویژه محصولات از نمایندگی 📚"],
+            ["💰 درآمد زایی و معرفی دوستان", "💬 مشاوره تلفنی رایگان"],
+            ["💳 اقساط من", "🎲 قرعه کشی"],
+            ["👩‍💻 پشتیبانی", "🤝 همکاری با نمایندگی"],
+            ["👤 ثبت نام", "💡 راهنما"]
+        ])
+        self.almas_grades = _reply([
+            ["پایه دوازدهم"],
+            ["پایه یازدهم"],
+            ["پایه دهم"],
+        ])
+        self.product_grades = _reply([
+            ["پایه دوازدهم"],
+            ["پایه یازدهم"],
+            ["پایه دهم"],
+            ["پایه نهم"],
+            ["پایه هشتم"],
+            ["پایه هفتم"],
+            ["پایه ششم"],
+            ["پایه پنجم"],
+        ])
+        self.majors = _reply([["ریاضی"], ["تجربی"], ["انسانی"]])
+        self.registration_city = _reply([["تهران"]])
+        self.referral_choice = _reply([
+            ["کد معرف دارم"],
+            ["کد معرف ندارم"]
+        ])
+        self.payment_methods = _reply([
+            ["پرداخت قسطی"],
+            ["پرداخت نقدی"]
+        ])
+        self.cash_only = _reply([
+            ["پرداخت نقدی"],
+            ["🔙 بازگشت به منو"]
+        ])
+        self.share_contact = _reply([[KeyboardButton("📱 ارسال شماره من", request_contact=True)]])
+        self.remove = ReplyKeyboardRemove()
+        self.not_registered = InlineKeyboardMarkup([
+            [InlineKeyboardButton("👤 ثبت نام", callback_data="authorize")],
+            [InlineKeyboardButton("هنوز مطمعن نیستم", callback_data="not_sure")],
+            [InlineKeyboardButton("🔙 بازگشت به منو", callback_data="back_to_menu")]
+        ])
+        
+        # Catalog-derived markups
+        self._product_keyboards: Dict[tuple, Tuple[Tuple[str, ...], ReplyKeyboardMarkup]] = {}
+        self._lottery_keyboard: Optional[Tuple[Tuple[str, ...], ReplyKeyboardMarkup]] = None
+        self._product_details: Dict[int, InlineKeyboardMarkup] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def product_keyboard(self, grade, major, product_names: Sequence[str]) -> ReplyKeyboardMarkup:
+        """Get the product selection keyboard for a grade/major"""
+        names = tuple(product_names)
+        cached = self._product_keyboards.get((grade, major))
+        if cached and cached[0] == names:
+            self.hits += 1
+            return cached[1]
+        
+        self.misses += 1
+        markup = _reply([[name] for name in names], one_time=False)
+        self._product_keyboards[(grade, major)] = (names, markup)
+        return markup
+    
+    def lottery_keyboard(self, lottery_names: Sequence[str]) -> ReplyKeyboardMarkup:
+        """Get the lottery selection keyboard"""
+        names = tuple(lottery_names)
+        if self._lottery_keyboard and self._lottery_keyboard[0] == names:
+            self.hits += 1
+            return self._lottery_keyboard[1]
+        
+        self.misses += 1
+        markup = _reply([[name] for name in names] + [["🔙 بازگشت به منو"]])
+        self._lottery_keyboard = (names, markup)
+        return markup
+    
+    def product_details(self, product_id: int) -> InlineKeyboardMarkup:
+        """Get the buy/back inline keyboard for a product"""
+        markup = self._product_details.get(product_id)
+        if markup is not None:
+            self.hits += 1
+            return markup
+        
+        self.misses += 1
+        markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🛒 خرید", callback_data=f"buy_{product_id}")],
+            [InlineKeyboardButton("🔙 بازگشت به منو", callback_data="back_to_menu")]
+        ])
+        self._product_details[product_id] = markup
+        return markup
+    
+    def invalidate_dynamic(self) -> None:
+        """Drop all catalog-derived keyboards"""
+        self._product_keyboards.clear()
+        self._lottery_keyboard = None
+        self._product_details.clear()
+
+
+# Global keyboard registry instance
+keyboards = KeyboardRegistry()
@@ -3,14 +3,35 @@ Enterprise Logging Configuration
 Centralized logging setup with proper levels, formatting, and rotation
 """
 
+import atexit
+import json
 import logging
 import logging.handlers
+import queue
 import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
 from app.config.settings import config
 
+# Update being processed by the current task; copied onto every log record
+log_update_id: ContextVar[Optional[int]] = ContextVar("log_update_id", default=None)
+log_user_id: ContextVar[Optional[int]] = ContextVar("log_user_id", default=None)
+log_handler: ContextVar[Optional[str]] = ContextVar("log_handler", default=None)
+
+
+class ContextFilter(logging.Filter):
+    """Stamp records with the update context of the task that logged them"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Values passed explicitly through ``extra`` win
+        record.__dict__.setdefault("update_id", log_update_id.get())
+        record.__dict__.setdefault("user_id", log_user_id.get())
+        record.__dict__.setdefault("handler", log_handler.get())
+        return True
+
 
 class ColoredFormatter(logging.Formatter):
     """Custom formatter with colors for console output"""
@@ -24,17 +45,69 @@ class ColoredFormatter(logging.Formatter):
         'CRITICAL': '\033[35m', # Magenta
         'RESET': '\033[0m'      # Reset
     }
-
+    
+    def __init__(self):
+        super().__init__()
+        reset_color = self.COLORS['RESET']
+        # One formatter per level, built once instead of per record
+        self._formatters = {
+            level: logging.Formatter(f"{color}%(asctime)s - %(name)s - %(levelname)s{reset_color} - %(message)s")
+            for level, color in self.COLORS.items()
+        }
+    
     def format(self, record):
         """Format log record with colors for console output"""
-        log_color = self.COLORS.get(record.levelname, self.COLORS['RESET'])
-        reset_color = self.COLORS['RESET']
-        
-        # Add colors to the formatter
-        formatter = logging.Formatter(
-            f"{log_color}%(asctime)s - %(name)s - %(levelname)s{reset_color} - %(message)s"
-        )
-        return formatter.format(record)
+        return self._formatters.get(record.levelname, self._formatters['RESET']).format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the update context of the record"""
+    
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "update_id": getattr(record, "update_id", None),
+            "user_id": getattr(record, "user_id", None),
+            "handler": getattr(record, "handler", None),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that only does the work that must happen on the logging
+    thread: merging the message arguments and rendering the traceback. Final
+    formatting and I/O are left to the ``QueueListener`` thread. When the
+    queue is full the record is dropped and counted rather than blocking the
+    event loop.
+    """
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exception_formatter = logging.Formatter()
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue handler is the logger's only handler, so the record is not shared
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
 
 class BotLogger:
@@ -43,10 +116,18 @@ class BotLogger:
     def __init__(self, name: str = "telegram_bot"):
         self.name = name
         self.logger = logging.getLogger(name)
+        self.queue_handler: Optional[BackgroundQueueHandler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
         self._configured = False
     
     def configure(self) -> logging.Logger:
-        """Configure logging with enterprise settings"""
+        """
+        Configure logging with enterprise settings
+        
+        Records are put on a bounded queue by the logging thread and
+        formatted and written by a background ``QueueListener``, so slow
+        stdout or disk writes never stall the event loop.
+        """
         if self._configured:
             return self.logger
             
@@ -59,12 +140,22 @@ class BotLogger:
         # Create console handler
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(ColoredFormatter())
-        self.logger.addHandler(console_handler)
+        console_handler.setFormatter(JsonFormatter() if config.logging.json else ColoredFormatter())
+        handlers = [console_handler]
         
         # Create file handler if file path is specified
         if config.logging.file_path:
-            self._setup_file_handler()
+            handlers.append(self._create_file_handler())
+        
+        # Format and write on a background thread
+        self.queue_handler = BackgroundQueueHandler(queue.Queue(maxsize=config.logging.queue_size))
+        self.queue_handler.addFilter(ContextFilter())
+        self.logger.addHandler(self.queue_handler)
+        self.listener = logging.handlers.QueueListener(
+            self.queue_handler.queue, *handlers, respect_handler_level=True
+        )
+        self.listener.start()
+        atexit.register(self.stop)
         
         # Prevent propagation to root logger
         self.logger.propagate = False
@@ -72,8 +163,14 @@ class BotLogger:
         self._configured = True
         return self.logger
     
-    def _setup_file_handler(self) -> None:
-        """Setup rotating file handler for logs"""
+    def stop(self) -> None:
+        """Write out queued records and stop the background thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+    
+    def _create_file_handler(self) -> logging.Handler:
+        """Create rotating file handler for logs"""
         log_file = Path(config.logging.file_path)
         log_file.parent.mkdir(parents=True, exist_ok=True)
         
@@ -86,10 +183,10 @@ class BotLogger:
         )
         
         file_handler.setLevel(logging.DEBUG)
-        file_formatter = logging.Formatter(config.logging.format)
+        file_formatter = JsonFormatter() if config.logging.json else logging.Formatter(config.logging.format)
         file_handler.setFormatter(file_formatter)
         
-        self.logger.addHandler(file_handler)
+        return file_handler
     
     def get_child_logger(self, name: str) -> logging.Logger:
         """Get a child logger for specific components"""
@@ -125,6 +222,13 @@ def setup_telegram_logging():
 setup_telegram_logging()
 
 
+async def bind_log_context(update, context) -> None:
+    """Update handler (runs first): tag the log records of this update with its ids"""
+    log_update_id.set(update.update_id)
+    log_user_id.set(update.effective_user.id if update.effective_user else None)
+    log_handler.set(None)
+
+
 def log_function_call(func_name: str, user_id: Optional[int] = None, **kwargs):
     """Utility function to log function calls with context"""
     context_info = f"user_id={user_id}" if user_id else "system"
@@ -0,0 +1,189 @@
+"""
+Request Tracing
+Per-handler latency histograms, outcome counters and nested spans
+"""
+
+import functools
+import math
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config.settings import config
+from app.utils.logging import logger
+
+tracing_logger = logger.getChild('tracing')
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OK = "ok"
+HANDLED_ERROR = "handled_error"
+ERROR = "error"
+
+
+def sample_percentile(samples: Iterable[float], percentile: float) -> Optional[float]:
+    """Nearest-rank percentile of raw samples (e.g. a window of recent latencies)"""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; O(log buckets) per observation"""
+    
+    __slots__ = ("buckets", "counts", "count", "sum")
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+    
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Upper bound of the bucket holding the percentile"""
+        if not self.count:
+            return None
+        rank = percentile * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+    
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+@dataclass(slots=True)
+class Span:
+    """A timed call made while handling an update"""
+    kind: str
+    name: str
+    duration: float
+    depth: int
+
+
+@dataclass(slots=True)
+class HandlerTrace:
+    """Timing of one handler invocation and the spans inside it"""
+    handler: str
+    started: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+    owner: bool = True
+
+
+_current_trace: ContextVar[Optional[HandlerTrace]] = ContextVar("current_trace", default=None)
+_span_depth: ContextVar[int] = ContextVar("span_depth", default=0)
+
+
+class Tracer:
+    """
+    Tracer collecting handler and span latencies.
+    
+    ``begin``/``end`` bracket a handler call (done by ``handle_exceptions``);
+    ``span`` and ``traced`` time DB, SMS and notification calls. Span timings
+    always feed the per-span histograms; made inside a handler they are also
+    attached to its trace, and a handler slower than ``slow_threshold`` logs
+    its span breakdown, so a p99 outlier can be pinned on the step that
+    caused it. A handler called from another handler is recorded as a span
+    of the outer one.
+    """
+    
+    def __init__(self, slow_threshold: float = 1.0):
+        self.slow_threshold = slow_threshold
+        self.handlers: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.outcomes: Counter = Counter()
+        self.spans: Dict[Tuple[str, str], LatencyHistogram] = defaultdict(LatencyHistogram)
+    
+    def begin(self, handler: str) -> Tuple[HandlerTrace, Any]:
+        """Start timing a handler call"""
+        parent = _current_trace.get()
+        if parent is not None:
+            trace = HandlerTrace(handler, spans=parent.spans, owner=False)
+            return trace, _span_depth.set(_span_depth.get() + 1)
+        trace = HandlerTrace(handler)
+        return trace, _current_trace.set(trace)
+    
+    def end(self, trace: HandlerTrace, token: Any, outcome: str) -> float:
+        """Finish timing a handler call; returns its duration"""
+        elapsed = time.perf_counter() - trace.started
+        self.handlers[trace.handler].observe(elapsed)
+        self.outcomes[(trace.handler, outcome)] += 1
+        
+        if not trace.owner:
+            _span_depth.reset(token)
+            trace.spans.append(Span("handler", trace.handler, elapsed, _span_depth.get()))
+            return elapsed
+        
+        _current_trace.reset(token)
+        if elapsed >= self.slow_threshold:
+            breakdown = ", ".join(
+                f"{'>' * span.depth}{span.kind}:{span.name} {span.duration * 1000:.0f}ms" for span in trace.spans
+            )
+            tracing_logger.warning(
+                f"Slow {trace.handler} ({outcome}) took {elapsed * 1000:.0f}ms: {breakdown or 'no spans'}"
+            )
+        return elapsed
+    
+    @asynccontextmanager
+    async def span(self, kind: str, name: str):
+        """Time a block as a span of the current handler"""
+        depth = _span_depth.get()
+        token = _span_depth.set(depth + 1)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            _span_depth.reset(token)
+            self.spans[(kind, name)].observe(elapsed)
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.spans.append(Span(kind, name, elapsed, depth))
+    
+    def traced(self, kind: str):
+        """Decorator timing every call of an async function as a span"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                async with self.span(kind, func.__qualname__):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get handler and span latency metrics"""
+        outcomes: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for (handler, outcome), count in self.outcomes.items():
+            outcomes[handler][outcome] = count
+        return {
+            "handlers": {
+                handler: {**histogram.summary(), "outcomes": outcomes[handler]}
+                for handler, histogram in self.handlers.items()
+            },
+            "spans": {
+                f"{kind}:{name}": histogram.summary() for (kind, name), histogram in self.spans.items()
+            },
+        }
+
+
+# Global tracer instance
+tracer = Tracer(slow_threshold=config.logging.slow_update_ms / 1000)
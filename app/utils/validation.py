@@ -59,6 +59,9 @@ class InputValidator:
         # Remove any spaces, dashes, or parentheses
         normalized_phone = re.sub(r'[\s\-\(\)]', '', normalized_phone)
         
+        # Accept international format (+98 / 0098 / 98), as shared Telegram contacts use it
+        normalized_phone = re.sub(r'^(?:\+|00)?98(?=9\d{9}$)', '0', normalized_phone)
+        
         # Check Iranian mobile number pattern (09xxxxxxxxx)
         if not re.fullmatch(r"09\d{9}", normalized_phone):
             return False, ""
@@ -0,0 +1,76 @@
+"""
+Conversation State Memory Benchmark
+Compares per-conversation user_data size for a purchase in progress when
+holding ORM objects (previous behaviour) versus compact state records.
+
+Usage: python -m benchmarks.bench_conversation_state
+"""
+
+import os
+import pickle
+import tracemalloc
+
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("KAVENEGAR_API_KEY", "benchmark")
+
+from app.models import Product, ReferralCode, GradeEnum, MajorEnum, ReferralCodeProductEnum
+from app.utils.conversation_state import PurchaseState, ProductBrowseState
+
+CONVERSATIONS = 5_000
+PRODUCT_NAMES = [f"محصول آزمایشی شماره {i}" for i in range(12)]
+
+
+def legacy_user_data(i: int) -> dict:
+    """user_data as previously populated by the browse and purchase steps"""
+    product = Product(
+        id=i, name=PRODUCT_NAMES[i % 12], grade=GradeEnum.GRADE_12, major=MajorEnum.MATH,
+        description="توضیحات محصول " * 10, price=12_000_000, image=None, is_active=True
+    )
+    referral = ReferralCode(
+        id=i, owner_id=7, code="maz1403", product=ReferralCodeProductEnum.ALMAS,
+        installment=True, grade=None, is_active=True, usage_limit=None, current_usage=0
+    )
+    return {
+        "products": [name for name in PRODUCT_NAMES],
+        "current_product_id": i,
+        "product_data": product,
+        "referral": "MAZ1403",
+        "referral_data": referral,
+        "waiting_for_referral_code": False,
+        "payment_type": "installment",
+        "final_price": 12_000_000,
+        "first_installment": 6_000_000,
+    }
+
+
+def compact_user_data(i: int) -> dict:
+    """user_data as populated with the conversation state records"""
+    return {
+        "browse": ProductBrowseState(grade=12, major="math"),
+        "purchase": PurchaseState(
+            product_id=i, referral_code="maz1403", seller_id=7, referral_product="almas",
+            referral_installment=True, payment_type="installment",
+            final_price=12_000_000, first_installment=6_000_000
+        ),
+    }
+
+
+def measure(label: str, factory) -> None:
+    """Report retained bytes and pickled size per conversation"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    conversations = [factory(i) for i in range(CONVERSATIONS)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    pickled = len(pickle.dumps(conversations[0]))
+    print(
+        f"{label:<8} {retained / CONVERSATIONS:>9.0f} bytes/conversation in memory "
+        f"{pickled:>7} bytes pickled"
+    )
+
+
+if __name__ == "__main__":
+    measure("orm", legacy_user_data)
+    measure("compact", compact_user_data)
@@ -0,0 +1,325 @@
+"""
+End-to-End Conversation Benchmark
+Replays synthetic users through registration, product browsing, a purchase
+with a receipt upload, a lottery entry and a CRM request on the real
+TelegramBotApplication handler graph, fully offline: Bot API calls are
+answered in-process, SMS and admin notifications go to stubs, and data lives
+in a local SQLite file (set DATABASE_URL to use a local Postgres instead).
+Reports throughput, p50/p95/p99 latency per step and DB queries per update.
+
+Usage: python -m benchmarks.bench_end_to_end [users] [concurrency]
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+_work_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(_work_dir, 'end_to_end.db')}")
+os.environ.setdefault("BOT_TOKEN", "123456:benchmark")
+os.environ.setdefault("KAVENEGAR_API_KEY", "benchmark")
+os.environ.setdefault("ADMIN_CHAT_ID", "1000")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import event, func, select
+from telegram import Update
+from telegram.request import BaseRequest
+
+from app.main import TelegramBotApplication
+from app.models import CRM, Lottery, Order, Product, User, UsersInLottery
+from app.models.enums import GradeEnum, MajorEnum
+from app.services.database import BaseRepository, db_service
+from app.services.notification_outbox import notification_outbox
+from app.services.notification_service import NotificationBackend, notification_service
+from app.services.otp_service import otp_service
+from app.services.sms_dispatcher import SMSDispatcher, SMSProvider
+
+USERS = 200
+CONCURRENCY = 50
+
+BOT_ID = 123456
+LOTTERY_NAME = "قرعه کشی بنچمارک"
+PRODUCTS = ("جمع بندی ریاضی نهم", "کتاب تست علوم نهم", "آزمون آنلاین نهم", "بسته کامل پایه نهم")
+RECEIPT = b"\xff\xd8\xff\xe0" + bytes(20_000)
+
+# Step the current update belongs to; DB queries made outside one are "background"
+current_step: ContextVar[Optional[str]] = ContextVar("current_step", default=None)
+
+
+class OfflineBotAPI(BaseRequest):
+    """Bot API transport answering every call in-process with a plausible result"""
+    
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1)
+    
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+    
+    async def initialize(self) -> None:
+        pass
+    
+    async def shutdown(self) -> None:
+        pass
+    
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        # File downloads (receipts) go to /file/bot<token>/<path>
+        if "/file/bot" in url:
+            self.calls["download"] += 1
+            return 200, RECEIPT
+        
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls[api_method] += 1
+        params = request_data.parameters if request_data else {}
+        return 200, json.dumps({"ok": True, "result": self._result(api_method, params)}).encode()
+    
+    def _result(self, api_method: str, params: dict):
+        if api_method == "getMe":
+            return {"id": BOT_ID, "is_bot": True, "first_name": "Benchmark", "username": "benchmark_bot"}
+        if api_method == "getFile":
+            file_id = params["file_id"]
+            return {"file_id": file_id, "file_unique_id": file_id, "file_size": len(RECEIPT),
+                    "file_path": f"photos/{file_id}.jpg"}
+        if api_method == "getUpdates":
+            return []
+        if api_method.startswith(("send", "edit")):
+            return {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": params.get("chat_id", 0), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        return True
+
+
+class StubSMSProvider(SMSProvider):
+    """SMS provider keeping the last code sent to each phone so users can type it back"""
+    
+    name = "stub"
+    
+    def __init__(self):
+        self.codes: Dict[str, str] = {}
+    
+    async def send_otp(self, phone_number: str, otp: str) -> dict:
+        self.codes[phone_number] = otp
+        return {"status": 200}
+
+
+class StubNotificationBackend(NotificationBackend):
+    """Notification backend counting admin messages instead of sending them"""
+    
+    name = "stub"
+    
+    def __init__(self):
+        self.sent = 0
+    
+    async def send(self, recipient, message: str, parse_mode: Optional[str] = None) -> None:
+        self.sent += 1
+
+
+class SyntheticUser:
+    """A user sending updates one after another, waiting for each to be handled"""
+    
+    _update_ids = itertools.count(1)
+    
+    def __init__(self, telegram_id: int, application, latencies: Dict[str, List[float]]):
+        self.telegram_id = telegram_id
+        self.application = application
+        self.latencies = latencies
+        self.profile = {
+            "id": telegram_id, "is_bot": False, "first_name": "کاربر", "username": f"user{telegram_id}"
+        }
+        self._message_ids = itertools.count(1)
+    
+    def _message(self, **fields) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": self.telegram_id, "type": "private"},
+            "from": self.profile,
+            **fields,
+        }
+    
+    async def _send(self, step: str, payload: dict) -> None:
+        update = Update.de_json({"update_id": next(self._update_ids), **payload}, self.application.bot)
+        token = current_step.set(step)
+        started = time.perf_counter()
+        try:
+            await self.application.process_update(update)
+        finally:
+            self.latencies[step].append(time.perf_counter() - started)
+            current_step.reset(token)
+    
+    async def text(self, step: str, text: str) -> None:
+        entities = [{"type": "bot_command", "offset": 0, "length": len(text)}] if text.startswith("/") else []
+        await self._send(step, {"message": self._message(text=text, entities=entities)})
+    
+    async def photo(self, step: str, file_id: str) -> None:
+        sizes = [{"file_id": file_id, "file_unique_id": file_id, "width": 1280, "height": 960}]
+        await self._send(step, {"message": self._message(photo=sizes)})
+    
+    async def button(self, step: str, data: str) -> None:
+        await self._send(step, {"callback_query": {
+            "id": str(next(self._update_ids)),
+            "from": self.profile,
+            "chat_instance": str(self.telegram_id),
+            "data": data,
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": self.telegram_id, "type": "private"},
+                "from": {"id": BOT_ID, "is_bot": True, "first_name": "Benchmark"},
+                "text": "جزییات محصول",
+            },
+        }})
+
+
+async def seed() -> Dict[str, int]:
+    """Create the products and the lottery the flows use; returns product ids by name"""
+    products = BaseRepository(Product, db_service)
+    lotteries = BaseRepository(Lottery, db_service)
+    
+    ids = {}
+    for i, name in enumerate(PRODUCTS):
+        product = await products.get_by_field("name", name) or await products.create(
+            name=name, grade=GradeEnum.GRADE_9, major=MajorEnum.GENERAL,
+            description=f"{name} برای دانش آموزان پایه نهم", price=1_500_000 + i * 250_000
+        )
+        ids[name] = product.id
+    
+    if not await lotteries.get_by_field("name", LOTTERY_NAME):
+        await lotteries.create(name=LOTTERY_NAME, description="قرعه کشی ویژه دانش آموزان", is_active=True)
+    return ids
+
+
+def phones(telegram_id: int) -> tuple:
+    """The registered number of a user and the other number given for the CRM call"""
+    return f"0912{telegram_id % 10 ** 7:07d}", f"0935{telegram_id % 10 ** 7:07d}"
+
+
+async def replay(user: SyntheticUser, sms: StubSMSProvider, product_name: str, product_id: int) -> None:
+    """Take one user through every flow"""
+    uid = user.telegram_id
+    phone, crm_phone = phones(uid)
+    
+    await user.text("start", "/start")
+    
+    await user.text("registration.begin", "👤 ثبت نام")
+    await user.text("registration.name", "کاربر آزمایشی بنچمارک")
+    await user.text("registration.city", "تهران")
+    await user.text("registration.area", "1")
+    await user.text("registration.national_id", f"1{uid % 10 ** 9:09d}")
+    await user.text("registration.phone", phone)
+    await user.text("registration.otp", sms.codes[phone])
+    
+    await user.text("browse.menu", "📚 خرید ویژه محصولات از نمایندگی 📚")
+    await user.text("browse.grade", "پایه نهم")
+    await user.text("browse.product", product_name)
+    
+    await user.button("purchase.buy", f"buy_{product_id}")
+    await user.text("purchase.referral", "کد معرف ندارم")
+    await user.photo("purchase.receipt", f"receipt-{uid}")
+    
+    # The registered number is already verified, so no second SMS
+    await user.text("lottery.menu", "🎲 قرعه کشی")
+    await user.text("lottery.select", LOTTERY_NAME)
+    await user.text("lottery.phone", phone)
+    
+    # A different number has to be verified by SMS
+    await user.text("crm.menu", "💬 مشاوره تلفنی رایگان")
+    await user.text("crm.phone", crm_phone)
+    await user.text("crm.otp", sms.codes[crm_phone])
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def completed(users: List[int]) -> Dict[str, int]:
+    """Count the rows the flows should have produced, to catch runs that only hit error paths"""
+    checks = {
+        "registered": User.telegram_id.in_(users),
+        "orders": Order.user_id.in_(select(User.id).where(User.telegram_id.in_(users))),
+        "lottery entries": UsersInLottery.telegram_id.in_(users),
+        "crm requests": CRM.number.in_([phones(uid)[1] for uid in users]),
+    }
+    async with db_service.get_session() as session:
+        return {
+            label: await session.scalar(select(func.count()).where(check))
+            for label, check in checks.items()
+        }
+
+
+async def main(users: int = USERS, concurrency: int = CONCURRENCY) -> None:
+    # Receipts are saved relative to the working directory
+    os.chdir(_work_dir)
+    
+    api = OfflineBotAPI()
+    bot = TelegramBotApplication(request=api, get_updates_request=OfflineBotAPI())
+    await bot.initialize()
+    application = bot.application
+    
+    sms = StubSMSProvider()
+    otp_service.sms = SMSDispatcher([sms])
+    otp_service.delivery = None
+    notifications = StubNotificationBackend()
+    notification_service.backend = notifications
+    
+    queries: Counter = Counter()
+    event.listen(
+        db_service.engine.sync_engine, "before_cursor_execute",
+        lambda *args: queries.__setitem__(current_step.get(), queries[current_step.get()] + 1)
+    )
+    
+    try:
+        product_ids = await seed()
+        await application.initialize()
+        await application.start()
+        notification_outbox.start()
+        
+        base = random.randrange(10 ** 8, 9 * 10 ** 8)
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        names = list(product_ids)
+        limit = asyncio.Semaphore(concurrency)
+        
+        async def run(i: int) -> None:
+            async with limit:
+                name = names[i % len(names)]
+                await replay(SyntheticUser(base + i, application, latencies), sms, name, product_ids[name])
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(run(i) for i in range(users)))
+        elapsed = time.perf_counter() - started
+        
+        total = sum(len(samples) for samples in latencies.values())
+        print(f"{users} users, concurrency {concurrency}: {total} updates in {elapsed:.2f}s "
+              f"({total / elapsed:,.0f} updates/s, {users / elapsed:,.1f} users/s)")
+        print(f"{'step':<26} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+        for step, samples in latencies.items():
+            ordered = sorted(samples)
+            print(f"{step:<26} {percentile(ordered, 0.5) * 1000:>8.1f} {percentile(ordered, 0.95) * 1000:>8.1f} "
+                  f"{percentile(ordered, 0.99) * 1000:>8.1f} {queries[step] / len(samples):>8.1f}")
+        
+        handled = sum(count for step, count in queries.items() if step is not None)
+        print(f"DB queries per update: {handled / total:.1f} (plus {queries[None]} in background tasks)")
+        print(f"Bot API calls: {dict(api.calls)}; admin notifications: {notifications.sent}")
+        print("Completed: " + ", ".join(
+            f"{label} {count}/{users}" for label, count in (await completed(list(range(base, base + users)))).items()
+        ))
+    finally:
+        await otp_service.sms.stop()
+        await bot.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*map(int, sys.argv[1:3])))
@@ -0,0 +1,72 @@
+"""
+Keyboard Allocation Benchmark
+Compares per-/start allocations of rebuilding the main menu markup against
+reusing the prebuilt markup from the keyboard registry.
+
+Usage: python -m benchmarks.bench_keyboards
+"""
+
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("KAVENEGAR_API_KEY", "benchmark")
+
+from telegram import ReplyKeyboardMarkup
+
+from app.utils.keyboards import keyboards
+
+ITERATIONS = 10_000
+
+
+def build_main_menu() -> ReplyKeyboardMarkup:
+    """Previous behaviour: build the markup on every /start"""
+    keyboard = [
+        ["💎 خرید قسطی اشتراک الماس 💎"],
+        ["📚 خرید ویژه محصولات از نمایندگی 📚"],
+        ["💰 درآمد زایی و معرفی دوستان", "💬 مشاوره تلفنی رایگان"],
+        ["💳 اقساط من", "🎲 قرعه کشی"],
+        ["👩‍💻 پشتیبانی", "🤝 همکاری با نمایندگی"],
+        ["👤 ثبت نام", "💡 راهنما"]
+    ]
+    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
+
+
+def registry_main_menu() -> ReplyKeyboardMarkup:
+    """Current behaviour: reuse the prebuilt markup"""
+    return keyboards.main_menu
+
+
+def measure(label: str, func) -> None:
+    """Report allocated blocks/bytes and time per call"""
+    keep = []
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(ITERATIONS):
+        # Keep results alive so allocations are not immediately reused
+        keep.append(func())
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    size = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    # The list holding the results is counted in both cases
+    keep_size = len(keep) * 8
+    
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func()
+    elapsed = time.perf_counter() - start
+    
+    print(
+        f"{label:<10} {blocks / ITERATIONS:>8.1f} blocks/start "
+        f"{(size - keep_size) / ITERATIONS:>10.1f} bytes/start "
+        f"{elapsed / ITERATIONS * 1e6:>8.2f} us/start"
+    )
+
+
+if __name__ == "__main__":
+    measure("rebuild", build_main_menu)
+    measure("registry", registry_main_menu)
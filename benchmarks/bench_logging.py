@@ -0,0 +1,115 @@
+"""
+Logging Pipeline Benchmark
+Compares the previous synchronous handlers (with a formatter built per
+record) against the queue pipeline: log records per second on the event
+loop thread and the longest event-loop stall seen by a 1ms ticker, for a
+fast sink and for a slow one standing in for a back-pressured stdout pipe.
+
+Usage: python -m benchmarks.bench_logging
+"""
+
+import asyncio
+import io
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("KAVENEGAR_API_KEY", "benchmark")
+
+from app.utils.logging import BackgroundQueueHandler, ColoredFormatter, ContextFilter
+
+RECORDS = 20_000
+SLOW_RECORDS = 2_000
+SLOW_WRITE_SECONDS = 0.0002
+
+
+class LegacyColoredFormatter(ColoredFormatter):
+    """The previous formatter, building a new Formatter for every record"""
+    
+    def format(self, record):
+        log_color = self.COLORS.get(record.levelname, self.COLORS['RESET'])
+        formatter = logging.Formatter(
+            f"{log_color}%(asctime)s - %(name)s - %(levelname)s{self.COLORS['RESET']} - %(message)s"
+        )
+        return formatter.format(record)
+
+
+class SlowStream(io.StringIO):
+    """Stream whose writes block like a full pipe"""
+    
+    def write(self, text):
+        time.sleep(SLOW_WRITE_SECONDS)
+        return len(text)
+
+
+def build_logger(name: str, pipeline: str, stream) -> tuple:
+    """Create a logger with the chosen pipeline writing to the stream"""
+    log = logging.getLogger(f"bench.{name}")
+    log.handlers.clear()
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    
+    handler = logging.StreamHandler(stream)
+    if pipeline == "sync":
+        handler.setFormatter(LegacyColoredFormatter())
+        log.addHandler(handler)
+        return log, None, None
+    
+    handler.setFormatter(ColoredFormatter())
+    queue_handler = BackgroundQueueHandler(queue.Queue(maxsize=100_000))
+    queue_handler.addFilter(ContextFilter())
+    log.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(queue_handler.queue, handler)
+    listener.start()
+    return log, listener, queue_handler
+
+
+async def log_burst(log: logging.Logger, records: int) -> tuple:
+    """Log from the event loop while a ticker measures stalls"""
+    stalls = [0.0]
+    
+    async def ticker():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stalls.append(time.perf_counter() - started - 0.001)
+    
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    for i in range(records):
+        log.info("Processed update %d for user %d", i, i * 7)
+        if i % 50 == 0:
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    task.cancel()
+    return records / elapsed, max(stalls)
+
+
+def run(pipeline: str, sink: str) -> None:
+    records = RECORDS if sink == "fast" else SLOW_RECORDS
+    stream = open(os.devnull, "w") if sink == "fast" else SlowStream()
+    log, listener, queue_handler = build_logger(f"{pipeline}.{sink}", pipeline, stream)
+    
+    rate, stall = asyncio.run(log_burst(log, records))
+    drain_started = time.perf_counter()
+    if listener is not None:
+        listener.stop()
+    drained = time.perf_counter() - drain_started
+    dropped = queue_handler.dropped if queue_handler else 0
+    
+    print(f"{pipeline:5} {sink} sink: {rate:>10,.0f} records/s on the loop, "
+          f"max loop stall {stall * 1000:7.2f}ms, background drain {drained:.2f}s, dropped {dropped}")
+
+
+def main() -> None:
+    for sink in ("fast", "slow"):
+        for pipeline in ("sync", "queue"):
+            run(pipeline, sink)
+
+
+if __name__ == "__main__":
+    main()
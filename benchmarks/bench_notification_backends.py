@@ -0,0 +1,110 @@
+"""
+Notification Backend Benchmark
+Compares what each admin notification backend costs the bot process: cold
+import time and peak memory of the libraries it needs (each measured in a
+fresh interpreter), and per-message latency of the Bot API backend against
+a local stub of the Bot API. The Telethon backend's send latency needs a
+real MTProto login and is not measured offline.
+
+Usage: python -m benchmarks.bench_notification_backends
+"""
+
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("BOT_TOKEN", "123:benchmark")
+os.environ.setdefault("KAVENEGAR_API_KEY", "benchmark")
+
+from telegram import Bot
+
+from app.services.notification_service import NotificationService, BotAPIBackend
+from app.utils.logging import notification_logger
+
+MESSAGES = 500
+CHAT_ID = 42
+
+IMPORT_PROBE = """
+import resource, sys, time
+started = time.perf_counter()
+for module in sys.argv[1:]:
+    __import__(module)
+elapsed = time.perf_counter() - started
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+class StubBotAPIHandler(BaseHTTPRequestHandler):
+    """Answers getMe and sendMessage like the Bot API"""
+    
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/getMe"):
+            result = {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        else:
+            result = {"message_id": 1, "date": int(time.time()), "chat": {"id": CHAT_ID, "type": "private"}}
+        body = json.dumps({"ok": True, "result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def measure_imports(*modules: str) -> tuple:
+    """Cold import time (s) and peak RSS (KiB) of a fresh interpreter importing the modules"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE, *modules], capture_output=True, text=True, check=True
+    ).stdout
+    elapsed, rss = output.split()
+    return float(elapsed), int(rss)
+
+
+async def bot_api_latencies(port: int) -> list:
+    bot = Bot("123:benchmark", base_url=f"http://127.0.0.1:{port}/bot")
+    await bot.initialize()
+    service = NotificationService(BotAPIBackend(), default_recipients=[CHAT_ID])
+    service.attach_bot(bot)
+    
+    for i in range(MESSAGES):
+        await service.send_to_admin(f"event {i}")
+    await bot.shutdown()
+    return sorted(service.latencies)
+
+
+def main() -> None:
+    notification_logger.setLevel(logging.WARNING)
+    baseline_time, baseline_rss = measure_imports("telegram")
+    telethon_time, telethon_rss = measure_imports("telegram", "telethon")
+    print(f"bot_api  imports: {baseline_time * 1000:7.1f}ms, peak RSS {baseline_rss / 1024:6.1f} MiB "
+          f"(python-telegram-bot is loaded by the bot anyway)")
+    print(f"telethon imports: {telethon_time * 1000:7.1f}ms, peak RSS {telethon_rss / 1024:6.1f} MiB "
+          f"(+{(telethon_time - baseline_time) * 1000:.1f}ms, +{(telethon_rss - baseline_rss) / 1024:.1f} MiB)")
+    print("telethon also opens a second long-lived connection and writes notification_session.session")
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubBotAPIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        latencies = asyncio.run(bot_api_latencies(server.server_port))
+    finally:
+        server.shutdown()
+        server.server_close()
+    
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    
+    print(f"bot_api send latency over {MESSAGES} messages to a local stub: "
+          f"p50 {percentile(0.5):.2f}ms, p95 {percentile(0.95):.2f}ms, p99 {percentile(0.99):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Conversation Persistence Benchmark
+Measures write-behind flush cost against per-update writes, and restart
+recovery (conversation restore plus lazy per-user loading), on a local
+SQLite file.
+
+Usage: python -m benchmarks.bench_persistence
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+_db_file = os.path.join(tempfile.mkdtemp(), "persistence.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file}"
+os.environ.setdefault("BOT_TOKEN", "benchmark")
+os.environ.setdefault("KAVENEGAR_API_KEY", "benchmark")
+
+from app.constants.conversation_states import ASK_PAYMENT_METHOD
+from app.services.database import db_service
+from app.services.persistence_service import DatabasePersistence
+from app.utils.conversation_state import PurchaseState, ProductBrowseState
+
+USERS = 5_000
+PER_UPDATE_SAMPLE = 300
+LAZY_LOAD_SAMPLE = 1_000
+
+
+def user_data(i: int) -> dict:
+    """user_data of a user in the middle of a purchase"""
+    return {
+        "browse": ProductBrowseState(grade=12, major="ریاضی"),
+        "purchase": PurchaseState(product_id=i % 40, referral_code="MAZ1403", seller_id=7,
+                                  payment_type="installment", final_price=9_000_000),
+        "full_name": "کاربر آزمایشی",
+    }
+
+
+async def stage(persistence: DatabasePersistence, users: range) -> None:
+    """Stage user_data and payment conversation state for a range of users"""
+    for i in users:
+        await persistence.update_user_data(i, user_data(i))
+        await persistence.update_conversation("payment", (i, i), ASK_PAYMENT_METHOD)
+
+
+async def main() -> None:
+    db_service.initialize()
+    await db_service.create_tables()
+    
+    # Write-behind: everything staged during one interval goes out in one transaction
+    persistence = DatabasePersistence(db_service)
+    await stage(persistence, range(USERS))
+    start = time.perf_counter()
+    await persistence.flush()
+    batched = time.perf_counter() - start
+    rows = USERS * 2
+    
+    # Per-update writes: one transaction for every changed user
+    persistence = DatabasePersistence(db_service)
+    start = time.perf_counter()
+    for i in range(PER_UPDATE_SAMPLE):
+        await stage(persistence, range(i, i + 1))
+        await persistence.flush()
+    per_update = (time.perf_counter() - start) / (PER_UPDATE_SAMPLE * 2)
+    
+    print(f"rows per flush:                 {rows}")
+    print(f"write-behind flush:             {batched * 1000:8.1f} ms total, {batched / rows * 1e6:7.1f} us/row")
+    print(f"per-update writes:              {per_update * rows * 1000:8.1f} ms est., {per_update * 1e6:7.1f} us/row")
+    
+    # Restart recovery with a fresh persistence instance
+    restarted = DatabasePersistence(db_service)
+    start = time.perf_counter()
+    conversations = await restarted.get_conversations("payment")
+    restore = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for i in range(LAZY_LOAD_SAMPLE):
+        data = {}
+        await restarted.refresh_user_data(i, data)
+    lazy_load = (time.perf_counter() - start) / LAZY_LOAD_SAMPLE
+    assert data["purchase"] == user_data(LAZY_LOAD_SAMPLE - 1)["purchase"]
+    
+    start = time.perf_counter()
+    for i in range(LAZY_LOAD_SAMPLE):
+        await restarted.refresh_user_data(i, {})
+    loaded = (time.perf_counter() - start) / LAZY_LOAD_SAMPLE
+    
+    print(f"restored conversations:         {len(conversations)} in {restore * 1000:.1f} ms")
+    print(f"first access per user:          {lazy_load * 1e6:8.1f} us")
+    print(f"later accesses per user:        {loaded * 1e6:8.1f} us")
+    
+    await db_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,7 +5,7 @@ Enterprise-level testing configuration
 
 import pytest
 import asyncio
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.pool import StaticPool
 
 from app.models.base import Base
@@ -55,6 +55,17 @@ async def db_service(test_db):
     return db
 
 
+async def create_sqlite_database(path) -> DatabaseService:
+    """Create a database service on a fresh SQLite file with all tables"""
+    database = DatabaseService()
+    database.engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    database.session_maker = async_sessionmaker(database.engine, class_=AsyncSession, expire_on_commit=False)
+    database._initialized = True
+    async with database.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return database
+
+
 @pytest.fixture
 def mock_config():
     """Create mock configuration"""
@@ -0,0 +1,48 @@
+"""
+Catalog Service Tests
+Cache invalidation on committed catalog writes and the keyboards built from it
+"""
+
+import pytest
+
+from app.models import GradeEnum, MajorEnum, Product
+from app.services.catalog_service import CatalogService
+from app.services.database import BaseRepository
+from app.utils.keyboards import KeyboardRegistry
+from tests.conftest import create_sqlite_database
+
+
+def keyboard_names(markup):
+    return [row[0].text for row in markup.keyboard]
+
+
+@pytest.mark.asyncio
+async def test_committed_product_changes_show_up_in_the_keyboard(tmp_path):
+    """Test created and renamed products reach the cached product keyboard before the TTL"""
+    database = await create_sqlite_database(tmp_path / "catalog.db")
+    registry = KeyboardRegistry()
+    catalog = CatalogService(database, ttl_seconds=3600)
+    catalog.add_invalidation_listener(registry.invalidate_dynamic)
+    catalog.invalidate_on_commit()
+    products = BaseRepository(Product, database)
+    
+    async def keyboard():
+        names = [p.name for p in await catalog.get_products(GradeEnum.GRADE_9)]
+        return keyboard_names(registry.product_keyboard(GradeEnum.GRADE_9, None, names))
+    
+    try:
+        first = await products.create(name="کتاب اول", grade=GradeEnum.GRADE_9, major=MajorEnum.GENERAL, price=100)
+        assert await keyboard() == ["کتاب اول"]
+        
+        await products.create(name="کتاب دوم", grade=GradeEnum.GRADE_9, major=MajorEnum.GENERAL, price=200)
+        assert await keyboard() == ["کتاب اول", "کتاب دوم"]
+        
+        await products.update(first.id, name="کتاب ویرایش شده")
+        assert sorted(await keyboard()) == ["کتاب دوم", "کتاب ویرایش شده"]
+        
+        # Reads alone keep the cache
+        misses = catalog.misses
+        await keyboard()
+        assert catalog.misses == misses
+    finally:
+        await database.engine.dispose()
@@ -0,0 +1,124 @@
+"""
+Catch-up Service Tests
+Stale-update skipping, per-user ordering and getUpdates failures during the startup drain
+"""
+
+import asyncio
+import random
+import time
+
+import pytest
+from telegram import Update
+from telegram.error import Conflict, TimedOut
+
+from app.services.catch_up_service import CatchUpService
+
+
+def make_update(update_id, user_id, age=0, text="سلام", photo=False):
+    """Create a private-chat message update sent ``age`` seconds ago"""
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()) - age,
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "user"},
+    }
+    if photo:
+        message["photo"] = [{"file_id": f"f{update_id}", "file_unique_id": f"u{update_id}", "width": 1, "height": 1}]
+    else:
+        message["text"] = text
+    return Update.de_json({"update_id": update_id, "message": message}, None)
+
+
+class FakeBot:
+    """getUpdates over a fixed backlog; confirmed updates are dropped like on Telegram"""
+    
+    def __init__(self, updates, errors=()):
+        self.pending = list(updates)
+        self.errors = list(errors)
+        self.offsets = []
+    
+    async def get_updates(self, offset=None, limit=100, timeout=0, allowed_updates=None):
+        self.offsets.append(offset)
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+        if offset is not None:
+            self.pending = [u for u in self.pending if u.update_id >= offset]
+        return tuple(self.pending[:limit])
+
+
+class FakeApplication:
+    """Application stand-in recording processed updates"""
+    
+    def __init__(self, bot, delay=0.0):
+        self.bot = bot
+        self.delay = delay
+        self.processed = []
+    
+    async def process_update(self, update):
+        await asyncio.sleep(random.random() * self.delay)
+        self.processed.append(update.update_id)
+
+
+def make_service(batch_size=100):
+    return CatchUpService(batch_size=batch_size, concurrency=10, stale_after=300, retry_backoff=0)
+
+
+@pytest.mark.asyncio
+async def test_stale_text_is_skipped_but_receipts_are_processed():
+    """Test old text messages are dropped while old photos are still handled"""
+    updates = [
+        make_update(1, 10, age=3600),
+        make_update(2, 10, age=3600, photo=True),
+        make_update(3, 11, age=5),
+    ]
+    application = FakeApplication(FakeBot(updates))
+    
+    report = await make_service().drain(application)
+    
+    assert sorted(application.processed) == [2, 3]
+    assert (report.fetched, report.processed, report.skipped_stale, report.failed) == (3, 2, 1, False)
+
+
+@pytest.mark.asyncio
+async def test_updates_of_a_user_stay_in_order():
+    """Test each user's updates are processed in order across batches"""
+    updates = [make_update(i, 100 + i % 3) for i in range(1, 31)]
+    application = FakeApplication(FakeBot(updates), delay=0.002)
+    
+    await make_service(batch_size=7).drain(application)
+    
+    assert sorted(application.processed) == list(range(1, 31))
+    for user in range(3):
+        seen = [i for i in application.processed if i % 3 == user]
+        assert seen == sorted(seen)
+
+
+@pytest.mark.asyncio
+async def test_network_errors_are_retried():
+    """Test a timed out getUpdates is retried instead of aborting startup"""
+    bot = FakeBot([make_update(1, 10), make_update(2, 11)], errors=[TimedOut(), None])
+    application = FakeApplication(bot)
+    
+    report = await make_service().drain(application)
+    
+    assert sorted(application.processed) == [1, 2]
+    assert not report.failed
+    assert bot.offsets[:2] == [None, None]
+
+
+@pytest.mark.asyncio
+async def test_failure_confirms_processed_batches_and_does_not_raise():
+    """Test a conflict after one batch confirms that batch and leaves the rest to polling"""
+    updates = [make_update(i, 10 + i) for i in range(1, 5)]
+    bot = FakeBot(updates, errors=[None, Conflict("terminated by other getUpdates request"), None])
+    application = FakeApplication(bot)
+    
+    report = await make_service(batch_size=2).drain(application)
+    
+    assert report.failed
+    assert sorted(application.processed) == [1, 2]
+    # The confirming call acknowledges the processed batch without fetching past it
+    assert bot.offsets[-1] == 3
+    assert [u.update_id for u in bot.pending] == [3, 4]
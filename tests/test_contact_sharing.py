@@ -0,0 +1,39 @@
+"""
+Contact Sharing Tests
+Accepting a phone from a contact the user shared about themselves
+"""
+
+from datetime import datetime
+
+from telegram import Chat, Contact, Message, Update, User
+
+from app.utils.conversation_utils import ConversationUtils
+
+
+def contact_update(sender_id, contact_user_id, phone="+989123456789"):
+    """Build an update carrying a shared contact"""
+    sender = User(id=sender_id, first_name="Test", is_bot=False)
+    message = Message(
+        message_id=1,
+        date=datetime.now(),
+        chat=Chat(id=sender_id, type=Chat.PRIVATE),
+        from_user=sender,
+        contact=Contact(phone_number=phone, first_name="Test", user_id=contact_user_id)
+    )
+    return Update(update_id=1, message=message)
+
+
+def test_own_contact_is_accepted_and_normalized():
+    """Test the sender's own contact yields a normalized phone"""
+    assert ConversationUtils.shared_own_phone(contact_update(1, 1)) == "09123456789"
+
+
+def test_foreign_contact_is_rejected():
+    """Test a forwarded or someone else's contact is not trusted"""
+    assert ConversationUtils.shared_own_phone(contact_update(1, 2)) is None
+    assert ConversationUtils.shared_own_phone(contact_update(1, None)) is None
+
+
+def test_non_iranian_contact_is_rejected():
+    """Test a shared number outside the accepted format is rejected"""
+    assert ConversationUtils.shared_own_phone(contact_update(1, 1, phone="+14155550100")) is None
@@ -0,0 +1,88 @@
+"""
+Conversation Service Tests
+Sweeping idle conversations and user_data, and live state counts
+"""
+
+import time
+
+import pytest
+from telegram import Update
+from telegram.ext import CommandHandler, ConversationHandler
+
+from app.constants.conversation_states import ASK_CITY
+from app.services.conversation_service import ConversationService
+
+
+async def noop(update, context):
+    return ConversationHandler.END
+
+
+def make_handler(name="registration"):
+    return ConversationHandler(
+        entry_points=[CommandHandler("start", noop)],
+        states={ASK_CITY: [CommandHandler("city", noop)]},
+        fallbacks=[],
+        name=name
+    )
+
+
+def make_update(user_id):
+    """Create a private-chat message update from the user"""
+    message = {
+        "message_id": 1,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "user"},
+        "text": "سلام",
+    }
+    return Update.de_json({"update_id": 1, "message": message}, None)
+
+
+class FakeApplication:
+    """Application stand-in holding user_data/chat_data"""
+    
+    def __init__(self, users):
+        self.user_data = {user_id: {"full_name": str(user_id)} for user_id in users}
+        self.chat_data = {user_id: {} for user_id in users}
+    
+    def drop_user_data(self, user_id):
+        self.user_data.pop(user_id, None)
+    
+    def drop_chat_data(self, chat_id):
+        self.chat_data.pop(chat_id, None)
+
+
+@pytest.mark.asyncio
+async def test_idle_conversation_is_ended_and_its_user_data_dropped():
+    """Test the sweeper ends timed-out conversations and drops their state only"""
+    service = ConversationService(idle_ttl=60)
+    handler = service.register(make_handler())
+    conversations = ConversationService._live_conversations(handler)
+    conversations[(1, 1)] = ASK_CITY
+    conversations[(2, 2)] = ASK_CITY
+    application = FakeApplication([1, 2])
+    
+    # Both were restored at startup; only user 2 has been active since
+    service._started_at -= 120
+    await service.track_activity(make_update(2), None)
+    service.sweep_application(application)
+    
+    assert list(conversations) == [(2, 2)]
+    assert list(application.user_data) == [2]
+    assert list(application.chat_data) == [2]
+    assert (service.ended_conversations, service.evicted_users, service.evicted_chats) == (1, 1, 1)
+
+
+def test_state_counts_report_live_states():
+    """Test live conversations are counted per handler and named state"""
+    service = ConversationService(idle_ttl=60)
+    registration = service.register(make_handler())
+    service.register(make_handler("crm"))
+    conversations = ConversationService._live_conversations(registration)
+    conversations[(1, 1)] = ASK_CITY
+    conversations[(2, 2)] = ASK_CITY
+    
+    assert service.state_counts() == {"registration": {"ASK_CITY": 2}, "crm": {}}
+    
+    conversations.pop((1, 1))
+    assert service.state_counts()["registration"] == {"ASK_CITY": 1}
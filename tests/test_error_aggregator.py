@@ -0,0 +1,80 @@
+"""
+Error Aggregator Tests
+Fingerprinting and per-window deduplication of admin error alerts
+"""
+
+import pytest
+
+from app.services.error_aggregator import ErrorAggregator, fingerprint
+
+
+class FakeNotifications:
+    """Notification service recording error alerts"""
+    
+    def __init__(self):
+        self.alerts = []
+    
+    async def send_error_notification(self, error_type, error_message, user_id=None, context=None):
+        self.alerts.append((error_type, context))
+        return True
+
+
+def database_down():
+    try:
+        raise ConnectionRefusedError("connection refused")
+    except ConnectionRefusedError as e:
+        return e
+
+
+def sms_outage():
+    try:
+        raise TimeoutError("kavenegar timed out")
+    except TimeoutError as e:
+        return e
+
+
+def test_fingerprint_uses_type_handler_and_raising_frame():
+    """Test errors from the same place share a fingerprint and others do not"""
+    assert fingerprint(database_down(), "CRMHandler.handle") == fingerprint(database_down(), "CRMHandler.handle")
+    assert fingerprint(database_down(), "CRMHandler.handle") != fingerprint(database_down(), "LotteryHandler.handle")
+    assert fingerprint(database_down()) != fingerprint(sms_outage())
+    assert "database_down" in fingerprint(database_down())
+
+
+@pytest.mark.asyncio
+async def test_outage_sends_one_alert_per_window():
+    """Test many users hitting one failure produce one alert per window with counts"""
+    notifications = FakeNotifications()
+    aggregator = ErrorAggregator(notifications, window_seconds=300)
+    
+    for user_id in range(500):
+        aggregator.record(database_down(), handler="CRMHandler.handle", user_id=user_id, now=0)
+    assert await aggregator.flush(now=1) == 1
+    assert notifications.alerts[0][1]["تکرار"] == "500 بار"
+    
+    for user_id in range(500):
+        aggregator.record(database_down(), handler="CRMHandler.handle", user_id=user_id, now=100)
+    # Still inside the window: only counted
+    assert await aggregator.flush(now=200) == 0
+    
+    assert await aggregator.flush(now=301) == 1
+    summary = notifications.alerts[1][1]
+    assert summary["کاربران درگیر"] == 500
+    assert summary["مجموع"] == 1000
+    
+    # A quiet window forgets the fingerprint so a recurrence alerts again at once
+    assert await aggregator.flush(now=602) == 0
+    assert len(aggregator) == 0
+
+
+@pytest.mark.asyncio
+async def test_distinct_failures_alert_separately():
+    """Test each fingerprint gets its own alert"""
+    notifications = FakeNotifications()
+    aggregator = ErrorAggregator(notifications, window_seconds=300)
+    
+    aggregator.record(database_down(), handler="CRMHandler.handle", now=0)
+    aggregator.record(sms_outage(), handler="CRMHandler.handle", now=0)
+    
+    assert await aggregator.flush(now=1) == 2
+    assert sorted(error_type for error_type, _ in notifications.alerts) == ["ConnectionRefusedError", "TimeoutError"]
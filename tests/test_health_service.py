@@ -0,0 +1,66 @@
+"""
+Health Service Tests
+Liveness and readiness checks of the running bot
+"""
+
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.services.database import DatabaseService
+from app.services.health_service import HealthService
+from app.services.loop_monitor import LoopMonitor
+from app.services.sms_dispatcher import CircuitBreaker, SMSDispatcher
+
+
+class FakeProvider:
+    name = "kavenegar"
+
+
+def make_health(database=None, **kwargs):
+    return HealthService(database or DatabaseService(), SMSDispatcher([FakeProvider()]), LoopMonitor(), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_liveness_tracks_loop_and_telegram_contact():
+    """Test /healthz passes while polling and fails once getUpdates goes stale"""
+    health = make_health(poll_stale_seconds=60)
+    health.monitor.start()
+    try:
+        health.mark_polled()
+        status, _, body = await health.liveness()
+        assert status == 200
+        assert json.loads(body)["status"] == "ok"
+        
+        health.last_poll -= 120
+        health.monitor.started_at -= 120
+        status, _, body = await health.liveness()
+        assert status == 503
+        assert json.loads(body)["checks"]["telegram"]["ok"] is False
+    finally:
+        await health.monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_readiness_pings_database_and_reports_sms():
+    """Test /readyz checks the database and an open SMS circuit only degrades it"""
+    database = DatabaseService()
+    database.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    health = make_health(database)
+    health.monitor.start()
+    try:
+        health.dispatcher.breakers["kavenegar"].state = CircuitBreaker.OPEN
+        status, _, body = await health.readiness()
+        report = json.loads(body)
+        assert status == 200
+        assert report["status"] == "degraded"
+        assert report["checks"]["database"]["ok"] is True
+        assert report["checks"]["sms"]["circuits"] == {"kavenegar": "open"}
+        
+        await database.engine.dispose()
+        database.engine = None
+        status, _, _ = await health.readiness()
+        assert status == 503
+    finally:
+        await health.monitor.stop()
@@ -0,0 +1,54 @@
+"""
+Logging Pipeline Tests
+Context stamping, JSON output and the bounded background queue
+"""
+
+import json
+import logging
+import queue
+
+from app.utils.logging import BackgroundQueueHandler, ContextFilter, JsonFormatter, log_update_id, log_user_id
+
+
+def make_record(message="Processed %s", args=("update",), **extra):
+    record = logging.LogRecord("telegram_bot.test", logging.INFO, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_record_carries_update_context():
+    """Test records are stamped with the current update and rendered as JSON"""
+    update_token = log_update_id.set(42)
+    user_token = log_user_id.set(7)
+    try:
+        record = make_record()
+        ContextFilter().filter(record)
+    finally:
+        log_update_id.reset(update_token)
+        log_user_id.reset(user_token)
+    
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Processed update"
+    assert (entry["update_id"], entry["user_id"], entry["handler"]) == (42, 7, None)
+
+
+def test_explicit_extra_is_not_overwritten():
+    """Test a user_id passed through extra wins over the task context"""
+    token = log_user_id.set(7)
+    try:
+        record = make_record(user_id=99)
+        ContextFilter().filter(record)
+    finally:
+        log_user_id.reset(token)
+    assert record.user_id == 99
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """Test records are dropped and counted once the queue is full"""
+    handler = BackgroundQueueHandler(queue.Queue(maxsize=1))
+    
+    handler.handle(make_record())
+    handler.handle(make_record())
+    
+    assert handler.queue.get_nowait().msg == "Processed update"
+    assert handler.dropped == 1
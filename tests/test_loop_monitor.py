@@ -0,0 +1,42 @@
+"""
+Event Loop Monitor Tests
+Scheduling lag and the blocking-callback watchdog
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.loop_monitor import LoopMonitor, loop_logger
+
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_blocking_callback_is_reported_with_its_stack(monkeypatch):
+    """Test a callback blocking the loop is logged once with the blocking call and its update"""
+    reports = []
+    monkeypatch.setattr(loop_logger, "warning", reports.append)
+    monitor = LoopMonitor(interval=0.01, budget=0.1)
+    
+    async def slow_update(update):
+        block_the_loop(0.4)
+    
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(slow_update(SimpleNamespace(update_id=77)), name="update-77")
+        await asyncio.sleep(0.1)
+    finally:
+        await monitor.stop()
+    
+    assert monitor.stalls == 1
+    assert len(reports) == 1
+    assert "block_the_loop" in reports[0]
+    assert "task update-77 (update 77" in reports[0]
+    assert monitor.max_lag >= 0.3
+    assert monitor.lag.count > 5
@@ -0,0 +1,64 @@
+"""
+Metrics Endpoint Tests
+Prometheus exposition format and the embedded HTTP server
+"""
+
+import asyncio
+
+import pytest
+
+from app.middleware.error_handler import handle_exceptions
+from app.services.database import DatabaseService
+from app.services.metrics_service import MetricsServer, MetricsWriter
+from app.utils.tracing import LatencyHistogram
+
+
+async def http_get(port: int, path: str) -> tuple:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), body.decode()
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test histograms are exported with cumulative buckets, sum and count"""
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(seconds)
+    
+    out = MetricsWriter()
+    out.histogram("latency_seconds", "Latency", histogram, {"handler": 'say "hi"'})
+    lines = out.render().decode().splitlines()
+    
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    assert lines[2:5] == [
+        'latency_seconds_bucket{handler="say \\"hi\\"",le="0.1"} 1',
+        'latency_seconds_bucket{handler="say \\"hi\\"",le="1.0"} 3',
+        'latency_seconds_bucket{handler="say \\"hi\\"",le="+Inf"} 4',
+    ]
+    assert lines[6] == 'latency_seconds_count{handler="say \\"hi\\""} 4'
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_handler_metrics():
+    """Test /metrics exports handler calls and unknown paths are 404"""
+    @handle_exceptions()
+    async def metrics_probe_step():
+        return True
+    
+    await metrics_probe_step()
+    server = MetricsServer(DatabaseService(), host="127.0.0.1", port=0)
+    await server.start()
+    try:
+        status, body = await http_get(server.port, "/metrics")
+        missing, _ = await http_get(server.port, "/nope")
+    finally:
+        await server.stop()
+    
+    assert status == 200
+    assert 'outcome="ok"' in body and "metrics_probe_step" in body
+    assert "process_resident_memory_bytes" in body
+    assert missing == 404
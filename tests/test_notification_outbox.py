@@ -0,0 +1,155 @@
+"""
+Notification Outbox Tests
+Transactional outbox writes and dispatcher retries against SQLite
+"""
+
+import pytest
+from sqlalchemy import select
+
+from app.exceptions.base import DatabaseException
+from app.models import CRM, OutboxNotification
+from app.services.database import BaseRepository
+from app.services.notification_outbox import NotificationOutbox, FAILED
+from tests.conftest import create_sqlite_database
+
+
+class FakeNotifications:
+    """Notification service that fails a scripted number of times"""
+    
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+    
+    async def send_crm_notification(self, phone, telegram_id, username):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("flood wait")
+        self.sent.append(phone)
+        return True
+    
+    async def send_order_notification(self, **order):
+        raise RuntimeError("admin chat not found")
+    
+    async def send_seller_order_notification(self, seller_chat_id, **order):
+        self.sent.append(seller_chat_id)
+        return True
+    
+    async def send_lottery_digest(self, entries):
+        self.sent.append([entry["phone"] for entry in entries])
+        return True
+
+
+async def outbox_rows(database):
+    async with database.get_session() as session:
+        return list((await session.execute(select(OutboxNotification))).scalars().all())
+
+
+async def make_outbox(tmp_path, notifications, **kwargs):
+    database = await create_sqlite_database(tmp_path / "outbox.db")
+    outbox = NotificationOutbox(database, notifications, retry_backoff=0, **kwargs)
+    return database, outbox, BaseRepository(CRM, database)
+
+
+def crm_entry(crm):
+    return NotificationOutbox.entry("crm", phone=crm.number, telegram_id=1, username="user")
+
+
+def lottery_entry(crm):
+    return NotificationOutbox.entry("lottery", lottery_name="launch", phone=crm.number, telegram_id=1, username="user")
+
+
+@pytest.mark.asyncio
+async def test_entry_is_committed_with_record_and_delivered(tmp_path):
+    """Test the outbox row is written with the record and deleted once sent"""
+    notifications = FakeNotifications()
+    database, outbox, repository = await make_outbox(tmp_path, notifications)
+    
+    await repository.create(notify=crm_entry, number="09123456789", called=False, priority=1)
+    assert len(await outbox_rows(database)) == 1
+    
+    assert await outbox.drain() == 1
+    assert notifications.sent == ["09123456789"]
+    assert await outbox_rows(database) == []
+    await database.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_failed_record_write_leaves_no_entry(tmp_path):
+    """Test no notification is queued when the record is not stored"""
+    database, outbox, repository = await make_outbox(tmp_path, FakeNotifications())
+    await repository.create(id=1, number="09123456789", called=False, priority=1)
+    
+    try:
+        # Reusing the primary key makes the record insert fail
+        with pytest.raises(DatabaseException):
+            await repository.create(id=1, notify=crm_entry, number="09120000000", called=False, priority=1)
+        
+        assert await outbox_rows(database) == []
+    finally:
+        await database.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_failed_sends_are_retried_then_given_up(tmp_path):
+    """Test sends are retried and kept as failed after max attempts"""
+    notifications = FakeNotifications(failures=5)
+    database, outbox, repository = await make_outbox(tmp_path, notifications, max_attempts=3)
+    await repository.create(notify=crm_entry, number="09123456789", called=False, priority=1)
+    
+    for _ in range(3):
+        await outbox.drain()
+    
+    rows = await outbox_rows(database)
+    assert [(row.status, row.attempts) for row in rows] == [(FAILED, 3)]
+    assert outbox.failed == 1
+    # Failed entries are not picked up again
+    assert await outbox.drain() == 0
+    await database.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_digest_kinds_are_coalesced_per_window(tmp_path):
+    """Test digest kinds wait for the window and go out as one message"""
+    notifications = FakeNotifications()
+    database, outbox, repository = await make_outbox(
+        tmp_path, notifications, digest_kinds=["lottery"], digest_window=3600, digest_max_events=10
+    )
+    try:
+        for i in range(3):
+            await repository.create(notify=lottery_entry, number=f"0912000000{i}", called=False, priority=1)
+        await repository.create(notify=crm_entry, number="09123456789", called=False, priority=1)
+        
+        # Other kinds are not held back by the open window
+        assert await outbox.drain() == 1
+        assert notifications.sent == ["09123456789"]
+        
+        outbox.digest_window = 0
+        assert await outbox.drain() == 3
+        assert notifications.sent[1:] == [["09120000000", "09120000001", "09120000002"]]
+        assert outbox.digests == 1
+        assert await outbox_rows(database) == []
+    finally:
+        await database.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_admin_retries_do_not_resend_the_seller_copy(tmp_path):
+    """Test the seller gets one message while the failing admin copy is retried"""
+    notifications = FakeNotifications()
+    database, outbox, repository = await make_outbox(tmp_path, notifications, max_attempts=3)
+    order = dict(order_id=7, user_id=5, username="buyer", product_name="course", final_price=1000, payment_type="cash")
+    try:
+        await repository.create(
+            notify=lambda crm: [NotificationOutbox.entry("order", **order),
+                                NotificationOutbox.entry("seller_order", seller_chat_id=3, **order)],
+            number="09123456789", called=False, priority=1
+        )
+        
+        for _ in range(3):
+            await outbox.drain()
+        
+        assert notifications.sent == [3]
+        rows = await outbox_rows(database)
+        assert [(row.kind, row.status, row.attempts) for row in rows] == [("order", FAILED, 3)]
+    finally:
+        await database.engine.dispose()
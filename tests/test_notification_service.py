@@ -0,0 +1,186 @@
+"""
+Notification Service Tests
+Bot API delivery, recipient fan-out and Telethon peer caching against fake clients
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.config.settings import ApplicationConfig
+from app.exceptions.base import NotificationException
+from app.services.notification_service import NotificationService, BotAPIBackend, TelethonBackend
+
+
+class FakeBot:
+    """python-telegram-bot Bot stand-in with per-chat delays and failures"""
+    
+    def __init__(self, delays=None, failing=()):
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.messages = []
+    
+    async def send_message(self, chat_id, text, parse_mode=None):
+        await asyncio.sleep(self.delays.get(chat_id, 0))
+        if chat_id in self.failing:
+            raise RuntimeError("Forbidden: bot was blocked by the user")
+        self.messages.append((chat_id, text))
+
+
+class FakeClient:
+    """Telethon client stand-in that can fail sends"""
+    
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.lookups = 0
+        self.messages = []
+    
+    def is_connected(self):
+        return True
+    
+    async def get_input_entity(self, username):
+        self.lookups += 1
+        return f"peer-{self.lookups}"
+    
+    async def send_message(self, entity, message, parse_mode=None):
+        if self.failures:
+            self.failures -= 1
+            raise ValueError("Could not find the input entity")
+        self.messages.append((entity, message))
+
+
+def make_service(client):
+    """Create a Telethon-backed notification service on a fake client"""
+    backend = TelethonBackend(api_id=1, api_hash="hash")
+    backend.client = client
+    return NotificationService(backend, default_recipients=["@admin"])
+
+
+def make_bot_service(bot, **kwargs):
+    """Create a Bot API notification service on a fake bot"""
+    service = NotificationService(BotAPIBackend(), **kwargs)
+    service.attach_bot(bot)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_bot_api_backend_sends_to_admin_chat():
+    """Test the Bot API backend messages the admin chat id through the attached bot"""
+    bot = FakeBot()
+    service = make_bot_service(bot, default_recipients=[42])
+    
+    await service.send_order_digest([{
+        "order_id": 7, "product_name": "course", "final_price": 1000, "payment_type": "cash"
+    }])
+    
+    assert [chat_id for chat_id, _ in bot.messages] == [42]
+    assert service.metrics()["backend"] == "bot_api"
+
+
+@pytest.mark.asyncio
+async def test_bot_api_backend_without_chat_id_fails():
+    """Test a missing admin chat id is reported instead of silently dropped"""
+    service = make_bot_service(FakeBot())
+    
+    with pytest.raises(NotificationException):
+        await service.send_to_admin("event")
+
+
+def test_bot_api_backend_requires_an_admin_chat(monkeypatch):
+    """Test startup fails when the Bot API backend has no chat id to notify"""
+    monkeypatch.setenv("NOTIFICATION_BACKEND", "bot_api")
+    monkeypatch.delenv("ADMIN_CHAT_ID", raising=False)
+    monkeypatch.setenv("NOTIFICATION_ROUTES", "order:111")
+    with pytest.raises(ValueError, match="ADMIN_CHAT_ID"):
+        ApplicationConfig().validate()
+    
+    monkeypatch.setenv("NOTIFICATION_ROUTES", "*:111")
+    ApplicationConfig().validate()
+
+
+@pytest.mark.asyncio
+async def test_order_fans_out_to_routed_admins_concurrently():
+    """Test order admins are sent to at once and failures are per recipient"""
+    bot = FakeBot(delays={1: 0.2, 2: 0.2, 3: 0.2}, failing={2})
+    service = make_bot_service(bot, routes={"order": [1, 2, 3]}, default_recipients=[9])
+    
+    started = time.perf_counter()
+    await service.send_order_notification(
+        order_id=7, user_id=5, username=None, product_name="course",
+        final_price=1000, payment_type="cash"
+    )
+    elapsed = time.perf_counter() - started
+    
+    assert sorted(chat_id for chat_id, _ in bot.messages) == [1, 3]
+    assert elapsed < 0.4
+    recipients = service.metrics()["recipients"]
+    assert recipients["2"]["failed"] == 1 and "blocked" in recipients["2"]["last_error"]
+    assert recipients["1"]["sent"] == recipients["3"]["sent"] == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_recipient_times_out_without_blocking_others():
+    """Test a hung chat is cut off by the send timeout while the rest are delivered"""
+    bot = FakeBot(delays={2: 5})
+    service = make_bot_service(bot, default_recipients=[1, 2], send_timeout=0.1)
+    
+    await service.send_to_admin("event")
+    
+    assert bot.messages == [(1, "event")]
+    assert service.recipients[2].failed == 1
+
+
+@pytest.mark.asyncio
+async def test_seller_copy_goes_only_to_the_seller():
+    """Test the seller's order copy skips the admins and fails when the seller is unreachable"""
+    bot = FakeBot(failing={4})
+    service = make_bot_service(bot, default_recipients=[1])
+    
+    await service.send_seller_order_notification(
+        seller_chat_id=3, order_id=7, user_id=5, username="buyer", product_name="course",
+        final_price=1000, payment_type="cash", referral_code="maz1403"
+    )
+    assert [chat_id for chat_id, _ in bot.messages] == [3]
+    
+    with pytest.raises(NotificationException):
+        await service.send_seller_order_notification(
+            seller_chat_id=4, order_id=8, user_id=5, username="buyer", product_name="course",
+            final_price=1000, payment_type="cash"
+        )
+
+
+@pytest.mark.asyncio
+async def test_admin_entity_is_resolved_once():
+    """Test consecutive notifications reuse the resolved admin peer"""
+    client = FakeClient()
+    service = make_service(client)
+    
+    for i in range(3):
+        await service.send_to_admin(f"event {i}")
+    
+    assert client.lookups == 1
+    assert service.metrics()["sent"] == 3
+    assert service.metrics()["latency_p50"] is not None
+
+
+@pytest.mark.asyncio
+async def test_stale_entity_is_resolved_again():
+    """Test a failed send refreshes the cached peer and retries once"""
+    client = FakeClient(failures=1)
+    service = make_service(client)
+    
+    await service.send_to_admin("event")
+    
+    assert client.lookups == 2
+    assert client.messages == [("peer-2", "event")]
+
+
+@pytest.mark.asyncio
+async def test_persistent_failure_raises():
+    """Test a send that fails again after the refresh is reported"""
+    service = make_service(FakeClient(failures=2))
+    
+    with pytest.raises(NotificationException):
+        await service.send_to_admin("event")
+    assert service.failed == 1
@@ -0,0 +1,103 @@
+"""
+OTP Service Tests
+Unit tests for the server-side OTP store
+"""
+
+import pytest
+
+from app.exceptions.base import SMSException
+from app.services.otp_service import OTPStore, OTPService, OTPPurpose, OTPResult
+
+
+def make_store(**kwargs):
+    """Create a store with test defaults"""
+    options = {"ttl_seconds": 600, "max_attempts": 3, "max_pending": 100}
+    options.update(kwargs)
+    return OTPStore(**options)
+
+
+class TestOTPStore:
+    """Test the OTP store"""
+    
+    def test_issue_reuses_outstanding_code(self):
+        """Test re-requests within the validity window reuse the code"""
+        store = make_store()
+        code, is_new = store.issue("crm", "09123456789")
+        again, is_new_again = store.issue("crm", "09123456789")
+        
+        assert is_new and not is_new_again
+        assert again == code
+        assert len(code) == 4 and code.isdigit()
+    
+    def test_codes_are_scoped_by_purpose(self):
+        """Test the same phone gets independent codes per purpose"""
+        store = make_store()
+        store.issue("crm", "09123456789")
+        _, is_new = store.issue("lottery", "09123456789")
+        
+        assert is_new
+        assert len(store) == 2
+    
+    def test_valid_code_is_single_use(self):
+        """Test a verified code cannot be used again"""
+        store = make_store()
+        code, _ = store.issue("crm", "09123456789")
+        
+        assert store.verify("crm", "09123456789", code) is OTPResult.VALID
+        assert store.verify("crm", "09123456789", code) is OTPResult.EXPIRED
+    
+    def test_persian_digits_are_accepted(self):
+        """Test codes typed with Persian digits and spaces verify"""
+        store = make_store()
+        code, _ = store.issue("crm", "09123456789")
+        persian = " ".join("۰۱۲۳۴۵۶۷۸۹"[int(d)] for d in code)
+        
+        assert store.verify("crm", "09123456789", persian) is OTPResult.VALID
+    
+    def test_attempt_limit_locks_code(self):
+        """Test too many wrong attempts invalidate the code"""
+        store = make_store(max_attempts=2)
+        code, _ = store.issue("crm", "09123456789")
+        wrong = "0000" if code != "0000" else "1111"
+        
+        assert store.verify("crm", "09123456789", wrong) is OTPResult.INVALID
+        assert store.verify("crm", "09123456789", wrong) is OTPResult.LOCKED
+        assert store.verify("crm", "09123456789", code) is OTPResult.EXPIRED
+    
+    def test_expired_code_is_rejected(self):
+        """Test codes past their TTL are rejected and purged"""
+        store = make_store(ttl_seconds=0)
+        code, _ = store.issue("crm", "09123456789")
+        
+        assert store.verify("crm", "09123456789", code) is OTPResult.EXPIRED
+        assert len(store) == 0
+    
+    def test_store_is_bounded(self):
+        """Test the oldest codes are evicted beyond max_pending"""
+        store = make_store(max_pending=10)
+        for i in range(25):
+            store.issue("crm", f"0912{i:07d}")
+        
+        assert len(store) == 10
+        assert store.evicted == 15
+        _, is_new = store.issue("crm", f"0912{24:07d}")
+        assert not is_new
+
+
+class FailingSMS:
+    """SMS service whose sends always fail"""
+    
+    async def send_otp(self, phone_number, otp):
+        raise SMSException(phone_number=phone_number, error_details="down")
+
+
+@pytest.mark.asyncio
+async def test_failed_send_does_not_leave_code_outstanding():
+    """Test a failed SMS lets the user request a fresh code"""
+    store = make_store()
+    service = OTPService(store, FailingSMS())
+    
+    with pytest.raises(SMSException):
+        await service.send_code(OTPPurpose.CRM, "09123456789")
+    
+    assert len(store) == 0
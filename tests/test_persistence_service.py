@@ -0,0 +1,68 @@
+"""
+Persistence Service Tests
+Write-behind flush retries after a failed batch and tracking of loaded users
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.database import DatabaseService
+from app.services.persistence_service import DatabasePersistence
+
+
+class FlakyPersistence(DatabasePersistence):
+    """Persistence whose first batch writes fail"""
+    
+    def __init__(self, failures, **kwargs):
+        super().__init__(DatabaseService(), **kwargs)
+        self.failures = failures
+        self.written = {}
+    
+    async def _write_batch(self, batch):
+        if self.failures:
+            self.failures -= 1
+            return False
+        self.written.update(batch)
+        return True
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_without_another_update():
+    """Test a failed flush is retried on its own and picks up rows staged meanwhile"""
+    persistence = FlakyPersistence(failures=2, retry_backoff=0.01)
+    
+    await persistence.update_user_data(1, {"full_name": "a"})
+    await asyncio.sleep(0)
+    await persistence.update_user_data(2, {"full_name": "b"})
+    await asyncio.wait_for(persistence._flush_task, timeout=1)
+    
+    assert set(persistence.written) == {("user_data", "1"), ("user_data", "2")}
+    assert persistence.retries == 2
+    assert persistence._staged == {}
+
+
+@pytest.mark.asyncio
+async def test_shutdown_flush_does_not_wait_out_the_backoff():
+    """Test flush() cancels a pending retry and makes one final attempt"""
+    persistence = FlakyPersistence(failures=1, retry_backoff=60)
+    
+    await persistence.update_user_data(1, {"full_name": "a"})
+    await asyncio.sleep(0.01)
+    await asyncio.wait_for(persistence.flush(), timeout=1)
+    
+    assert set(persistence.written) == {("user_data", "1")}
+
+
+@pytest.mark.asyncio
+async def test_dropped_user_is_no_longer_tracked():
+    """Test a user swept by the conversation sweeper is forgotten by persistence"""
+    persistence = FlakyPersistence(failures=0)
+    
+    await persistence.update_user_data(1, {"full_name": "a"})
+    await persistence.update_user_data(2, {"full_name": "b"})
+    await persistence.drop_user_data(1)
+    await persistence.flush()
+    
+    assert persistence._loaded_users == {2}
+    assert persistence.written[("user_data", "1")] is None
@@ -0,0 +1,63 @@
+"""
+Phone Verification Tests
+Verified-phone registry against a temporary SQLite database
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.models import VerifiedPhone
+from app.services.phone_verification_service import PhoneVerificationService
+from tests.conftest import create_sqlite_database
+
+
+async def make_service(path, ttl=timedelta(days=30)):
+    """Create a registry on a fresh SQLite database"""
+    return PhoneVerificationService(await create_sqlite_database(path), ttl)
+
+
+async def age_verifications(service, days):
+    """Move every recorded verification into the past"""
+    async with service.database.get_session() as session:
+        await session.execute(
+            update(VerifiedPhone).values(verified_at=datetime.utcnow() - timedelta(days=days))
+        )
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_verified_phone_is_scoped_to_user(tmp_path):
+    """Test a verification only counts for the user who made it"""
+    service = await make_service(tmp_path / "registry.db")
+    await service.mark_verified(1, "09123456789")
+    # Marking again refreshes instead of failing on the primary key
+    await service.mark_verified(1, "09123456789")
+    
+    assert await service.is_verified(1, "09123456789")
+    assert not await service.is_verified(2, "09123456789")
+    assert not await service.is_verified(1, "09120000000")
+    await service.database.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_stale_verification_requires_otp(tmp_path):
+    """Test verifications older than the window no longer skip OTP"""
+    service = await make_service(tmp_path / "registry.db", ttl=timedelta(days=30))
+    await service.mark_verified(1, "09123456789")
+    await age_verifications(service, days=31)
+    
+    assert not await service.is_verified(1, "09123456789")
+    assert await service.purge_expired() == 1
+    await service.database.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_disabled_registry_never_skips(tmp_path):
+    """Test a zero freshness window always asks for a code"""
+    service = await make_service(tmp_path / "registry.db", ttl=None)
+    await service.mark_verified(1, "09123456789")
+    
+    assert not await service.is_verified(1, "09123456789")
+    await service.database.engine.dispose()
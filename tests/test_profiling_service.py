@@ -0,0 +1,55 @@
+"""
+Profiling Service Tests
+Sampling CPU profiles and tracemalloc snapshots
+"""
+
+import threading
+
+import pytest
+
+from app.services.profiling_service import ProfilingService
+
+
+def spin_in_hot_function(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.mark.asyncio
+async def test_cpu_profile_writes_collapsed_stacks(tmp_path):
+    """Test the profile records the busy thread's stacks in collapsed format"""
+    profiler = ProfilingService(output_dir=str(tmp_path), sample_interval=0.001)
+    stop = threading.Event()
+    worker = threading.Thread(target=spin_in_hot_function, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        result = await profiler.profile(1)
+    finally:
+        stop.set()
+        worker.join()
+    
+    lines = result.path.read_text().splitlines()
+    hot = [line for line in lines if line.startswith("busy-worker;") and "spin_in_hot_function" in line]
+    assert hot
+    assert int(hot[0].rsplit(" ", 1)[1]) > 0
+    assert not profiler.profiling
+    assert "samples" in result.summary
+
+
+@pytest.mark.asyncio
+async def test_memory_snapshots_report_growth(tmp_path):
+    """Test a second snapshot reports growth and tracing stops on request"""
+    profiler = ProfilingService(output_dir=str(tmp_path))
+    try:
+        first = await profiler.memory_snapshot()
+        assert "just started" in first.path.read_text()
+        
+        retained = [bytearray(1024) for _ in range(2000)]
+        second = await profiler.memory_snapshot()
+        report = second.path.read_text()
+        assert "Growth since the previous snapshot" in report
+        assert "test_profiling_service.py" in report.split("Growth since the previous snapshot")[1]
+        del retained
+    finally:
+        assert profiler.stop_memory_tracing()
+    assert not profiler.stop_memory_tracing()
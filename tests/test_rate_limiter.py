@@ -0,0 +1,111 @@
+"""
+Rate Limiter Tests
+Token bucket limits and OTP send enforcement
+"""
+
+import pytest
+
+from app.exceptions.base import RateLimitException
+from app.services.otp_service import OTPService, OTPPurpose
+from app.services.rate_limiter import TokenBucketLimiter
+from tests.test_otp_service import make_store
+
+
+class TestTokenBucketLimiter:
+    """Test the token bucket limiter"""
+    
+    def test_burst_then_deny(self):
+        """Test a key may spend its burst and is then denied"""
+        limiter = TokenBucketLimiter(capacity=3, refill_seconds=60)
+        
+        assert [limiter.acquire("a", now=0) for _ in range(3)] == [0, 0, 0]
+        assert limiter.acquire("a", now=0) == pytest.approx(60)
+        assert limiter.acquire("b", now=0) == 0
+        assert limiter.denied == 1
+    
+    def test_tokens_refill_over_time(self):
+        """Test a denied key regains one token per refill period"""
+        limiter = TokenBucketLimiter(capacity=1, refill_seconds=60)
+        limiter.acquire("a", now=0)
+        
+        assert limiter.acquire("a", now=30) == pytest.approx(30)
+        assert limiter.acquire("a", now=60) == 0
+    
+    def test_idle_buckets_are_evicted(self):
+        """Test fully refilled buckets are dropped"""
+        limiter = TokenBucketLimiter(capacity=2, refill_seconds=10)
+        for i in range(100):
+            limiter.acquire(i, now=0)
+        limiter.acquire("recent", now=15)
+        
+        limiter.evict_idle(now=20)
+        
+        assert len(limiter) == 1
+        assert limiter.evicted == 100
+    
+    def test_refund_returns_a_token(self):
+        """Test a refunded token can be spent again but never exceeds capacity"""
+        limiter = TokenBucketLimiter(capacity=1, refill_seconds=60)
+        limiter.acquire("a", now=0)
+        limiter.refund("a")
+        limiter.refund("a")
+        
+        assert limiter.acquire("a", now=0) == 0
+        assert limiter.acquire("a", now=0) == pytest.approx(60)
+
+
+class RecordingSMS:
+    """SMS service that records sends"""
+    
+    def __init__(self):
+        self.sent = []
+    
+    async def send_otp(self, phone_number, otp):
+        self.sent.append(phone_number)
+
+
+@pytest.mark.asyncio
+async def test_send_code_is_limited_per_phone_and_user():
+    """Test OTP sends are limited per phone and per Telegram user"""
+    sms = RecordingSMS()
+    service = OTPService(
+        make_store(), sms,
+        phone_limiter=TokenBucketLimiter(capacity=1, refill_seconds=600),
+        user_limiter=TokenBucketLimiter(capacity=2, refill_seconds=600)
+    )
+    
+    await service.send_code(OTPPurpose.CRM, "09120000001", telegram_id=1)
+    # Another purpose needs a new SMS to the same phone
+    with pytest.raises(RateLimitException) as error:
+        await service.send_code(OTPPurpose.LOTTERY, "09120000001", telegram_id=2)
+    assert error.value.context["limit_type"] == "otp_phone"
+    
+    await service.send_code(OTPPurpose.CRM, "09120000002", telegram_id=1)
+    with pytest.raises(RateLimitException) as error:
+        await service.send_code(OTPPurpose.CRM, "09120000003", telegram_id=1)
+    assert error.value.context["limit_type"] == "otp_user"
+    
+    # Re-requesting an outstanding code is free
+    assert await service.send_code(OTPPurpose.CRM, "09120000001", telegram_id=3) is False
+    assert sms.sent == ["09120000001", "09120000002"]
+    assert len(service.store) == 2
+
+
+@pytest.mark.asyncio
+async def test_phone_denial_does_not_spend_the_user_token():
+    """Test a send refused by the phone limit leaves the user's budget intact"""
+    sms = RecordingSMS()
+    service = OTPService(
+        make_store(), sms,
+        phone_limiter=TokenBucketLimiter(capacity=1, refill_seconds=600),
+        user_limiter=TokenBucketLimiter(capacity=1, refill_seconds=600)
+    )
+    await service.send_code(OTPPurpose.CRM, "09120000001", telegram_id=1)
+    
+    with pytest.raises(RateLimitException) as error:
+        await service.send_code(OTPPurpose.LOTTERY, "09120000001", telegram_id=2)
+    assert error.value.context["limit_type"] == "otp_phone"
+    
+    # User 2 was refused before any SMS went out, so they can still send one
+    await service.send_code(OTPPurpose.CRM, "09120000002", telegram_id=2)
+    assert sms.sent == ["09120000001", "09120000002"]
@@ -0,0 +1,127 @@
+"""
+SMS Client Tests
+Async Kavenegar client against a local stub HTTP server
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.exceptions.base import SMSException
+from app.services.kavenegar_client import AsyncKavenegarClient
+from app.services.sms_service import SMSService
+
+
+class StubKavenegarHandler(BaseHTTPRequestHandler):
+    """Answers every request like Kavenegar after the configured delay"""
+    
+    def do_POST(self):
+        behaviour = self.server.behaviour
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append(self.path)
+        time.sleep(behaviour["delay"])
+        
+        body = json.dumps({
+            "return": {"status": behaviour["status"], "message": "stub"},
+            "entries": [{"messageid": 1, "status": 1}]
+        }).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (timeout tests)
+            pass
+    
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Run a stub Kavenegar server on a free local port"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubKavenegarHandler)
+    server.behaviour = {"delay": 0, "status": 200}
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_service(server, timeout=5):
+    """Create an SMS service talking to the stub server"""
+    client = AsyncKavenegarClient(
+        "test-key", base_url=f"http://127.0.0.1:{server.server_port}", timeout=timeout
+    )
+    return SMSService(api=client)
+
+
+@pytest.mark.asyncio
+async def test_send_otp_uses_verify_lookup(stub_server):
+    """Test OTP is sent through the verify lookup endpoint"""
+    service = make_service(stub_server)
+    result = await service.send_otp("09123456789", "1234")
+    await service.close()
+    
+    assert result["success"] is True
+    assert stub_server.requests == ["/v1/test-key/verify/lookup.json"]
+
+
+@pytest.mark.asyncio
+async def test_slow_provider_does_not_block_event_loop(stub_server):
+    """Test other work keeps running while SMS calls are slow"""
+    stub_server.behaviour["delay"] = 0.5
+    service = make_service(stub_server)
+    ticks = 0
+    
+    async def other_updates():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+    
+    ticker = asyncio.create_task(other_updates())
+    started = time.perf_counter()
+    await asyncio.gather(*(service.send_otp(f"0912345678{i}", "1234") for i in range(5)))
+    elapsed = time.perf_counter() - started
+    ticker.cancel()
+    await service.close()
+    
+    # Five concurrent 0.5s calls overlap instead of running back to back
+    assert elapsed < 1.5
+    # The loop kept ticking roughly every 10ms during the calls
+    assert ticks >= 20
+
+
+@pytest.mark.asyncio
+async def test_api_error_maps_to_sms_exception(stub_server):
+    """Test a non-200 Kavenegar status raises SMSException"""
+    stub_server.behaviour["status"] = 418
+    service = make_service(stub_server)
+    
+    with pytest.raises(SMSException) as error:
+        await service.send_otp("09123456789", "1234")
+    await service.close()
+    
+    assert "APIException[418]" in error.value.message
+
+
+@pytest.mark.asyncio
+async def test_timeout_maps_to_sms_exception(stub_server):
+    """Test a provider timeout raises SMSException"""
+    stub_server.behaviour["delay"] = 0.5
+    service = make_service(stub_server, timeout=0.1)
+    
+    with pytest.raises(SMSException) as error:
+        await service.send_otp("09123456789", "1234")
+    await service.close()
+    
+    assert "HTTP error" in error.value.message
@@ -0,0 +1,63 @@
+"""
+SMS Delivery Tests
+Batched delivery status polling against a fake provider and SQLite
+"""
+
+import pytest
+
+from app.services.sms_delivery_service import SMSDeliveryTracker, mobile_operator
+from tests.conftest import create_sqlite_database
+
+
+class FakeStatusSMS:
+    """SMS service answering status requests from a status table"""
+    
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.requests = []
+    
+    async def get_sms_statuses(self, message_ids):
+        self.requests.append(list(message_ids))
+        return [
+            {"messageid": i, "status": self.statuses.get(i, 5), "statustext": "stub"}
+            for i in message_ids
+        ]
+
+
+def sent(message_id):
+    """A dispatcher result for one accepted message"""
+    return {"success": True, "provider": "kavenegar", "response": [{"messageid": message_id, "status": 1}]}
+
+
+@pytest.mark.asyncio
+async def test_statuses_are_polled_in_batches(tmp_path):
+    """Test pending messages are checked many ids per request and resolved"""
+    database = await create_sqlite_database(tmp_path / "sms.db")
+    sms = FakeStatusSMS({1: 10, 2: 11, 3: 10})
+    tracker = SMSDeliveryTracker(database, sms, batch_size=2)
+    
+    tracker.record("09121111111", sent(1), "crm")
+    tracker.record("09351111111", sent(2), "lottery")
+    tracker.record("09351111112", sent(3), "lottery")
+    tracker.record("09201111111", sent(4), "crm")
+    
+    assert await tracker.poll_once() == 3
+    assert sms.requests == [[1, 2], [3, 4]]
+    assert tracker.stats["mci"].delivered == 1
+    assert tracker.stats["irancell"].delivered == 1
+    assert tracker.stats["irancell"].failed == 1
+    
+    # Only the message still in transit is polled again
+    await tracker.poll_once()
+    assert sms.requests[-1] == [4]
+    await database.engine.dispose()
+
+
+def test_untracked_results_are_ignored():
+    """Test sends through other providers are not tracked"""
+    tracker = SMSDeliveryTracker(database=None, sms=None)
+    tracker.record("09121111111", {"provider": "backup", "response": [{"messageid": 1}]})
+    
+    assert tracker.metrics()["staged"] == 0
+    assert mobile_operator("09121111111") == "mci"
+    assert mobile_operator("09211111111") == "rightel"
@@ -0,0 +1,129 @@
+"""
+SMS Dispatcher Tests
+Retries, circuit breaking and failover against fake providers
+"""
+
+import asyncio
+
+import pytest
+from kavenegar import APIException, HTTPException
+
+from app.exceptions.base import SMSException
+from app.services.sms_dispatcher import SMSDispatcher, SMSProvider, CircuitBreaker
+
+
+class FakeProvider(SMSProvider):
+    """Provider that fails according to a script of outcomes"""
+    
+    def __init__(self, name, outcomes=(), delay=0):
+        self.name = name
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.sent = []
+    
+    async def send_otp(self, phone_number, otp):
+        await asyncio.sleep(self.delay)
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if outcome == "http":
+            raise HTTPException("connection reset")
+        if outcome == "api":
+            raise APIException("APIException[411] invalid receptor")
+        self.sent.append((phone_number, otp))
+        return [{"messageid": len(self.sent)}]
+
+
+def make_dispatcher(providers, **kwargs):
+    """Create a dispatcher with fast test defaults"""
+    options = {"workers": 2, "max_retries": 2, "retry_backoff": 0, "breaker_failures": 2}
+    options.update(kwargs)
+    return SMSDispatcher(providers, **options)
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    """Test HTTP errors are retried on the same provider"""
+    provider = FakeProvider("primary", ["http", "http"])
+    dispatcher = make_dispatcher([provider])
+    
+    result = await dispatcher.send_otp("09123456789", "1234")
+    await dispatcher.stop()
+    
+    assert result["provider"] == "primary"
+    assert provider.sent == [("09123456789", "1234")]
+    assert dispatcher.stats["primary"].retries == 2
+
+
+@pytest.mark.asyncio
+async def test_api_errors_are_not_retried():
+    """Test requests rejected by the provider fail immediately"""
+    provider = FakeProvider("primary", ["api"])
+    dispatcher = make_dispatcher([provider])
+    
+    with pytest.raises(SMSException):
+        await dispatcher.send_otp("09123456789", "1234")
+    await dispatcher.stop()
+    
+    assert dispatcher.stats["primary"].retries == 0
+
+
+@pytest.mark.asyncio
+async def test_failover_to_second_provider():
+    """Test a failing provider falls back to the next one"""
+    primary = FakeProvider("primary", ["http"] * 3)
+    secondary = FakeProvider("secondary")
+    dispatcher = make_dispatcher([primary, secondary])
+    
+    result = await dispatcher.send_otp("09123456789", "1234")
+    await dispatcher.stop()
+    
+    assert result["provider"] == "secondary"
+    assert secondary.sent == [("09123456789", "1234")]
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast():
+    """Test an unhealthy provider is skipped once its circuit opens"""
+    provider = FakeProvider("primary", ["http"] * 6)
+    dispatcher = make_dispatcher([provider], breaker_reset_seconds=60)
+    
+    for _ in range(2):
+        with pytest.raises(SMSException):
+            await dispatcher.send_otp("09123456789", "1234")
+    assert dispatcher.breakers["primary"].state == CircuitBreaker.OPEN
+    
+    attempts_before = dispatcher.stats["primary"].failed
+    with pytest.raises(SMSException):
+        await dispatcher.send_otp("09123456789", "1234")
+    await dispatcher.stop()
+    
+    assert dispatcher.stats["primary"].failed == attempts_before
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately():
+    """Test the bounded queue rejects messages instead of growing"""
+    provider = FakeProvider("primary", delay=0.2)
+    dispatcher = make_dispatcher([provider], workers=1, queue_size=1)
+    
+    sends = [asyncio.create_task(dispatcher.send_otp("09123456780", "1234"))]
+    # Let the only worker pick up the first message
+    await asyncio.sleep(0.05)
+    sends += [asyncio.create_task(dispatcher.send_otp(f"0912345678{i}", "1234")) for i in (1, 2)]
+    results = await asyncio.gather(*sends, return_exceptions=True)
+    await dispatcher.stop()
+    
+    assert sum(isinstance(r, SMSException) for r in results) == 1
+    assert dispatcher.rejected == 1
+    assert dispatcher.metrics()["providers"]["primary"]["sent"] == 2
+
+
+def test_half_open_circuit_closes_after_success():
+    """Test a successful trial call closes the circuit"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,87 @@
+"""
+Request Tracing Tests
+Handler latency, outcomes, nested spans and update correlation
+"""
+
+import pytest
+from telegram import Update
+
+from app.exceptions.base import ValidationException
+from app.middleware.error_handler import handle_exceptions
+from app.utils.logging import log_update_id
+from app.utils.tracing import LatencyHistogram, sample_percentile, tracer, tracing_logger
+
+
+def make_update(update_id=1001):
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": 1, "date": 0, "text": "hi",
+            "chat": {"id": 5, "type": "private"},
+            "from": {"id": 5, "is_bot": False, "first_name": "A"}
+        }
+    }, None)
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    """Test percentiles report the upper bound of the bucket they fall in"""
+    histogram = LatencyHistogram()
+    for _ in range(98):
+        histogram.observe(0.003)
+    histogram.observe(0.2)
+    histogram.observe(3.0)
+    
+    assert histogram.percentile(0.5) == 0.005
+    assert histogram.percentile(0.99) == 0.25
+    assert histogram.percentile(1.0) == 5.0
+
+
+def test_sample_percentile_uses_nearest_rank():
+    """Test raw-sample percentiles pick the nearest ranked sample"""
+    samples = [0.4, 0.1, 0.3, 0.2]
+    
+    assert sample_percentile(samples, 0.5) == 0.3
+    assert sample_percentile(samples, 0.95) == 0.4
+    assert sample_percentile([], 0.5) is None
+
+
+@pytest.mark.asyncio
+async def test_handler_outcomes_and_nested_spans(monkeypatch):
+    """Test handlers record outcomes and a slow one logs its spans under the update_id"""
+    seen = {}
+    slow = []
+    monkeypatch.setattr(tracing_logger, "warning", slow.append)
+    monkeypatch.setattr(tracer, "slow_threshold", 0)
+    
+    @tracer.traced("db")
+    async def load_user():
+        seen["update_id"] = log_update_id.get()
+    
+    @handle_exceptions()
+    async def inner_step(update):
+        await load_user()
+    
+    @handle_exceptions()
+    async def tracing_step(update, context):
+        async with tracer.span("sms", "send_code"):
+            pass
+        await inner_step(update)
+        if context == "invalid":
+            raise ValidationException("bad input")
+    
+    assert tracing_step.__name__ == "tracing_step"
+    
+    await tracing_step(make_update(), None)
+    await tracing_step(make_update(), "invalid")
+    
+    assert seen["update_id"] == 1001
+    assert log_update_id.get() is None
+    
+    name = tracing_step.__qualname__
+    metrics = tracer.metrics()
+    assert metrics["handlers"][name]["outcomes"] == {"ok": 1, "handled_error": 1}
+    assert metrics["handlers"][name]["count"] == 2
+    assert metrics["spans"][f"db:{load_user.__qualname__}"]["count"] == 2
+    
+    assert len(slow) == 2
+    assert name in slow[0] and "sms:send_code" in slow[0] and ">db:" in slow[0] and "handler:" in slow[0]
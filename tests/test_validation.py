@@ -42,7 +42,9 @@ class TestInputValidator:
         valid_phones = [
             "09123456789",
             "09987654321",
-            "۰۹۱۲۳۴۵۶۷۸۹"  # Persian digits
+            "۰۹۱۲۳۴۵۶۷۸۹",  # Persian digits
+            "+989123456789",  # International format
+            "989123456789"  # Shared Telegram contact
         ]
         
         for phone in valid_phones: